@@ -1,11 +1,27 @@
 from langchain_google_genai import GoogleGenerativeAI
+import asyncio
+import os
 import dotenv
 from langgraph.graph import StateGraph, START, END
 from typing import TypedDict, Literal
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.llm_cache import cached
+from common.scheduler import scheduled
+from common.single_flight import coalesced
+from common.hedging import hedged
+from common.profiling import profiled, report
 
-model = GoogleGenerativeAI(
+# identical questions run in bulk share one in-flight call (common/single_flight.py)
+# and calls slower than the observed p95 get a hedged duplicate (common/hedging.py)
+model = coalesced(hedged(scheduled(cached(GoogleGenerativeAI(
     model="gemini-2.5-flash"
-)
+)))))
+
+# how many conversations the async entry point keeps in flight at once. The
+# scheduler still lets at most LLM_MAX_IN_FLIGHT (default 16) calls reach the
+# model together, the rest queue there: raise both to go wider than 16.
+MAX_CONCURRENCY = int(os.getenv("MAX_CONCURRENCY", "32"))
 
 class questionState(TypedDict):
     userInput: str
@@ -33,28 +49,75 @@ def less_detailed_question_node(state: questionState) -> questionState:
     less_detailed_question = model.invoke(prompt)
     return {'lessDetailedQuestion': less_detailed_question}
 
-# defining graph
-graph = StateGraph(questionState)
+# async variants, the two rewrite branches await the model instead of holding a
+# worker thread each, so a run only waits as long as the slowest branch
 
-# adding nodes
-graph.add_node('question', question_node)
-graph.add_node('detailed_question', detailed_question_node)
-graph.add_node('less_detailed_question', less_detailed_question_node)
+async def aquestion_node(state: questionState) -> questionState:
+    userInput = state["userInput"]
+    prompt = f"identify the main question in the following conversation: {userInput}. "
+    normal_question = await model.ainvoke(prompt)
+    return {'question': normal_question}
 
-# adding edges
-graph.add_edge(START, 'question')
-graph.add_edge('question', 'detailed_question')
-graph.add_edge('question', 'less_detailed_question')
-graph.add_edge('question', END)
-graph.add_edge('detailed_question', END)
-graph.add_edge('less_detailed_question', END)
+async def adetailed_question_node(state: questionState) -> questionState:
+    question = state["question"]
+    prompt = f"Rewrite the Question in more abstract way: {question}. "
+    detailed_question = await model.ainvoke(prompt)
+    return {'detailedQuestion': detailed_question}
 
-# compile the graph
-workflow = graph.compile()
+async def aless_detailed_question_node(state: questionState) -> questionState:
+    question = state["question"]
+    prompt = f"Rewrite the Question in less abstract way: {question}. "
+    less_detailed_question = await model.ainvoke(prompt)
+    return {'lessDetailedQuestion': less_detailed_question}
 
-# executing the graph
 
-initial_state = {'userInput': input("Enter your conversation: ")}
-final_state = workflow.invoke(initial_state)
+def build_graph(question, detailed_question, less_detailed_question):
+    # defining graph
+    graph = StateGraph(questionState)
+
+    # adding nodes
+    graph.add_node('question', question)
+    graph.add_node('detailed_question', detailed_question)
+    graph.add_node('less_detailed_question', less_detailed_question)
+
+    # adding edges
+    graph.add_edge(START, 'question')
+    graph.add_edge('question', 'detailed_question')
+    graph.add_edge('question', 'less_detailed_question')
+    graph.add_edge('question', END)
+    graph.add_edge('detailed_question', END)
+    graph.add_edge('less_detailed_question', END)
+
+    # compile the graph
+    return graph.compile()
+
+
+workflow = build_graph(question_node, detailed_question_node, less_detailed_question_node)
+async_workflow = build_graph(aquestion_node, adetailed_question_node, aless_detailed_question_node)
+
+
+async def arun_many(user_inputs: list[str], max_concurrency: int = MAX_CONCURRENCY) -> list[questionState]:
+    """Run many conversations through the async graph, at most `max_concurrency` at a time."""
+    # a semaphore instead of abatch(max_concurrency=...) because that config value
+    # is inherited by every run and would also serialise the two rewrite branches
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run_one(user_input: str) -> questionState:
+        async with semaphore:
+            return await async_workflow.ainvoke({'userInput': user_input})
+
+    return await asyncio.gather(*(run_one(user_input) for user_input in user_inputs))
+
+
+def run_many(user_inputs: list[str], max_concurrency: int = MAX_CONCURRENCY) -> list[questionState]:
+    return asyncio.run(arun_many(user_inputs, max_concurrency))
+
+
+# executing the graph
+if __name__ == "__main__":
+    workflow = profiled(workflow)
+    initial_state = {'userInput': input("Enter your conversation: ")}
+    final_state = workflow.invoke(initial_state)
 
-print(final_state)
\ No newline at end of file
+    print(final_state)
+    report(workflow)
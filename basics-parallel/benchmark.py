@@ -0,0 +1,47 @@
+"""Wall-clock of the question-rewrite graph vs number of in-flight runs.
+
+Uses a local fake model with injected latency, so no API key or network is
+needed:  python basics-parallel/benchmark.py --runs 200 --latency 0.2
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.fake_llm import FakeLLM
+from common.loader import load_script
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=200, help="conversations per measurement")
+    parser.add_argument("--latency", type=float, default=0.2, help="fake model latency in seconds")
+    parser.add_argument("--in-flight", type=int, nargs="+", default=[1, 4, 16, 64, 200])
+    parser.add_argument("--sync-runs", type=int, default=5, help="runs for the blocking invoke baseline")
+    args = parser.parse_args()
+
+    evaluation = load_script("basics-parallel/basic-evaluation.py")
+    evaluation.model = FakeLLM(latency=args.latency)
+    inputs = [f"conversation {i}: how do I speed up my graph?" for i in range(args.runs)]
+
+    # baseline: blocking invoke, one conversation after another
+    start = time.perf_counter()
+    for user_input in inputs[:args.sync_runs]:
+        evaluation.workflow.invoke({'userInput': user_input})
+    per_run = (time.perf_counter() - start) / args.sync_runs
+    print(f"sync invoke: {per_run:.3f}s per run -> {per_run * args.runs:.1f}s projected for {args.runs} runs")
+    print(f"(one run = question + slowest branch = {2 * args.latency:.2f}s ideal)\n")
+
+    print(f"{'in-flight':>9} {'wall-clock s':>13} {'runs/s':>8} {'speed-up':>9}")
+    for in_flight in args.in_flight:
+        start = time.perf_counter()
+        results = evaluation.run_many(inputs, max_concurrency=in_flight)
+        elapsed = time.perf_counter() - start
+        assert len(results) == args.runs and all('detailedQuestion' in r for r in results)
+        print(f"{in_flight:>9} {elapsed:>13.2f} {args.runs / elapsed:>8.1f} {per_run * args.runs / elapsed:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,12 +2,23 @@ from langchain_google_genai import ChatGoogleGenerativeAI
 import dotenv
 from langgraph.graph import StateGraph, START, END
 from typing import TypedDict
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.llm_cache import cached
+from common.scheduler import scheduled
+from common.hedging import deadline, hedged, shared_latencies
+from common.profiling import profiled, report
 dotenv.load_dotenv()
 
 
-model = ChatGoogleGenerativeAI(
+model = hedged(scheduled(cached(ChatGoogleGenerativeAI(
     model = "gemini-2.5-flash"
-    )
+    ))))
+
+# seconds before a node gives up (DeadlineExceeded), unset = no deadline;
+# a run can override it per node with {"configurable": {"node_timeouts": {"blog": 120}}}
+NODE_TIMEOUT = float(os.getenv("NODE_TIMEOUT", "0")) or None
 
 class outlineState(TypedDict):
     title: str
@@ -16,6 +27,7 @@ class outlineState(TypedDict):
     evaluation: str
 
 
+@deadline(timeout=NODE_TIMEOUT)
 def outline(state: outlineState) -> outlineState:
     title = state["title"]
     prompt = f"Create an detailed outline for a document titled '{title}'."
@@ -31,6 +43,7 @@ def outline(state: outlineState) -> outlineState:
     return state
 
 
+@deadline(timeout=NODE_TIMEOUT)
 def blog(state: outlineState) -> outlineState:
     outline = state["outline"]
     prompt = f"Create a blog post based on the following outline: {outline}"
@@ -40,6 +53,7 @@ def blog(state: outlineState) -> outlineState:
 
     return state
 
+@deadline(timeout=NODE_TIMEOUT)
 def evaluation(state: outlineState) -> outlineState:
     outline = state["outline"]
     blog = state["blog"]
@@ -50,9 +64,6 @@ def evaluation(state: outlineState) -> outlineState:
 
     return state
 
-userinput = input("Enter the title of your document: ")
-
-
 #define graph 
 graph = StateGraph(outlineState)
 
@@ -73,11 +84,16 @@ graph.add_edge('evaluation', END)
 workflow = graph.compile()
 
 #execute the graph
+if __name__ == "__main__":
+    workflow = profiled(workflow)
+    userinput = input("Enter the title of your document: ")
 
-initial_state = {'title': userinput}
+    initial_state = {'title': userinput}
 
-final_state = workflow.invoke(initial_state)
+    final_state = workflow.invoke(initial_state)
 
-print(final_state["outline"])
-print(final_state["blog"])
-print(final_state["evaluation"])
\ No newline at end of file
+    print(final_state["outline"])
+    print(final_state["blog"])
+    print(final_state["evaluation"])
+    report(workflow)
+    print(shared_latencies().format_metrics())
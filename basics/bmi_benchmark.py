@@ -0,0 +1,101 @@
+"""BMI scoring: per-record `workflow.invoke` vs the vectorized batch mode of first.py.
+
+Generates `--rows` random people and scores them every way first.py can:
+
+    python basics/bmi_benchmark.py --rows 1000000
+
+The per-record graph path is timed on `--invoke-rows` people and
+extrapolated, a million invokes take several minutes. File mode runs
+`first.score_file` in a child process so its peak memory is its own.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import numpy as np
+import pandas as pd
+
+from common.loader import load_script
+
+# scores a file with first.py in a fresh process: seconds and peak RSS growth (KiB on Linux) over the imports
+CHILD = """
+import resource, sys, time
+sys.path.insert(0, {root!r})
+from common.loader import load_script
+first = load_script('basics/first.py')
+before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+start = time.perf_counter()
+first.score_file({source!r}, {target!r}, {chunk_rows})
+print(time.perf_counter() - start, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before)
+"""
+
+
+def people(rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'weight': rng.normal(75, 15, rows).clip(35, 200).round(1),
+        'height': rng.normal(1.72, 0.1, rows).clip(1.4, 2.1).round(2),
+    })
+
+
+def score_file(source: str, target: str, chunk_rows: int) -> tuple[float, float]:
+    """(seconds, peak RSS growth in MiB) of first.score_file in its own process."""
+    code = CHILD.format(root=REPO_ROOT, source=source, target=target, chunk_rows=chunk_rows)
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    seconds, growth = out.split()
+    return float(seconds), int(growth) / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-record invoke vs vectorized BMI batch mode.")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--invoke-rows", type=int, default=20_000, help="people scored through workflow.invoke")
+    parser.add_argument("--chunk-rows", type=int, nargs="+", default=[65_536, 1 << 20])
+    args = parser.parse_args()
+
+    first = load_script("basics/first.py")
+    frame = people(args.rows)
+    weight, height = frame['weight'].to_numpy(), frame['height'].to_numpy()
+    rows = []
+
+    sample = frame.head(args.invoke_rows).to_dict('records')
+    start = time.perf_counter()
+    expected = [first.workflow.invoke(person) for person in sample]
+    per_record = (time.perf_counter() - start) / len(sample)
+    rows.append((f"workflow.invoke (x{len(sample)}, extrapolated)", per_record * args.rows))
+
+    start = time.perf_counter()
+    bmi, labels = first.score_batch(weight, height)
+    rows.append(("score_batch (numpy arrays)", time.perf_counter() - start))
+    assert [state['bmi'] for state in expected] == bmi[:len(sample)].tolist()
+    assert [state['label'] for state in expected] == labels[:len(sample)].tolist()
+
+    start = time.perf_counter()
+    first.score_frame(frame)
+    rows.append(("score_frame (pandas)", time.perf_counter() - start))
+
+    print(f"{args.rows} people\n")
+    print(f"{'path':<50} {'seconds':>8} {'rows/s':>12} {'speedup':>8} {'+RSS MiB':>9}")
+    baseline = rows[0][1]
+    for name, seconds in rows:
+        print(f"{name:<50} {seconds:>8.2f} {args.rows / seconds:>12,.0f} {baseline / seconds:>7.0f}x {'':>9}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sources = {'csv': os.path.join(tmp, 'people.csv'), 'parquet': os.path.join(tmp, 'people.parquet')}
+        frame.to_csv(sources['csv'], index=False)
+        frame.to_parquet(sources['parquet'], index=False)
+        for kind, source in sources.items():
+            for chunk_rows in args.chunk_rows:
+                seconds, peak = score_file(source, os.path.join(tmp, 'scored.parquet'), chunk_rows)
+                name = f"score_file {kind} -> parquet, {chunk_rows} rows/chunk"
+                print(f"{name:<50} {seconds:>8.2f} {args.rows / seconds:>12,.0f} {baseline / seconds:>7.0f}x {peak:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,12 @@ from langchain_google_genai import GoogleGenerativeAI
 import dotenv
 from langgraph.graph import StateGraph,START, END
 from typing import TypedDict
+import argparse
+import os
+import sys
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.fusion import deterministic, fuse
 
 
 dotenv.load_dotenv()
@@ -12,6 +18,7 @@ class bmiDic(TypedDict):
     bmi: float
     label: str
 
+@deterministic
 def cal_bmi(state : bmiDic) -> bmiDic:
     weight = state['weight']
     height = state['height']
@@ -22,6 +29,7 @@ def cal_bmi(state : bmiDic) -> bmiDic:
 
     return state
 
+@deterministic
 def label(state: bmiDic) -> bmiDic:
     if state['bmi'] < 18.5:
         state['label'] = 'Underweight'
@@ -50,14 +58,124 @@ graph.add_edge('label',END)
 
 
 
-#compile 
-workflow = graph.compile()
+#compile, cal_bmi and label run as one step (GRAPH_FUSION=0 keeps them apart)
+workflow = fuse(graph).compile()
+
+
+# Batch mode: the same two nodes on whole columns instead of one person per invoke.
+# label() as bins, np.digitize puts a bmi in bin i when BMI_BINS[i-1] <= bmi < BMI_BINS[i]
+BMI_BINS = np.array([18.5, 24.9, 29.9])
+BMI_LABELS = np.array(['Underweight', 'Normal weight', 'Overweight', 'Obesity'], dtype=object)
+
+# rows per chunk when scoring files, memory stays at a few chunks whatever the file size
+CHUNK_ROWS = 1 << 20
+
+
+def _round2(values: np.ndarray) -> np.ndarray:
+    # np.round works on values * 100 and disagrees with round() on some ties,
+    # those few go through round() so batch results match cal_bmi exactly
+    rounded = np.round(values, 2)
+    scaled = values * 100
+    ties = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-9
+    if ties.any():
+        rounded[ties] = [round(value, 2) for value in values[ties].tolist()]
+    return rounded
+
+
+def bmi_codes(weight, height) -> tuple[np.ndarray, np.ndarray]:
+    """(bmi, index into BMI_LABELS) for arrays of weights and heights, -1 where bmi is not finite."""
+    weight = np.asarray(weight, dtype=np.float64)
+    height = np.asarray(height, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        bmi = _round2(weight / (height ** 2))
+    codes = np.digitize(bmi, BMI_BINS)
+    codes[~np.isfinite(bmi)] = -1
+    return bmi, codes
+
+
+def score_batch(weight, height) -> tuple[np.ndarray, np.ndarray]:
+    """Vectorized cal_bmi + label: (bmi, label) arrays, label is None for a zero or missing height."""
+    bmi, codes = bmi_codes(weight, height)
+    labels = BMI_LABELS[codes]
+    labels[codes < 0] = None
+    return bmi, labels
+
+
+def score_frame(frame):
+    """Adds `bmi` and `label` columns to a pandas DataFrame with `weight` and `height` columns."""
+    import pandas as pd
+
+    bmi, codes = bmi_codes(frame['weight'].to_numpy(), frame['height'].to_numpy())
+    return frame.assign(bmi=bmi, label=pd.Categorical.from_codes(codes, BMI_LABELS))
+
+
+def _score_record_batch(batch):
+    import pyarrow as pa
+
+    batch = batch.drop_columns([name for name in ('bmi', 'label') if name in batch.schema.names])
+
+    bmi, codes = bmi_codes(batch.column('weight').to_numpy(zero_copy_only=False),
+                           batch.column('height').to_numpy(zero_copy_only=False))
+    labels = pa.DictionaryArray.from_arrays(pa.array(codes, type=pa.int8(), mask=codes < 0),
+                                            pa.array(BMI_LABELS, type=pa.string()))
+    return batch.append_column('bmi', pa.array(bmi)).append_column('label', labels)
+
+
+def _read_batches(path: str, chunk_rows: int):
+    import pyarrow.csv as pacsv
+    import pyarrow.parquet as pq
+
+    if path.endswith('.parquet'):
+        yield from pq.ParquetFile(path).iter_batches(batch_size=chunk_rows)
+        return
+    # csv is read by blocks of bytes, ~16 bytes per "weight,height" row
+    with pacsv.open_csv(path, read_options=pacsv.ReadOptions(block_size=chunk_rows * 16)) as reader:
+        yield from reader
+
+
+def score_file(source: str, target: str, chunk_rows: int = CHUNK_ROWS) -> int:
+    """Stream a CSV/Parquet file with weight and height columns into `target` with bmi and label added.
+
+    The output format follows the target extension (.parquet or .csv). Returns the number of rows.
+    """
+    import pyarrow.csv as pacsv
+    import pyarrow.parquet as pq
+
+    parquet = target.endswith('.parquet')
+    writer, rows = None, 0
+    try:
+        for batch in _read_batches(source, chunk_rows):
+            scored = _score_record_batch(batch)
+            if not parquet:
+                # csv has no dictionary type, labels are written as plain strings
+                scored = scored.set_column(scored.num_columns - 1, 'label', scored.column('label').dictionary_decode())
+            if writer is None:
+                writer = (pq.ParquetWriter if parquet else pacsv.CSVWriter)(target, scored.schema)
+            writer.write_batch(scored)
+            rows += scored.num_rows
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
 
 #Execute the graph
-userinput= float(input("weight in kg: "))
-userinput_for_height = float(input("height in meters: "))
-initial_state = {'weight': userinput, 'height': userinput_for_height }
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="BMI and its category, for one person or a whole file.")
+    parser.add_argument('source', nargs='?', help="CSV/Parquet file with weight and height columns (batch mode)")
+    parser.add_argument('target', nargs='?', help="where to write the scored rows (.csv or .parquet)")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+
+    if args.source:
+        if not args.target:
+            parser.error("batch mode needs a target file")
+        print(f"{score_file(args.source, args.target, args.chunk_rows)} rows written to {args.target}")
+    else:
+        userinput= float(input("weight in kg: "))
+        userinput_for_height = float(input("height in meters: "))
+        initial_state = {'weight': userinput, 'height': userinput_for_height }
 
-final_state = workflow.invoke(initial_state)
+        final_state = workflow.invoke(initial_state)
 
-print(final_state)
\ No newline at end of file
+        print(final_state)
\ No newline at end of file
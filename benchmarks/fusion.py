@@ -0,0 +1,87 @@
+"""Per-invocation overhead and checkpoint count with and without node fusion.
+
+basics/first.py (cal_bmi -> label) and todo/test.py (summarize -> compare ->
+execute, offline fake model) are compiled from the same StateGraph twice,
+as written and through common.fusion.fuse, and invoked without a
+checkpointer, with InMemorySaver and with SqliteSaver:
+
+    python benchmarks/fusion.py --runs 2000
+"""
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import time
+from typing import Callable
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langgraph.checkpoint.memory import InMemorySaver
+
+from benchmarks.graphs import todo_reply
+from common.fake_llm import FakeLLM
+from common.fusion import fuse
+from common.loader import load_script
+from common.sqlite_saver import SqliteSaver
+
+SAVERS: dict[str, Callable] = {
+    "none": lambda: None,
+    "InMemorySaver": InMemorySaver,
+    "SqliteSaver": lambda: SqliteSaver(":memory:"),
+}
+
+
+def bmi():
+    mod = load_script("basics/first.py")
+    return mod.graph, lambda i: {"weight": 50 + i % 70, "height": 1.5 + (i % 50) / 100}
+
+
+def todo():
+    mod = load_script("todo/test.py")
+    mod.model = FakeLLM(reply=todo_reply)
+    store = mod.TaskStore(":memory:", legacy_path=None)
+    mod.task_store = lambda: store
+    return mod.graph, lambda i: {"userInput": f"I bought groceries and need to call person {i}"}
+
+
+GRAPHS = {"bmi": bmi, "todo": todo}
+
+
+def measure(builder, make_input, fused: bool, saver, runs: int) -> dict:
+    workflow = fuse(builder, enabled=fused).compile(checkpointer=saver)
+    durations, checkpoints = [], 0
+    for i in range(runs):
+        config = {"configurable": {"thread_id": f"run-{i}"}}
+        start = time.perf_counter()
+        final = workflow.invoke(make_input(i), config)
+        durations.append(time.perf_counter() - start)
+        if saver is not None:
+            checkpoints += sum(1 for _ in saver.list(config))
+    return {"final": final, "us": statistics.median(durations) * 1e6, "checkpoints": checkpoints / runs}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Node fusion: overhead and checkpoints per invocation.")
+    parser.add_argument("--runs", type=int, default=2000)
+    parser.add_argument("--graphs", nargs="+", choices=list(GRAPHS), default=list(GRAPHS))
+    args = parser.parse_args()
+
+    print(f"{'graph':<6} {'saver':<14} {'nodes':>6} {'us/invoke':>10} {'fused us':>9} {'saved':>6} "
+          f"{'checkpoints':>12} {'fused':>6}")
+    for graph in args.graphs:
+        builder, make_input = GRAPHS[graph]()
+        for saver_name, make_saver in SAVERS.items():
+            # todo/test.py prints the raw model output on every run
+            with contextlib.redirect_stdout(io.StringIO()):
+                plain = measure(builder, make_input, False, make_saver(), args.runs)
+                fused = measure(builder, make_input, True, make_saver(), args.runs)
+            assert plain["final"] == fused["final"], "fused graph ended in a different state"
+            saved = 1 - fused["us"] / plain["us"]
+            print(f"{graph:<6} {saver_name:<14} {len(builder.nodes):>6} {plain['us']:>10.0f} {fused['us']:>9.0f} "
+                  f"{saved:>6.0%} {plain['checkpoints']:>12.1f} {fused['checkpoints']:>6.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""The repo's graphs, set up to run offline for benchmarks/suite.py.
+
+Every workflow script builds its Gemini client at import time, so each entry
+here loads the script with `load_script`, swaps the module level model(s) for
+the fakes it is given and returns a `Bench`: the compiled graph plus how to
+build the input and config of run `i`. Fake outputs are derived from the
+prompt, so runs are reproducible.
+"""
+import hashlib
+import json
+import os
+import re
+import sys
+import tempfile
+from dataclasses import dataclass
+from typing import Any, Callable
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.messages import HumanMessage, SystemMessage
+from langgraph.checkpoint.memory import InMemorySaver
+
+from common.fake_llm import FakeChatModel, FakeLLM, default_structured
+from common.loader import load_script
+
+
+@dataclass
+class Bench:
+    workflow: Any
+    make_input: Callable[[int], dict]
+    make_config: Callable[[int], dict] = lambda i: {}
+    # the fake models the graph calls, for the call counts in the results
+    models: tuple = ()
+
+
+def one_in(prompt: str, n: int) -> bool:
+    """Deterministic pseudo random choice keyed by the prompt."""
+    return int(hashlib.sha1(prompt.encode()).hexdigest()[:8], 16) % n == 0
+
+
+def ai_workflow(chat: FakeChatModel, llm: FakeLLM) -> Bench:
+    mod = load_script("basics/ai_workflow.py")
+    mod.model = chat
+    return Bench(mod.workflow, lambda i: {"title": f"document {i}"}, models=(chat,))
+
+
+def basic_evaluation(chat: FakeChatModel, llm: FakeLLM) -> Bench:
+    mod = load_script("basics-parallel/basic-evaluation.py")
+    mod.model = llm
+    return Bench(mod.workflow, lambda i: {"userInput": f"question {i} about photosynthesis"}, models=(llm,))
+
+
+def review_structured(schema, prompt):
+    # like conditional-parallel/benchmark.py: the negative reviews mention "crash"
+    result = default_structured(schema, prompt)
+    if "sentiment" in schema.model_fields:
+        result.sentiment = "negative" if "crash" in prompt else "positive"
+    return result
+
+
+def review(i: int) -> dict:
+    return {"review": f"review {i}: the app crashes on login" if i % 3 else f"review {i}: love the new dark mode"}
+
+
+def replyingbot(chat: FakeChatModel, llm: FakeLLM, fused: bool = False) -> Bench:
+    mod = load_script("conditional-parallel/replyingbot.py")
+    chat.structured = review_structured
+    mod.model = chat
+    mod.sentimentModal = chat.with_structured_output(mod.sentimentState)
+    mod.diagnosisModal = chat.with_structured_output(mod.DiagnosisSchema)
+    mod.triageModal = chat.with_structured_output(mod.ReviewTriageSchema)
+    workflow = mod.fused_workflow if fused else mod.two_stage_workflow
+    return Bench(workflow, review, models=(chat,))
+
+
+def tweet_structured(schema, prompt):
+    # roughly one tweet in three is approved, so the optimize loop gets exercised
+    if "evaluations" in schema.model_fields:
+        item = schema.model_fields["evaluations"].annotation.__args__[0]
+        candidates = re.findall(r"^Candidate (\d+): (.*)$", prompt, re.MULTILINE)
+        return schema(evaluations=[
+            item(candidate=int(number), evaluation="approved" if one_in(tweet, 3) else "needs_improvement",
+                 score=int(hashlib.sha1(tweet.encode()).hexdigest()[:2], 16) % 10 + 1, feedback="fake feedback")
+            for number, tweet in candidates
+        ])
+    result = default_structured(schema, prompt)
+    result.evaluation = "approved" if one_in(prompt, 3) else "needs_improvement"
+    return result
+
+
+def x_tweet(chat: FakeChatModel, llm: FakeLLM, candidates: int = 1) -> Bench:
+    mod = load_script("iterative-workflow/x_tweet.py")
+    chat.structured = tweet_structured
+    mod.generator_llm = mod.evaluator_llm = mod.optimizer_llm = chat
+    mod.structured_evaluator_llm = chat.with_structured_output(mod.TweetEvaluation)
+    mod.structured_batch_evaluator_llm = chat.with_structured_output(mod.BatchTweetEvaluation)
+    workflow = mod.build_graph(candidates)
+    return Bench(workflow, lambda i: {"topic": f"topic {i}", "iteration": 1, "max_iteration": 5}, models=(chat,))
+
+
+CHAT_INPUTS = [
+    "how do I reverse a list in python?",
+    "tell me more about generators",
+    "hmm ok interesting",
+    "thanks, bye",
+]
+
+
+def iterative_chat(chat: FakeChatModel, llm: FakeLLM) -> Bench:
+    mod = load_script("iterative-workflow/chat.py")
+    mod.model = chat
+    mod.sentimentModel = chat.with_structured_output(mod.SentimentAnalysisResult)
+
+    def make_input(i: int) -> dict:
+        return {
+            'user_input': CHAT_INPUTS[i % len(CHAT_INPUTS)],
+            'messages': [SystemMessage(content="You are a helpful AI assistant. Answer the user's questions clearly and concisely.")],
+            'response': '',
+            'sentiment': 'continue',
+            'summary': '',
+            'summarized': 0,
+            'replied': False,
+        }
+
+    return Bench(mod.workflow, make_input, models=(chat,))
+
+
+def todo_reply(prompt: str) -> str:
+    count = len(prompt) % 4 + 2
+    return "```json\n" + json.dumps([
+        {"taskid": f"T{i}", "title": f"task {i}", "description": f"do thing {i}", "due_date": None,
+         "priority": None, "category": "personal", "status": "havent started"}
+        for i in range(count)
+    ]) + "\n```"
+
+
+def todo(chat: FakeChatModel, llm: FakeLLM) -> Bench:
+    mod = load_script("todo/test.py")
+    llm.reply = todo_reply
+    mod.model = llm
+    # the script's own shared store, on a fresh file, so every run hits the real SQLite writes
+    mod.TODO_DB = os.path.join(tempfile.mkdtemp(prefix="todo-bench-"), "tasks.sqlite")
+    mod._store = mod.TaskStore(mod.TODO_DB, legacy_path=None)
+    return Bench(mod.workflow, lambda i: {"userInput": f"I bought groceries and need to call person {i}"}, models=(llm,))
+
+
+def ui_chatbot(chat: FakeChatModel, llm: FakeLLM) -> Bench:
+    os.environ["CHATBOT_DB"] = "memory"
+    mod = load_script("q - chatbot/ui/backend.py")
+    mod.llm = chat
+    return Bench(
+        mod.build_chatbot(InMemorySaver()),
+        lambda i: {"messages": [HumanMessage(content=f"question {i}: what is a closure?")]},
+        lambda i: {"configurable": {"thread_id": f"bench-{i}"}},
+        models=(chat,),
+    )
+
+
+GRAPHS: dict[str, Callable[[FakeChatModel, FakeLLM], Bench]] = {
+    "ai_workflow": ai_workflow,
+    "basic_evaluation": basic_evaluation,
+    "replyingbot": replyingbot,
+    "replyingbot_fused": lambda chat, llm: replyingbot(chat, llm, fused=True),
+    "x_tweet": x_tweet,
+    "x_tweet_best_of_3": lambda chat, llm: x_tweet(chat, llm, candidates=3),
+    "chat": iterative_chat,
+    "todo": todo,
+    "ui_chatbot": ui_chatbot,
+}
@@ -0,0 +1,83 @@
+"""Tail latency with and without hedged model calls on a heavy-tailed provider.
+
+Runs conditional-parallel/replyingbot.py over `--reviews` reviews,
+`--concurrency` graphs at a time, against a fake model where `--tail-share`
+of the calls take `--tail` seconds instead of about `--latency`:
+
+    python benchmarks/hedging.py --reviews 2000 --tail-share 0.03
+
+A hedged call that outlives the observed quantile gets a duplicate and
+returns with whichever answers first, so a stuck call costs roughly one
+quantile plus one median instead of the whole tail.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.graphs import review, review_structured
+from common.fake_llm import FakeChatModel, heavy_tail
+from common.hedging import LatencyRegistry, hedged
+from common.loader import load_script
+
+
+def run(quantile: float, args) -> dict:
+    bot = load_script("conditional-parallel/replyingbot.py")
+    fake = FakeChatModel(latency=heavy_tail(args.latency, args.tail, args.tail_share), structured=review_structured)
+    registry = LatencyRegistry()
+    # quantile 0 never hedges, the model histogram is still recorded
+    model = hedged(fake, registry=registry, quantile=quantile, budget=args.budget)
+    bot.model = model
+    bot.sentimentModal = model.with_structured_output(bot.sentimentState)
+    bot.diagnosisModal = model.with_structured_output(bot.DiagnosisSchema)
+    workflow = bot.two_stage_workflow
+
+    def timed(i: int) -> float:
+        start = time.perf_counter()
+        workflow.invoke(review(i))
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        latencies = list(pool.map(timed, range(args.reviews)))
+    cuts = statistics.quantiles(latencies, n=1000, method="inclusive")
+    metrics = registry.metrics()[f"model:{fake.model}"]
+    return {
+        "p50_s": cuts[499],
+        "p95_s": cuts[949],
+        "p99_s": cuts[989],
+        "p999_s": cuts[998],
+        "calls_per_review": fake.calls / args.reviews,
+        "hedge_rate": metrics["hedge_rate"],
+        "hedge_wins": metrics["hedge_wins"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hedged model calls on a heavy-tailed provider.")
+    parser.add_argument("--reviews", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--latency", type=float, default=0.05, help="median fake model latency in seconds")
+    parser.add_argument("--tail", type=float, default=1.0, help="latency of a tail call in seconds")
+    parser.add_argument("--tail-share", type=float, default=0.03, help="share of calls that hit the tail")
+    parser.add_argument("--quantiles", type=float, nargs="+", default=[0.9, 0.95])
+    parser.add_argument("--budget", type=float, default=0.1, help="max share of calls that may be hedged")
+    args = parser.parse_args()
+
+    print(f"{args.reviews} reviews, concurrency {args.concurrency}, model latency ~{args.latency}s, "
+          f"{args.tail_share:.0%} of calls take {args.tail}s\n")
+    print(f"{'mode':<14} {'p50 s':>7} {'p95 s':>7} {'p99 s':>7} {'p99.9 s':>8} {'calls/review':>13} "
+          f"{'hedged':>7} {'won':>5}")
+    for quantile in (0.0, *args.quantiles):
+        result = run(quantile, args)
+        mode = f"hedge at p{quantile * 100:g}" if quantile else "plain"
+        print(f"{mode:<14} {result['p50_s']:>7.3f} {result['p95_s']:>7.3f} {result['p99_s']:>7.3f} "
+              f"{result['p999_s']:>8.3f} {result['calls_per_review']:>13.2f} {result['hedge_rate']:>7.1%} "
+              f"{result['hedge_wins']:>5}")
+
+
+if __name__ == "__main__":
+    main()
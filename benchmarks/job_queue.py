@@ -0,0 +1,112 @@
+"""Throughput of the SQLite job queue with 1-16 worker processes.
+
+Every worker loads conditional-parallel/replyingbot.py once with a fake model
+(lognormal latency around `--latency`) and pulls review jobs from the queue:
+
+    python benchmarks/job_queue.py --workers 1 2 4 8 16 --jobs-per-worker 25
+
+Each worker count runs once without a checkpointer and once with a shared
+SqliteSaver. `--crash` then SIGKILLs half of a running pool and checks
+that every job still completes, the interrupted ones resumed from their
+checkpoints.
+"""
+import argparse
+import os
+import signal
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.graphs import review, review_structured
+from common.fake_llm import FakeChatModel, lognormal
+from common.job_queue import JobQueue, WorkerPool
+from common.loader import load_script
+
+TARGET = "benchmarks.job_queue:fake_replyingbot"
+
+
+def fake_replyingbot():
+    """replyingbot's two-stage graph on a fake model, loaded once per worker process."""
+    bot = load_script("conditional-parallel/replyingbot.py")
+    latency = float(os.environ.get("JOB_BENCH_LATENCY", "0.05"))
+    model = FakeChatModel(latency=lognormal(latency, 0.3), structured=review_structured)
+    bot.model = model
+    bot.sentimentModal = model.with_structured_output(bot.sentimentState)
+    bot.diagnosisModal = model.with_structured_output(bot.DiagnosisSchema)
+    return bot.two_stage_workflow
+
+
+def wait_done(jobs: JobQueue, total: int, timeout: float = 600):
+    deadline = time.monotonic() + timeout
+    while True:
+        stats = jobs.stats()
+        if stats["done"] + stats["failed"] >= total:
+            return stats
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"jobs still pending: {stats}")
+        time.sleep(0.02)
+
+
+def measure(tmp: str, workers: int, jobs_count: int, checkpoints: bool) -> dict:
+    path = os.path.join(tmp, f"jobs-{workers}-{checkpoints}.sqlite")
+    saver = os.path.join(tmp, f"checkpoints-{workers}.sqlite") if checkpoints else None
+    with WorkerPool(TARGET, path, workers, checkpoints=saver), JobQueue(path) as jobs:
+        start = time.perf_counter()
+        jobs.submit_many(review(i) for i in range(jobs_count))
+        stats = wait_done(jobs, jobs_count)
+        wall = time.perf_counter() - start
+        turnaround = [row[0] for row in jobs.conn.execute("SELECT finished_at - created_at FROM jobs")]
+    assert stats["done"] == jobs_count, stats
+    return {"jobs_s": jobs_count / wall, "p50_s": statistics.median(turnaround), "wall_s": wall}
+
+
+def crash(tmp: str, workers: int, jobs_count: int, visibility_timeout: float):
+    path, saver = os.path.join(tmp, "crash.sqlite"), os.path.join(tmp, "crash-checkpoints.sqlite")
+    # slow enough that a kill lands mid-graph
+    os.environ["JOB_BENCH_LATENCY"] = "0.3"
+    pool = WorkerPool(TARGET, path, workers, checkpoints=saver, visibility_timeout=visibility_timeout).start()
+    with JobQueue(path) as jobs:
+        ids = jobs.submit_many(review(i) for i in range(jobs_count))
+        time.sleep(1.0)
+        victims = pool.pids[: workers // 2]
+        for pid in victims:
+            os.kill(pid, signal.SIGKILL)
+        stats = wait_done(jobs, jobs_count)
+        results = [jobs.result(job_id) for job_id in ids]
+    pool.stop()
+    assert stats["done"] == jobs_count and all(result.get("response") for result in results), stats
+    print(f"\ncrash: killed {len(victims)} of {workers} workers mid-run, {pool.restarts} restarted; "
+          f"{stats['done']}/{jobs_count} jobs done, {stats['redelivered']} redelivered after the "
+          f"{visibility_timeout}s visibility timeout, {stats['resumed']} resumed from a checkpoint")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite job queue throughput with N worker processes.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--jobs-per-worker", type=int, default=25)
+    parser.add_argument("--latency", type=float, default=0.05, help="median fake model latency in seconds")
+    parser.add_argument("--crash", action="store_true", help="also kill workers mid-run and check recovery")
+    args = parser.parse_args()
+
+    os.environ["JOB_BENCH_LATENCY"] = str(args.latency)
+    print(f"replyingbot jobs, fake model ~{args.latency}s per call, {os.cpu_count()} CPU(s)\n")
+    print(f"{'workers':>7} {'jobs':>5} {'jobs/s':>8} {'speedup':>8} {'p50 s':>7} "
+          f"{'+checkpoints jobs/s':>20} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        baseline = {}
+        for workers in args.workers:
+            count = workers * args.jobs_per_worker
+            plain = measure(tmp, workers, count, checkpoints=False)
+            saved = measure(tmp, workers, count, checkpoints=True)
+            baseline = baseline or {"plain": plain["jobs_s"], "saved": saved["jobs_s"]}
+            print(f"{workers:>7} {count:>5} {plain['jobs_s']:>8.1f} {plain['jobs_s'] / baseline['plain']:>7.1f}x "
+                  f"{plain['p50_s']:>7.2f} {saved['jobs_s']:>20.1f} {saved['jobs_s'] / baseline['saved']:>7.1f}x")
+        if args.crash:
+            crash(tmp, workers=4, jobs_count=40, visibility_timeout=2.0)
+
+
+if __name__ == "__main__":
+    main()
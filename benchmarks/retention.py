@@ -0,0 +1,144 @@
+"""Checkpoint retention: storage size and time-travel lookup on threads with 10k checkpoints.
+
+Runs the joke workflow from persistance/10_persistence.ipynb (offline fake
+model) on one thread until it holds `--checkpoints` checkpoints, once per
+retention policy and saver, then measures what is left:
+
+    python benchmarks/retention.py --checkpoints 10000
+
+"scan" finds a checkpoint the way the notebook does, walking
+`get_state_history` until the id matches; "indexed" is `locate(id)` on the
+RetentionSaver followed by `get_state`.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from typing import TypedDict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph import END, START, StateGraph
+
+from common.fake_llm import FakeChatModel
+from common.retention import Retention, RetentionSaver
+from common.sqlite_saver import SqliteSaver
+
+POLICIES = {
+    "keep all": Retention(),
+    "keep last 100": Retention(keep_last=100),
+    "final only": Retention(final_only=True),
+}
+
+
+class JokeState(TypedDict):
+    topic: str
+    joke: str
+    explanation: str
+
+
+def build_workflow(llm, checkpointer):
+    def generate_joke(state: JokeState):
+        return {'joke': llm.invoke(f'generate a joke on the topic {state["topic"]}').content}
+
+    def generate_explanation(state: JokeState):
+        return {'explanation': llm.invoke(f'write an explanation for the joke - {state["joke"]}').content}
+
+    graph = StateGraph(JokeState)
+    graph.add_node('generate_joke', generate_joke)
+    graph.add_node('generate_explanation', generate_explanation)
+    graph.add_edge(START, 'generate_joke')
+    graph.add_edge('generate_joke', 'generate_explanation')
+    graph.add_edge('generate_explanation', END)
+    return graph.compile(checkpointer=checkpointer)
+
+
+def in_memory_size(saver: InMemorySaver) -> int:
+    size = sum(len(value) for _, value in saver.blobs.values())
+    for namespaces in saver.storage.values():
+        for checkpoints in namespaces.values():
+            for checkpoint, metadata, _ in checkpoints.values():
+                size += len(checkpoint[1]) + len(metadata[1])
+    for writes in saver.writes.values():
+        size += sum(len(value[1]) for _, _, value, _ in writes.values())
+    return size
+
+
+def scan(workflow, config, checkpoint_id: str):
+    for snapshot in workflow.get_state_history(config):
+        if snapshot.config['configurable']['checkpoint_id'] == checkpoint_id:
+            return snapshot
+    return None
+
+
+def timed(fn, items) -> float:
+    """Median ms per call."""
+    durations = []
+    for item in items:
+        start = time.perf_counter()
+        assert fn(item) is not None
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations) * 1000
+
+
+def measure(inner, retention: Retention, checkpoints: int, scans: int, lookups: int, interval: float) -> dict:
+    saver = RetentionSaver(inner, retention, interval=interval)
+    workflow = build_workflow(FakeChatModel(), saver)
+    config = {'configurable': {'thread_id': 'bench'}}
+
+    start = time.perf_counter()
+    written = 0
+    while written < checkpoints:
+        workflow.invoke({'topic': f'topic {written}'}, config)
+        # input, generate_joke, generate_explanation and the final state
+        written += 4
+    run_s = time.perf_counter() - start
+    start = time.perf_counter()
+    saver.compact()
+    compact_ms = (time.perf_counter() - start) * 1000
+
+    if isinstance(inner, SqliteSaver):
+        inner.vacuum()
+        size = inner.size_bytes()
+    else:
+        size = in_memory_size(inner)
+    ids = list(saver._by_id)
+    targets = random.Random(0).choices(ids, k=max(scans, lookups))
+    scan_ms = timed(lambda checkpoint_id: scan(workflow, config, checkpoint_id), targets[:scans])
+    indexed_ms = timed(lambda checkpoint_id: workflow.get_state(saver.locate(checkpoint_id)), targets[:lookups])
+    saver.close()
+    return {
+        'written': written, 'kept': len(ids), 'run_s': run_s, 'compacted': saver.compacted,
+        'compact_ms': compact_ms, 'size_kb': size / 1024, 'scan_ms': scan_ms, 'indexed_ms': indexed_ms,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Checkpoint retention and indexed lookup.")
+    parser.add_argument("--checkpoints", type=int, default=10000)
+    parser.add_argument("--scans", type=int, default=10, help="history scans per measurement (they are slow)")
+    parser.add_argument("--lookups", type=int, default=200)
+    parser.add_argument("--interval", type=float, default=0.5, help="background compaction interval in seconds")
+    args = parser.parse_args()
+
+    print(f"{args.checkpoints} checkpoints on one thread\n")
+    print(f"{'saver':<14} {'policy':<14} {'kept':>6} {'run s':>6} {'compacted':>9} {'last pass ms':>12} "
+          f"{'size KiB':>9} {'scan ms':>8} {'indexed ms':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, policy in POLICIES.items():
+            savers = {
+                'InMemorySaver': InMemorySaver(),
+                'SqliteSaver': SqliteSaver(os.path.join(tmp, f'{len(os.listdir(tmp))}.sqlite')),
+            }
+            for saver_name, inner in savers.items():
+                r = measure(inner, policy, args.checkpoints, args.scans, args.lookups, args.interval)
+                print(f"{saver_name:<14} {name:<14} {r['kept']:>6} {r['run_s']:>6.1f} {r['compacted']:>9} "
+                      f"{r['compact_ms']:>12.1f} {r['size_kb']:>9.0f} {r['scan_ms']:>8.2f} {r['indexed_ms']:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
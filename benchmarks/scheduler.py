@@ -0,0 +1,119 @@
+"""Shared LLM scheduler vs unscheduled calls against a rate limited fake provider.
+
+The fake provider answers 429 once more than `--quota` calls started within
+the last second. A burst of batch calls (think triage.py) and a trickle of
+interactive chat calls hit it at the same time:
+
+    python benchmarks/scheduler.py --batch 120 --interactive 10 --quota 20
+
+Unscheduled, whatever exceeds the quota fails outright. Scheduled at
+`--rps` just under the quota, nothing fails and the interactive calls skip
+ahead of the batch queue.
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.fake_llm import FakeChatModel
+from common.scheduler import Limits, LLMScheduler, priority, scheduled
+
+
+class QuotaExceeded(Exception):
+    status_code = 429
+
+
+class Provider:
+    """Sliding one second window shared by every client of the fake provider."""
+
+    def __init__(self, quota: int):
+        self.quota = quota
+        self.started: deque[float] = deque()
+        self.lock = threading.Lock()
+        self.rejected = 0
+
+    def admit(self):
+        now = time.monotonic()
+        with self.lock:
+            while self.started and now - self.started[0] > 1.0:
+                self.started.popleft()
+            if len(self.started) >= self.quota:
+                self.rejected += 1
+                raise QuotaExceeded("429 RESOURCE_EXHAUSTED: quota exceeded")
+            self.started.append(now)
+
+
+class RateLimitedModel(FakeChatModel):
+    provider: Provider
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.provider.admit()
+        return super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+
+def run(model, batch: int, interactive: int) -> dict:
+    outcomes = {"batch": [], "interactive": []}
+    failures = {"batch": 0, "interactive": 0}
+
+    def call(kind: str, i: int):
+        start = time.perf_counter()
+        try:
+            with priority(kind):
+                model.invoke(f"{kind} request {i}")
+            outcomes[kind].append(time.perf_counter() - start)
+        except Exception:
+            failures[kind] += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(batch + interactive) as pool:
+        for i in range(batch):
+            pool.submit(call, "batch", i)
+        # chat users arrive while the batch is already queued
+        time.sleep(0.05)
+        for i in range(interactive):
+            pool.submit(call, "interactive", i)
+    return {"wall_s": time.perf_counter() - start, "latencies": outcomes, "failures": failures}
+
+
+def describe(latencies: list[float]) -> str:
+    if not latencies:
+        return f"{'-':>9} {'-':>9}"
+    return f"{statistics.median(latencies):>8.2f}s {max(latencies):>8.2f}s"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared LLM scheduler vs unscheduled calls.")
+    parser.add_argument("--batch", type=int, default=120)
+    parser.add_argument("--interactive", type=int, default=10)
+    parser.add_argument("--quota", type=int, default=20, help="provider calls per second before it answers 429")
+    parser.add_argument("--rps", type=float, default=18, help="scheduler token bucket rate")
+    parser.add_argument("--max-in-flight", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.2, help="fake model latency in seconds")
+    args = parser.parse_args()
+
+    rows = []
+    plain = RateLimitedModel(latency=args.latency, provider=Provider(args.quota))
+    rows.append(("unscheduled", run(plain, args.batch, args.interactive), None))
+
+    scheduler = LLMScheduler(Limits(rps=args.rps, burst=2, max_in_flight=args.max_in_flight), backoff=0.2)
+    model = scheduled(RateLimitedModel(latency=args.latency, provider=Provider(args.quota)), scheduler=scheduler)
+    rows.append(("scheduled", run(model, args.batch, args.interactive), scheduler))
+
+    print(f"{args.batch} batch + {args.interactive} interactive calls, provider quota {args.quota}/s\n")
+    print(f"{'mode':<12} {'wall s':>7} {'failed':>7} {'batch p50':>10} {'batch max':>9} {'inter p50':>10} {'inter max':>9}")
+    for mode, result, _ in rows:
+        failed = sum(result["failures"].values())
+        print(f"{mode:<12} {result['wall_s']:>7.2f} {failed:>7} {describe(result['latencies']['batch'])} "
+              f"{describe(result['latencies']['interactive'])}")
+    print("\nscheduler metrics:")
+    print(scheduler.format_metrics())
+
+
+if __name__ == "__main__":
+    main()
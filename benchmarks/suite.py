@@ -0,0 +1,176 @@
+"""Offline benchmark suite for every graph in the repo (see benchmarks/graphs.py).
+
+Runs each graph against fake models with a configurable latency distribution
+and token rate at several concurrency levels and writes JSON results:
+throughput, p50/p95/p99 latency, model calls per run and the per node
+breakdown from common/profiling.py (wall/model time, tokens, state size).
+
+    python benchmarks/suite.py run --runs 50 --concurrency 1 8 --out results.json
+    python benchmarks/suite.py run --graphs chat todo --latency lognormal --median 0.05
+    python benchmarks/suite.py compare baseline.json results.json --threshold 0.1
+
+`compare` exits with status 1 when any shared graph/concurrency pair got
+slower (or lost throughput) by more than the threshold.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.fake_llm import FakeChatModel, FakeLLM, fixed, heavy_tail, lognormal
+from common.profiling import GraphProfiler, ProfiledGraph
+from graphs import GRAPHS
+
+# metrics checked by `compare`, and whether bigger is better
+COMPARED = {"throughput_rps": True, "p50_ms": False, "p95_ms": False, "p99_ms": False}
+
+
+def make_latency(args):
+    if args.latency == "fixed":
+        return fixed(args.median)
+    if args.latency == "heavy_tail":
+        return heavy_tail(args.median, args.tail, args.tail_probability)
+    return lognormal(args.median, args.sigma)
+
+
+def percentile(cuts: list[float], p: int) -> float:
+    return 1000 * cuts[p - 1]
+
+
+def measure(name: str, concurrency: int, args) -> tuple[dict, GraphProfiler]:
+    chat = FakeChatModel(latency=make_latency(args), token_rate=args.token_rate)
+    llm = FakeLLM(latency=make_latency(args), token_rate=args.token_rate)
+    bench = GRAPHS[name](chat, llm)
+    workflow = ProfiledGraph(bench.workflow)
+
+    def run_one(i: int) -> float:
+        start = time.perf_counter()
+        workflow.invoke(bench.make_input(i), config=bench.make_config(i))
+        return time.perf_counter() - start
+
+    # the scripts print debug output from inside their nodes
+    with contextlib.redirect_stdout(io.StringIO()):
+        bench.workflow.invoke(bench.make_input(-1), config=bench.make_config(-1))  # warm up
+        for model in bench.models:
+            model.calls = 0
+        start = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            latencies = list(pool.map(run_one, range(args.runs)))
+        wall = time.perf_counter() - start
+
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "graph": name,
+        "concurrency": concurrency,
+        "runs": args.runs,
+        "wall_s": wall,
+        "throughput_rps": args.runs / wall,
+        "mean_ms": 1000 * statistics.fmean(latencies),
+        "p50_ms": percentile(cuts, 50),
+        "p95_ms": percentile(cuts, 95),
+        "p99_ms": percentile(cuts, 99),
+        "llm_calls_per_run": sum(model.calls for model in bench.models) / args.runs,
+        "nodes": workflow.profiler.summary(args.runs),
+    }, workflow.profiler
+
+
+def run(args):
+    random.seed(args.seed)
+    names = args.graphs or list(GRAPHS)
+    unknown = set(names) - set(GRAPHS)
+    if unknown:
+        sys.exit(f"unknown graphs: {', '.join(sorted(unknown))} (choose from {', '.join(GRAPHS)})")
+
+    results = []
+    print(f"{'graph':<20} {'conc':>5} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'calls':>6}  slowest node")
+    for name in names:
+        for concurrency in args.concurrency:
+            r, profiler = measure(name, concurrency, args)
+            results.append(r)
+            if args.trace_dir:
+                os.makedirs(args.trace_dir, exist_ok=True)
+                profiler.write_chrome_trace(os.path.join(args.trace_dir, f"{name}-c{concurrency}.json"))
+            slowest = next(iter(r["nodes"]), "-")
+            print(f"{name:<20} {concurrency:>5} {r['throughput_rps']:>8.1f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} "
+                  f"{r['p99_ms']:>8.1f} {r['llm_calls_per_run']:>6.1f}  {slowest}")
+
+    report = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "fake_model": {"latency": args.latency, "median_s": args.median, "sigma": args.sigma, "tail_s": args.tail,
+                           "tail_probability": args.tail_probability, "token_rate": args.token_rate},
+            "runs": args.runs,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nwrote {args.out}")
+
+
+def compare(args):
+    with open(args.baseline) as f:
+        baseline = {(r["graph"], r["concurrency"]): r for r in json.load(f)["results"]}
+    with open(args.current) as f:
+        current = {(r["graph"], r["concurrency"]): r for r in json.load(f)["results"]}
+
+    regressions = 0
+    print(f"{'graph':<20} {'conc':>5} {'metric':<15} {'baseline':>10} {'current':>10} {'change':>8}")
+    for key in sorted(baseline.keys() & current.keys()):
+        for metric, higher_is_better in COMPARED.items():
+            old, new = baseline[key][metric], current[key][metric]
+            change = (new - old) / old if old else 0.0
+            worse = -change if higher_is_better else change
+            flag = "  REGRESSION" if worse > args.threshold else ""
+            regressions += bool(flag)
+            print(f"{key[0]:<20} {key[1]:>5} {metric:<15} {old:>10.1f} {new:>10.1f} {change:>+8.1%}{flag}")
+    for key in sorted(baseline.keys() ^ current.keys()):
+        print(f"{key[0]:<20} {key[1]:>5} only in {'baseline' if key in baseline else 'current'}")
+
+    print(f"\n{regressions} regression(s) above {args.threshold:.0%}")
+    sys.exit(1 if regressions else 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark suite for the repo's graphs.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="benchmark the graphs and write JSON results")
+    run_parser.add_argument("--graphs", nargs="+", help=f"subset of: {', '.join(GRAPHS)}")
+    run_parser.add_argument("--runs", type=int, default=40, help="invocations per graph and concurrency level")
+    run_parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8])
+    run_parser.add_argument("--latency", choices=["fixed", "lognormal", "heavy_tail"], default="lognormal")
+    run_parser.add_argument("--median", type=float, default=0.02, help="median fake model latency in seconds")
+    run_parser.add_argument("--sigma", type=float, default=0.5, help="lognormal spread")
+    run_parser.add_argument("--tail", type=float, default=0.5, help="heavy_tail slow call latency in seconds")
+    run_parser.add_argument("--tail-probability", type=float, default=0.05)
+    run_parser.add_argument("--token-rate", type=float, default=0.0, help="fake output tokens/sec, 0 for instant")
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--out", help="write the JSON results here")
+    run_parser.add_argument("--trace-dir", help="also write a Chrome trace per graph and concurrency level here")
+    run_parser.set_defaults(func=run)
+
+    compare_parser = commands.add_parser("compare", help="flag regressions between two result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.10, help="allowed relative slowdown")
+    compare_parser.set_defaults(func=compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+# shared helpers used by the workflows and their benchmarks
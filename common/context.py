@@ -0,0 +1,134 @@
+import os
+from typing import Literal
+
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+from langchain_core.messages.utils import count_tokens_approximately, trim_messages
+
+
+ContextMode = Literal["all", "last_k", "summary", "budget"]
+
+# defaults for the chat graphs, override with environment variables
+CONTEXT_MODE: ContextMode = os.getenv("CONTEXT_MODE", "budget")
+CONTEXT_LAST_K = int(os.getenv("CONTEXT_LAST_K", "6"))
+CONTEXT_MAX_TOKENS = int(os.getenv("CONTEXT_MAX_TOKENS", "8000"))
+
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+
+
+def split_system(messages: list[BaseMessage]) -> tuple[list[BaseMessage], list[BaseMessage]]:
+    """Leading system messages (always kept) and the conversation after them."""
+    i = 0
+    while i < len(messages) and isinstance(messages[i], SystemMessage):
+        i += 1
+    return messages[:i], messages[i:]
+
+
+def turn_starts(messages: list[BaseMessage]) -> list[int]:
+    """Indexes where a turn (a human message and the replies to it) begins."""
+    return [i for i, message in enumerate(messages) if isinstance(message, HumanMessage)]
+
+
+def last_turns(messages: list[BaseMessage], k: int) -> list[BaseMessage]:
+    """System messages plus the last `k` turns verbatim."""
+    system, conversation = split_system(messages)
+    starts = turn_starts(conversation)
+    if len(starts) <= k:
+        return messages
+    return system + conversation[starts[-k]:]
+
+
+def truncate_text(message: BaseMessage, max_tokens: int) -> BaseMessage:
+    """`message` with its text cut to the last ~`max_tokens`, marked as truncated."""
+    if not isinstance(message.content, str) or count_tokens_approximately([message]) <= max_tokens:
+        return message
+    marker = "[earlier part of the message truncated]\n"
+    # count_tokens_approximately is ~4 chars a token; never below the last ~100 tokens, the
+    # question usually sits at the end and a slightly long prompt beats one without it
+    floor = 400
+    keep = min(len(message.content), max(4 * max_tokens, floor))
+    while keep > floor and count_tokens_approximately([message.model_copy(update={"content": marker + message.content[-keep:]})]) > max_tokens:
+        keep = max(floor, int(keep * 0.95))
+    return message.model_copy(update={"content": marker + message.content[-keep:]})
+
+
+def within_budget(messages: list[BaseMessage], max_tokens: int) -> list[BaseMessage]:
+    """System messages plus as many recent turns as fit in `max_tokens`.
+
+    The latest human message is always kept: when it alone is over budget it
+    is cut to the tokens left after the system messages and the replies that
+    follow it, instead of leaving a prompt without the user's question.
+    """
+    trimmed = trim_messages(
+        messages,
+        max_tokens=max_tokens,
+        token_counter=count_tokens_approximately,
+        strategy="last",
+        include_system=True,
+        start_on="human",
+    )
+    system, conversation = split_system(messages)
+    starts = turn_starts(conversation)
+    if not starts or any(message is conversation[starts[-1]] for message in trimmed):
+        return trimmed
+    last, after = conversation[starts[-1]], conversation[starts[-1] + 1:]
+    left = max_tokens - count_tokens_approximately(system + after)
+    return system + [truncate_text(last, left)] + after
+
+
+def with_summary(messages: list[BaseMessage], summary: str, summarized: int) -> list[BaseMessage]:
+    """System messages, the running summary, then everything not summarized yet."""
+    system, conversation = split_system(messages)
+    if not summary:
+        return messages
+    return system + [SystemMessage(content=SUMMARY_PREFIX + summary)] + conversation[summarized:]
+
+
+def update_summary(model, messages: list[BaseMessage], summary: str, summarized: int, keep_last: int) -> tuple[str, int]:
+    """Fold turns older than the last `keep_last` into the running summary.
+
+    `summarized` counts the conversation messages (system messages excluded)
+    already in the summary. The model is only called once at least
+    `keep_last` new turns have aged out, so the cost is amortised over several
+    turns instead of paid on each one. Returns the new (summary, summarized).
+    """
+    _, conversation = split_system(messages)
+    starts = turn_starts(conversation)
+    if len(starts) <= keep_last:
+        return summary, summarized
+    cut = starts[-keep_last]
+    if sum(1 for start in starts if summarized <= start < cut) < keep_last:
+        return summary, summarized
+
+    transcript = "\n".join(f"{message.type}: {message.content}" for message in conversation[summarized:cut])
+    prompt = (
+        "Update the running summary of a conversation with the new messages below. "
+        "Keep facts, names, decisions and open questions; drop small talk. "
+        f"Answer with the updated summary only.\n\nCurrent summary:\n{summary or '(empty)'}"
+        f"\n\nNew messages:\n{transcript}"
+    )
+    return model.invoke(prompt).content, cut
+
+
+def build_prompt(
+    messages: list[BaseMessage],
+    mode: ContextMode = CONTEXT_MODE,
+    *,
+    summary: str = "",
+    summarized: int = 0,
+    last_k: int = CONTEXT_LAST_K,
+    max_tokens: int = CONTEXT_MAX_TOKENS,
+) -> list[BaseMessage]:
+    """The messages to send to the model for this turn, system message pinned.
+
+    all     -> the whole history (old behaviour)
+    last_k  -> the last `last_k` turns verbatim
+    summary -> running summary + the turns not summarized yet
+    budget  -> the most recent turns that fit in `max_tokens`
+    """
+    if mode == "last_k":
+        return last_turns(messages, last_k)
+    if mode == "summary":
+        return with_summary(messages, summary, summarized)
+    if mode == "budget":
+        return within_budget(messages, max_tokens)
+    return messages
@@ -0,0 +1,216 @@
+import asyncio
+import hashlib
+import math
+import random
+import time
+import typing
+from typing import Any, Callable, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.language_models.llms import LLM
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableLambda
+
+
+# ---------------------------------------------------------------------------
+# latency distributions (all return seconds)
+# ---------------------------------------------------------------------------
+
+def fixed(seconds: float) -> Callable[[], float]:
+    return lambda: seconds
+
+
+def lognormal(median: float, sigma: float = 0.5) -> Callable[[], float]:
+    """Typical LLM round trip: most calls near the median, a long right tail."""
+    mu = math.log(median)
+    return lambda: random.lognormvariate(mu, sigma)
+
+
+def heavy_tail(median: float, tail: float, tail_probability: float = 0.05) -> Callable[[], float]:
+    """Mostly `median`-ish calls, but `tail_probability` of them take `tail` seconds."""
+    base = lognormal(median, 0.25)
+    return lambda: tail if random.random() < tail_probability else base()
+
+
+def _sample(latency: float | Callable[[], float]) -> float:
+    return latency() if callable(latency) else latency
+
+
+def prompt_text(value: Any) -> str:
+    """Flatten a prompt (str, message list or prompt value) to plain text."""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, BaseMessage):
+        return str(value.content)
+    if isinstance(value, (list, tuple)):
+        return "\n".join(prompt_text(item) for item in value)
+    if hasattr(value, "to_messages"):
+        return prompt_text(value.to_messages())
+    return str(value)
+
+
+def default_reply(prompt: str) -> str:
+    digest = hashlib.sha1(prompt.encode()).hexdigest()[:8]
+    return f"fake reply {digest}: " + " ".join(prompt.split()[:12])
+
+
+def default_structured(schema, prompt: str):
+    """Fill every field of a pydantic schema with a deterministic value.
+
+    Literal fields take their first option, strings get a short placeholder.
+    """
+    values = {}
+    for name, field in schema.model_fields.items():
+        annotation = field.annotation
+        if typing.get_origin(annotation) is typing.Literal:
+            values[name] = typing.get_args(annotation)[0]
+        elif annotation is int:
+            values[name] = 0
+        elif annotation is float:
+            values[name] = 0.0
+        elif annotation is bool:
+            values[name] = False
+        else:
+            values[name] = f"fake {name}"
+    return schema(**values)
+
+
+def _count_tokens(text: str) -> int:
+    return max(1, len(text.split()))
+
+
+# ---------------------------------------------------------------------------
+# fake chat model (stands in for ChatGoogleGenerativeAI)
+# ---------------------------------------------------------------------------
+
+class FakeChatModel(BaseChatModel):
+    """Offline stand-in for `ChatGoogleGenerativeAI`.
+
+    `latency` is the time to first token (a number or one of the distributions
+    above), `token_rate` the streaming speed in tokens/sec. `reply` maps the
+    prompt text to the answer and `structured` maps (schema, prompt) to a schema
+    instance for `with_structured_output`.
+    """
+
+    model: str = "fake-gemini"
+    latency: Any = 0.0
+    token_rate: float = 0.0
+    reply: Callable[[str], str] = default_reply
+    structured: Callable[[Any, str], Any] = default_structured
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    @property
+    def _identifying_params(self) -> dict:
+        return {"model": self.model}
+
+    def _message(self, messages: list[BaseMessage]) -> AIMessage:
+        self.calls += 1
+        text = prompt_text(messages)
+        content = self.reply(text)
+        usage = {
+            "input_tokens": _count_tokens(text),
+            "output_tokens": _count_tokens(content),
+            "total_tokens": _count_tokens(text) + _count_tokens(content),
+        }
+        return AIMessage(content=content, usage_metadata=usage)
+
+    def _generation_time(self, content: str) -> float:
+        delay = _sample(self.latency)
+        if self.token_rate:
+            delay += _count_tokens(content) / self.token_rate
+        return delay
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        message = self._message(messages)
+        time.sleep(self._generation_time(message.content))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        message = self._message(messages)
+        await asyncio.sleep(self._generation_time(message.content))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _chunks(self, message: AIMessage):
+        tokens = message.content.split(" ")
+        for i, token in enumerate(tokens):
+            last = i == len(tokens) - 1
+            yield ChatGenerationChunk(message=AIMessageChunk(
+                content=token if last else token + " ",
+                usage_metadata=message.usage_metadata if last else None,
+            ))
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        message = self._message(messages)
+        time.sleep(_sample(self.latency))
+        for chunk in self._chunks(message):
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+            if self.token_rate:
+                time.sleep(1 / self.token_rate)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        message = self._message(messages)
+        await asyncio.sleep(_sample(self.latency))
+        for chunk in self._chunks(message):
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+            if self.token_rate:
+                await asyncio.sleep(1 / self.token_rate)
+
+    def with_structured_output(self, schema, **kwargs):
+        def parse(prompt):
+            self.invoke(prompt)
+            return self.structured(schema, prompt_text(prompt))
+
+        async def aparse(prompt):
+            await self.ainvoke(prompt)
+            return self.structured(schema, prompt_text(prompt))
+
+        return RunnableLambda(parse, afunc=aparse, name=f"{self.model}:{schema.__name__}")
+
+
+# ---------------------------------------------------------------------------
+# fake completion model (stands in for GoogleGenerativeAI, returns plain str)
+# ---------------------------------------------------------------------------
+
+class FakeLLM(LLM):
+    """Offline stand-in for `GoogleGenerativeAI` (`invoke` returns a string)."""
+
+    model: str = "fake-gemini"
+    latency: Any = 0.0
+    token_rate: float = 0.0
+    reply: Callable[[str], str] = default_reply
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-llm"
+
+    @property
+    def _identifying_params(self) -> dict:
+        return {"model": self.model}
+
+    def _answer(self, prompt: str) -> tuple[str, float]:
+        self.calls += 1
+        content = self.reply(prompt)
+        delay = _sample(self.latency)
+        if self.token_rate:
+            delay += _count_tokens(content) / self.token_rate
+        return content, delay
+
+    def _call(self, prompt: str, stop: Optional[list[str]] = None, run_manager=None, **kwargs) -> str:
+        content, delay = self._answer(prompt)
+        time.sleep(delay)
+        return content
+
+    async def _acall(self, prompt: str, stop: Optional[list[str]] = None, run_manager=None, **kwargs) -> str:
+        content, delay = self._answer(prompt)
+        await asyncio.sleep(delay)
+        return content
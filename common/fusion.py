@@ -0,0 +1,163 @@
+import copy
+import os
+from collections import defaultdict
+from typing import Any, Callable, Optional
+
+from langgraph.graph import StateGraph
+from langgraph.types import Command
+
+# set GRAPH_FUSION=0 to compile every node as its own step (one checkpoint per node)
+GRAPH_FUSION = os.getenv("GRAPH_FUSION", "1") != "0"
+
+
+def deterministic(fn: Optional[Callable] = None, *, checkpoint: bool = False):
+    """Mark a node function as cheap, pure Python that `fuse` may merge with its neighbours.
+
+    `checkpoint=True` keeps a superstep (and so a checkpoint) right after this
+    node: a fused chain always ends with it.
+
+        @deterministic
+        def summarize_node(state): ...
+    """
+    def mark(fn: Callable) -> Callable:
+        fn._deterministic = True
+        fn._checkpoint_after = checkpoint
+        return fn
+
+    return mark(fn) if fn is not None else mark
+
+
+def _func(builder: StateGraph, name: str) -> Optional[Callable]:
+    return getattr(builder.nodes[name].runnable, "func", None)
+
+
+def _fusable(builder: StateGraph, name: str) -> bool:
+    spec = builder.nodes[name]
+    # retries, caching and deferral are per node, a fused step would change what they cover
+    return (
+        getattr(_func(builder, name), "_deterministic", False)
+        and not spec.retry_policy and not spec.cache_policy and not spec.defer
+    )
+
+
+def find_chains(builder: StateGraph) -> list[list[str]]:
+    """Maximal runs of `@deterministic` nodes joined by plain one-to-one edges."""
+    successors, predecessors = defaultdict(list), defaultdict(list)
+    for start, end in builder.edges:
+        successors[start].append(end)
+        predecessors[end].append(start)
+    branch_targets = set()
+    for branches in builder.branches.values():
+        for branch in branches.values():
+            if branch.ends is None:
+                # a router without a path map may jump anywhere, leave the graph alone
+                return []
+            branch_targets.update(branch.ends.values())
+    joins = {node for starts, end in builder.waiting_edges for node in (*starts, end)}
+
+    def linked(start: str, end: str) -> bool:
+        return (
+            start in builder.nodes and end in builder.nodes
+            and _fusable(builder, start) and _fusable(builder, end)
+            and not _func(builder, start)._checkpoint_after
+            and successors[start] == [end] and predecessors[end] == [start]
+            and start not in builder.branches and start not in joins
+            and end not in branch_targets and end not in joins
+        )
+
+    chains = []
+    for name in builder.nodes:
+        if not _fusable(builder, name) or any(linked(start, name) for start in predecessors[name]):
+            continue
+        chain = [name]
+        while successors[chain[-1]] and linked(chain[-1], successors[chain[-1]][0]):
+            chain.append(successors[chain[-1]][0])
+        if len(chain) > 1:
+            chains.append(chain)
+    return chains
+
+
+def fused_node(builder: StateGraph, chain: list[str]) -> Callable[[dict], Any]:
+    """One node function running `chain` in order with the graph's own reducer semantics.
+
+    Each node sees the state as it would after the previous node's superstep.
+    Plain channels are written once with their final value, reducer channels
+    get every intermediate write in order, so the state after the fused step
+    is the one the separate steps would have produced.
+    """
+    steps = [_func(builder, name) for name in chain]
+    reducers = {key: channel.operator for key, channel in builder.channels.items() if hasattr(channel, "operator")}
+    keys = set(builder.channels)
+    label = "+".join(chain)
+
+    def run(state: dict):
+        local = dict(state)
+        finals, reduced = {}, []
+        for step in steps:
+            update = step(dict(local))
+            if update is None:
+                continue
+            if not isinstance(update, dict):
+                raise TypeError(f"{label}: fused nodes must return a dict, got {type(update).__name__}")
+            for key, value in update.items():
+                if key not in keys:
+                    continue
+                if key in reducers:
+                    reduced.append((key, value))
+                    local[key] = reducers[key](local[key], value) if key in local else value
+                else:
+                    finals[key] = local[key] = value
+        if not reduced:
+            return finals
+        return Command(update=[*finals.items(), *reduced])
+
+    run.__name__ = label
+    return run
+
+
+def fuse(builder: StateGraph, chains: Optional[list[list[str]]] = None, enabled: bool = GRAPH_FUSION) -> StateGraph:
+    """A copy of `builder` with each chain of nodes collapsed into a single node.
+
+    Without `chains` the `@deterministic` chains are found automatically
+    (`find_chains`). A fused chain is one superstep: one set of channel writes
+    and one checkpoint instead of one per node, and the node shows up in
+    streams and traces as "a+b+c". `enabled=False` (or GRAPH_FUSION=0)
+    returns the builder untouched, for per-node checkpoints and time travel.
+    """
+    if not enabled:
+        return builder
+    chains = find_chains(builder) if chains is None else chains
+    fused = copy.copy(builder)
+    fused.nodes = dict(builder.nodes)
+    fused.edges = set(builder.edges)
+    fused.branches = defaultdict(dict, {source: dict(branches) for source, branches in builder.branches.items()})
+    fused.compiled = False
+    joins = {node for starts, end in builder.waiting_edges for node in (*starts, end)}
+    targets = {end for branches in builder.branches.values() for branch in branches.values() for end in (branch.ends or {}).values()}
+    for chain in chains:
+        for start, end in zip(chain, chain[1:]):
+            if (
+                {edge for edge in fused.edges if edge[0] == start} != {(start, end)}
+                or {edge for edge in fused.edges if edge[1] == end} != {(start, end)}
+                or start in fused.branches or end in targets or start in joins or end in joins
+            ):
+                raise ValueError(f"cannot fuse {chain}: {start} -> {end} is not a plain one-to-one edge")
+        name = "+".join(chain)
+        first, last = chain[0], chain[-1]
+        run = fused_node(builder, chain)
+        for node in chain:
+            del fused.nodes[node]
+        fused.add_node(name, run)
+        inner = set(zip(chain, chain[1:]))
+        fused.edges = {
+            (name if start == last else start, name if end == first else end)
+            for start, end in fused.edges if (start, end) not in inner
+        }
+        if last in fused.branches:
+            fused.branches[name] = fused.branches.pop(last)
+        for source, branches in fused.branches.items():
+            for key, branch in branches.items():
+                if branch.ends and first in branch.ends.values():
+                    ends = {path: name if end == first else end for path, end in branch.ends.items()}
+                    branches[key] = branch._replace(ends=ends)
+    return fused
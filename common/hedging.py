@@ -0,0 +1,420 @@
+import asyncio
+import contextvars
+import functools
+import inspect
+import math
+import os
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import Any, Callable, Optional
+
+from langgraph.config import get_config
+
+from common.scheduler import model_name
+
+# hedge a call once it has run longer than this quantile of the observed latencies
+HEDGE_QUANTILE = float(os.getenv("LLM_HEDGE_QUANTILE", "0.95"))
+# at most this share of calls may get a duplicate, hedges must not turn a slow provider into an overloaded one
+HEDGE_BUDGET = float(os.getenv("LLM_HEDGE_BUDGET", "0.1"))
+# no hedging until the histogram has this many samples
+HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+
+
+class DeadlineExceeded(TimeoutError):
+    """A node or model call ran past its timeout."""
+
+
+class LatencyHistogram:
+    """Log-bucketed latencies: 5% wide buckets from 1ms up, O(1) to record.
+
+    Quantiles are the upper edge of the bucket they fall in, so they are at
+    most 5% high. Counts are halved every `window` samples, which keeps the
+    quantiles following the provider when its latency drifts.
+    """
+
+    FLOOR = 0.001
+    GROWTH = 1.05
+
+    def __init__(self, window: int = 10_000):
+        self._lock = threading.Lock()
+        self.window = window
+        self.buckets: dict[int, float] = {}
+        self.count = 0
+        self.weight = 0.0
+        self.total = 0.0
+        self.max = 0.0
+
+    def _index(self, seconds: float) -> int:
+        return 0 if seconds <= self.FLOOR else math.ceil(math.log(seconds / self.FLOOR, self.GROWTH))
+
+    def observe(self, seconds: float):
+        index = self._index(seconds)
+        with self._lock:
+            self.buckets[index] = self.buckets.get(index, 0.0) + 1
+            self.count += 1
+            self.weight += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+            if self.weight >= self.window:
+                self.buckets = {index: count / 2 for index, count in self.buckets.items()}
+                self.weight /= 2
+
+    def quantile(self, q: float) -> Optional[float]:
+        with self._lock:
+            if not self.weight:
+                return None
+            rank, seen = q * self.weight, 0.0
+            for index in sorted(self.buckets):
+                seen += self.buckets[index]
+                if seen >= rank:
+                    return self.FLOOR * self.GROWTH ** index
+            return self.max
+
+    def snapshot(self) -> dict:
+        p50, p95, p99 = (self.quantile(q) or 0.0 for q in (0.5, 0.95, 0.99))
+        return {
+            "count": self.count,
+            "mean_ms": 1000 * self.total / self.count if self.count else 0.0,
+            "p50_ms": 1000 * p50,
+            "p95_ms": 1000 * p95,
+            "p99_ms": 1000 * p99,
+            "max_ms": 1000 * self.max,
+        }
+
+
+class _DaemonPool:
+    """Reusable daemon threads for attempts.
+
+    Unlike ThreadPoolExecutor workers they are not joined at exit, so an
+    attempt that hangs cannot keep the process alive, and a hung attempt only
+    holds its own thread: a new one is started whenever none is idle.
+    """
+
+    def __init__(self, idle_timeout: float = 60.0):
+        self._lock = threading.Lock()
+        self._jobs: queue.SimpleQueue = queue.SimpleQueue()
+        self._idle = 0
+        self.idle_timeout = idle_timeout
+
+    def _worker(self):
+        while True:
+            try:
+                job = self._jobs.get(timeout=self.idle_timeout)
+            except queue.Empty:
+                with self._lock:
+                    # a job may have been queued for this worker between the timeout and the lock
+                    if self._jobs.empty():
+                        self._idle -= 1
+                        return
+                continue
+            job()
+            with self._lock:
+                self._idle += 1
+
+    def submit(self, fn: Callable, args: tuple, kwargs: dict) -> Future:
+        future = Future()
+        future.set_running_or_notify_cancel()
+        context = contextvars.copy_context()
+
+        def job():
+            try:
+                future.set_result(context.run(fn, *args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+
+        with self._lock:
+            start = not self._idle
+            if not start:
+                self._idle -= 1
+            # queued under the lock so a worker timing out sees it before it exits
+            self._jobs.put(job)
+        if start:
+            threading.Thread(target=self._worker, daemon=True, name="hedge").start()
+        return future
+
+
+_attempts = _DaemonPool()
+
+
+class Hedger:
+    """Sends a duplicate of a call that outlives the observed latency quantile, first answer wins.
+
+    Every attempt that completes is recorded in `histogram`, losers
+    included, so hedging does not hide the tail it is measuring. Async losers
+    are cancelled. A thread cannot be stopped, so a sync loser runs to
+    completion in the background and its result is dropped. With `timeout` the
+    call raises DeadlineExceeded once that many seconds have passed, whether
+    or not an attempt is still running.
+    """
+
+    def __init__(self, histogram: LatencyHistogram, quantile: float = HEDGE_QUANTILE,
+                 budget: float = HEDGE_BUDGET, min_samples: int = HEDGE_MIN_SAMPLES):
+        self._lock = threading.Lock()
+        self.histogram = histogram
+        self.quantile = quantile
+        self.budget = budget
+        self.min_samples = min_samples
+        # metrics
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.timeouts = 0
+
+    def delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, None when this call should not be hedged."""
+        if not self.quantile or self.histogram.count < self.min_samples:
+            return None
+        return self.histogram.quantile(self.quantile)
+
+    def _take_hedge(self) -> bool:
+        with self._lock:
+            if self.hedges >= self.budget * self.calls:
+                return False
+            self.hedges += 1
+            return True
+
+    def _timed(self, fn: Callable, *args, **kwargs) -> Any:
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        self.histogram.observe(time.perf_counter() - start)
+        return result
+
+    async def _atimed(self, fn: Callable, *args, **kwargs) -> Any:
+        start = time.perf_counter()
+        result = await fn(*args, **kwargs)
+        self.histogram.observe(time.perf_counter() - start)
+        return result
+
+    def _expired(self, timeout: Optional[float]) -> DeadlineExceeded:
+        with self._lock:
+            self.timeouts += 1
+        return DeadlineExceeded(f"no answer within {timeout}s")
+
+    def call(self, fn: Callable, args: tuple = (), kwargs: Optional[dict] = None,
+             timeout: Optional[float] = None, hedge: bool = True,
+             hedge_args: Optional[Callable[[], tuple]] = None) -> Any:
+        """`fn(*args, **kwargs)` with hedging; `hedge_args` builds fresh arguments for the duplicate."""
+        kwargs = kwargs or {}
+        with self._lock:
+            self.calls += 1
+        delay = self.delay() if hedge else None
+        if delay is None and timeout is None:
+            return self._timed(fn, *args, **kwargs)
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        def remaining(cap: Optional[float] = None) -> Optional[float]:
+            left = None if deadline is None else max(0.0, deadline - time.monotonic())
+            return cap if left is None else left if cap is None else min(cap, left)
+
+        attempts = [_attempts.submit(self._timed, (fn, *args), kwargs)]
+        if delay is not None:
+            done, _ = wait(attempts, timeout=remaining(delay))
+            if not done and remaining() != 0.0 and self._take_hedge():
+                attempts.append(_attempts.submit(self._timed, (fn, *(hedge_args() if hedge_args else args)), kwargs))
+        pending, error = set(attempts), None
+        while pending:
+            done, pending = wait(pending, timeout=remaining(), return_when=FIRST_COMPLETED)
+            if not done:
+                raise self._expired(timeout)
+            for attempt in done:
+                if attempt.exception() is None:
+                    if attempt is not attempts[0]:
+                        with self._lock:
+                            self.hedge_wins += 1
+                    return attempt.result()
+                error = attempt.exception()
+        raise error
+
+    async def acall(self, fn: Callable, args: tuple = (), kwargs: Optional[dict] = None,
+                    timeout: Optional[float] = None, hedge: bool = True,
+                    hedge_args: Optional[Callable[[], tuple]] = None) -> Any:
+        kwargs = kwargs or {}
+        with self._lock:
+            self.calls += 1
+        delay = self.delay() if hedge else None
+        if delay is None and timeout is None:
+            return await self._atimed(fn, *args, **kwargs)
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+
+        def remaining(cap: Optional[float] = None) -> Optional[float]:
+            left = None if deadline is None else max(0.0, deadline - loop.time())
+            return cap if left is None else left if cap is None else min(cap, left)
+
+        attempts = [asyncio.ensure_future(self._atimed(fn, *args, **kwargs))]
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait(attempts, timeout=remaining(delay))
+                if not done and remaining() != 0.0 and self._take_hedge():
+                    hedge = hedge_args() if hedge_args else args
+                    attempts.append(asyncio.ensure_future(self._atimed(fn, *hedge, **kwargs)))
+            pending, error = set(attempts), None
+            while pending:
+                done, pending = await asyncio.wait(pending, timeout=remaining(), return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    raise self._expired(timeout)
+                for attempt in done:
+                    if attempt.exception() is None:
+                        if attempt is not attempts[0]:
+                            with self._lock:
+                                self.hedge_wins += 1
+                        return attempt.result()
+                    error = attempt.exception()
+            raise error
+        finally:
+            for attempt in attempts:
+                attempt.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "timeouts": self.timeouts,
+            "hedge_rate": round(self.hedges / self.calls, 3) if self.calls else 0.0,
+        }
+
+
+class LatencyRegistry:
+    """Latency histograms and hedgers per node ("node:<name>") and per model ("model:<name>")."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: dict[str, LatencyHistogram] = {}
+        self._hedgers: dict[str, Hedger] = {}
+
+    def histogram(self, key: str) -> LatencyHistogram:
+        with self._lock:
+            if key not in self._histograms:
+                self._histograms[key] = LatencyHistogram()
+            return self._histograms[key]
+
+    def hedger(self, key: str, **options) -> Hedger:
+        """The hedger for `key`, created with `options` on first use."""
+        histogram = self.histogram(key)
+        with self._lock:
+            if key not in self._hedgers:
+                self._hedgers[key] = Hedger(histogram, **options)
+            return self._hedgers[key]
+
+    def metrics(self) -> dict[str, dict]:
+        with self._lock:
+            histograms, hedgers = dict(self._histograms), dict(self._hedgers)
+        return {
+            key: {**histogram.snapshot(), **(hedgers[key].stats() if key in hedgers else {})}
+            for key, histogram in sorted(histograms.items())
+        }
+
+    def format_metrics(self) -> str:
+        lines = [f"{'node / model':<32} {'count':>6} {'p50':>9} {'p95':>9} {'p99':>9} {'hedges':>6} {'won':>5} {'timeouts':>8}"]
+        for key, m in self.metrics().items():
+            lines.append(f"{key:<32} {m['count']:>6} {m['p50_ms']:>7.1f}ms {m['p95_ms']:>7.1f}ms {m['p99_ms']:>7.1f}ms "
+                         f"{m.get('hedges', 0):>6} {m.get('hedge_wins', 0):>5} {m.get('timeouts', 0):>8}")
+        return "\n".join(lines)
+
+
+_shared_latencies: Optional[LatencyRegistry] = None
+
+
+def shared_latencies() -> LatencyRegistry:
+    global _shared_latencies
+    if _shared_latencies is None:
+        _shared_latencies = LatencyRegistry()
+    return _shared_latencies
+
+
+def hedged(model, timeout: Optional[float] = None, registry: Optional[LatencyRegistry] = None, **options):
+    """Hedge a model's slow provider calls and record their latency under "model:<name>".
+
+    Like `scheduled` and `coalesced` this returns the same model with its
+    generate hooks wrapped. Stack it outside `scheduled`, so a hedge takes a
+    scheduler slot like any other provider call, and inside `coalesced`, so
+    coalesced followers share the leader's hedged call:
+    `coalesced(hedged(scheduled(cached(model))))`. `timeout` bounds every call
+    (DeadlineExceeded), `options` go to Hedger (quantile, budget,
+    min_samples). Streams are not hedged. Set LLM_HEDGE=0 to leave the model
+    untouched.
+    """
+    if os.getenv("LLM_HEDGE", "1") == "0" or getattr(model, "_hedged", False):
+        return model
+    hedger = (registry or shared_latencies()).hedger(f"model:{model_name(model)}", **options)
+    generate, agenerate = model._generate, model._agenerate
+
+    def _generate(prompts, stop=None, run_manager=None, **kwargs):
+        return hedger.call(generate, (prompts,), {"stop": stop, "run_manager": run_manager, **kwargs}, timeout)
+
+    async def _agenerate(prompts, stop=None, run_manager=None, **kwargs):
+        return await hedger.acall(agenerate, (prompts,), {"stop": stop, "run_manager": run_manager, **kwargs}, timeout)
+
+    # pydantic models reject unknown attributes, set them on the instance directly
+    for attribute, value in (("_generate", _generate), ("_agenerate", _agenerate), ("_hedged", True)):
+        object.__setattr__(model, attribute, value)
+    return model
+
+
+def _node_options(name: str, timeout: Optional[float], hedge: bool) -> tuple[Optional[float], bool]:
+    """Decorator settings, overridden by `configurable.node_timeouts` / `configurable.hedge_nodes` of the run."""
+    try:
+        configurable = get_config().get("configurable", {})
+    except RuntimeError:
+        # called outside a graph run
+        return timeout, hedge
+    timeouts = configurable.get("node_timeouts") or {}
+    timeout = timeouts.get(name, timeouts.get("*", timeout))
+    hedge_nodes = configurable.get("hedge_nodes")
+    if hedge_nodes is not None:
+        hedge = name in hedge_nodes or "*" in hedge_nodes
+    return timeout, hedge
+
+
+def _node_name(fn: Callable) -> str:
+    try:
+        return get_config().get("metadata", {}).get("langgraph_node") or fn.__name__
+    except RuntimeError:
+        return fn.__name__
+
+
+def deadline(fn: Optional[Callable] = None, *, timeout: Optional[float] = None, hedge: bool = False,
+             registry: Optional[LatencyRegistry] = None, **options):
+    """Give a node a timeout and record its latency under "node:<name>".
+
+    Past `timeout` seconds the node raises DeadlineExceeded, the step fails
+    and with a checkpointer the thread resumes from the last checkpoint. A
+    sync node keeps running on its (daemon) thread, its result is dropped.
+    `hedge=True` also starts a second copy of the node once it outlives the
+    observed p95 and takes whichever finishes first; only for nodes whose
+    side effects are safe to repeat, each copy gets its own shallow copy of
+    the state. A run can override both per node name, "*" for every node:
+
+        @deadline(timeout=30)
+        def step_2(state): ...
+
+        graph.invoke(state, {"configurable": {"node_timeouts": {"step_2": 5}, "hedge_nodes": ["step_2"]}})
+    """
+    registry = registry or shared_latencies()
+
+    def wrap(fn: Callable) -> Callable:
+        def settings() -> tuple[Hedger, Optional[float], bool]:
+            name = _node_name(fn)
+            node_timeout, node_hedge = _node_options(name, timeout, hedge)
+            return registry.hedger(f"node:{name}", **options), node_timeout, node_hedge
+
+        def fresh(args: tuple) -> Callable[[], tuple]:
+            return lambda: (dict(args[0]), *args[1:]) if args and isinstance(args[0], dict) else args
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def run(*args, **kwargs):
+                hedger, node_timeout, node_hedge = settings()
+                return await hedger.acall(fn, args, kwargs, node_timeout, node_hedge, fresh(args))
+        else:
+            @functools.wraps(fn)
+            def run(*args, **kwargs):
+                hedger, node_timeout, node_hedge = settings()
+                return hedger.call(fn, args, kwargs, node_timeout, node_hedge, fresh(args))
+
+        return run
+
+    return wrap(fn) if fn is not None else wrap
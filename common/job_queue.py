@@ -0,0 +1,433 @@
+import argparse
+import importlib
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+import traceback
+import uuid
+from dataclasses import dataclass
+from typing import Any, Iterable, Optional
+
+from common.loader import load_script
+from common.sqlite_saver import SqliteSaver, ZstdSerializer
+
+# seconds a claimed job stays invisible to other workers without a heartbeat
+JOB_VISIBILITY_TIMEOUT = float(os.getenv("JOB_VISIBILITY_TIMEOUT", "60"))
+# deliveries before a job is marked failed, crashes and expired leases count too
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    queue TEXT NOT NULL,
+    thread_id TEXT NOT NULL,
+    input_type TEXT NOT NULL,
+    input BLOB,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL,
+    lease TEXT,
+    resumed INTEGER NOT NULL DEFAULT 0,
+    result_type TEXT,
+    result BLOB,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (queue, status, available_at);
+"""
+
+
+class JobFailed(RuntimeError):
+    """The job ran out of attempts, `error` holds the last traceback."""
+
+    def __init__(self, job_id: str, error: str):
+        super().__init__(f"job {job_id} failed:\n{error}")
+        self.job_id = job_id
+        self.error = error
+
+
+@dataclass
+class Job:
+    id: str
+    queue: str
+    thread_id: str
+    input: Any
+    attempts: int
+    lease: str
+
+
+class JobQueue:
+    """Durable job queue in a local SQLite file, no broker needed.
+
+        jobs = JobQueue("jobs.sqlite")
+        job_id = jobs.submit({"review": "the app crashes on login"}, queue="reviews")
+        jobs.result(job_id, timeout=60)
+
+    Delivery is at-least-once. `claim` hides a job from other workers until
+    its lease (`available_at`) runs out; the worker extends it with
+    `heartbeat` while it runs and settles it with `complete` or `fail`. A
+    worker that dies stops heartbeating, the lease expires and the job is
+    handed out again, up to `max_attempts` deliveries. Every job carries a
+    checkpointer `thread_id` (the job id unless given) so a redelivered job
+    can pick up from the graph's last checkpoint instead of starting over.
+    Inputs and results go through the same serializer as SqliteSaver, so
+    messages and other langchain objects round trip.
+    """
+
+    def __init__(self, path: str, *, visibility_timeout: float = JOB_VISIBILITY_TIMEOUT,
+                 max_attempts: int = JOB_MAX_ATTEMPTS, retry_backoff: float = 1.0):
+        self.path = path
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.serde = ZstdSerializer()
+        self._lock = threading.Lock()
+        # every worker process opens its own connection, writers wait on each other instead of failing
+        self.conn = sqlite3.connect(path, timeout=60, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+
+    def __enter__(self) -> "JobQueue":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            self.conn.close()
+
+    def _execute(self, sql: str, params: tuple = ()) -> list[tuple]:
+        with self._lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    # -- producers -----------------------------------------------------------
+
+    def submit(self, input: Any, *, queue: str = "default", thread_id: Optional[str] = None,
+               job_id: Optional[str] = None) -> str:
+        return self.submit_many([input], queue=queue, thread_ids=[thread_id], job_ids=[job_id])[0]
+
+    def submit_many(self, inputs: Iterable[Any], *, queue: str = "default",
+                    thread_ids: Optional[Iterable[Optional[str]]] = None,
+                    job_ids: Optional[Iterable[Optional[str]]] = None) -> list[str]:
+        """Enqueue several jobs in one transaction. Resubmitting an existing job id is a no-op."""
+        inputs = list(inputs)
+        thread_ids = list(thread_ids or [None] * len(inputs))
+        job_ids = [job_id or str(uuid.uuid4()) for job_id in (job_ids or [None] * len(inputs))]
+        now = time.time()
+        rows = [
+            (job_id, queue, thread_id or job_id, *self.serde.dumps_typed(input), now, now)
+            for job_id, thread_id, input in zip(job_ids, thread_ids, inputs)
+        ]
+        with self._lock, self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO jobs (id, queue, thread_id, input_type, input, available_at, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        return job_ids
+
+    def status(self, job_id: str) -> Optional[str]:
+        rows = self._execute("SELECT status FROM jobs WHERE id = ?", (job_id,))
+        return rows[0][0] if rows else None
+
+    def result(self, job_id: str, timeout: Optional[float] = None, poll: float = 0.05) -> Any:
+        """Wait for the job and return the graph's final state, or raise JobFailed / TimeoutError."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            rows = self._execute("SELECT status, result_type, result, error FROM jobs WHERE id = ?", (job_id,))
+            if not rows:
+                raise KeyError(job_id)
+            status, result_type, result, error = rows[0]
+            if status == "done":
+                return self.serde.loads_typed((result_type, result))
+            if status == "failed":
+                raise JobFailed(job_id, error)
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f"job {job_id} still {status} after {timeout}s")
+            time.sleep(poll)
+
+    def stats(self, queue: Optional[str] = None) -> dict:
+        where, params = ("WHERE queue = ?", (queue,)) if queue else ("", ())
+        counts = dict(self._execute(f"SELECT status, COUNT(*) FROM jobs {where} GROUP BY status", params))
+        redelivered, resumed = self._execute(
+            f"SELECT COALESCE(SUM(attempts > 1), 0), COALESCE(SUM(resumed), 0) FROM jobs {where}", params)[0]
+        return {
+            **{status: counts.get(status, 0) for status in ("queued", "running", "done", "failed")},
+            "redelivered": redelivered,
+            "resumed": resumed,
+        }
+
+    # -- workers ---------------------------------------------------------------
+
+    def claim(self, queue: str, worker: str) -> Optional[Job]:
+        """Lease the oldest ready job: queued, due for a retry, or running with an expired lease."""
+        now = time.time()
+        lease = f"{worker}/{uuid.uuid4().hex[:8]}"
+        rows = self._execute(
+            """
+            UPDATE jobs SET status = 'running', attempts = attempts + 1, lease = ?, available_at = ?,
+                            started_at = COALESCE(started_at, ?)
+            WHERE id = (
+                SELECT id FROM jobs
+                WHERE queue = ? AND status IN ('queued', 'running') AND available_at <= ? AND attempts < ?
+                ORDER BY available_at LIMIT 1
+            )
+            RETURNING id, thread_id, input_type, input, attempts
+            """,
+            (lease, now + self.visibility_timeout, now, queue, now, self.max_attempts),
+        )
+        if not rows:
+            self._expire(queue, now)
+            return None
+        job_id, thread_id, input_type, input, attempts = rows[0]
+        return Job(job_id, queue, thread_id, self.serde.loads_typed((input_type, input)), attempts, lease)
+
+    def _expire(self, queue: str, now: float) -> None:
+        # leases that ran out on the last attempt: the job keeps killing (or outliving) its workers
+        self._execute(
+            "UPDATE jobs SET status = 'failed', lease = NULL, finished_at = ?, "
+            "error = COALESCE(error, 'lease expired on the last attempt') "
+            "WHERE queue = ? AND status = 'running' AND available_at <= ? AND attempts >= ?",
+            (now, queue, now, self.max_attempts),
+        )
+
+    def heartbeat(self, job: Job) -> bool:
+        """Extend the lease; False once another worker owns the job."""
+        rows = self._execute(
+            "UPDATE jobs SET available_at = ? WHERE id = ? AND lease = ? AND status = 'running' RETURNING id",
+            (time.time() + self.visibility_timeout, job.id, job.lease),
+        )
+        return bool(rows)
+
+    def complete(self, job: Job, result: Any, resumed: bool = False) -> bool:
+        result_type, result_b = self.serde.dumps_typed(result)
+        rows = self._execute(
+            "UPDATE jobs SET status = 'done', lease = NULL, result_type = ?, result = ?, error = NULL, "
+            "resumed = resumed + ?, finished_at = ? WHERE id = ? AND lease = ? RETURNING id",
+            (result_type, result_b, int(resumed), time.time(), job.id, job.lease),
+        )
+        return bool(rows)
+
+    def fail(self, job: Job, error: str) -> bool:
+        """Requeue with exponential backoff, or mark failed once the attempts are used up."""
+        now = time.time()
+        if job.attempts >= self.max_attempts:
+            sql, params = ("UPDATE jobs SET status = 'failed', lease = NULL, error = ?, finished_at = ? "
+                           "WHERE id = ? AND lease = ? RETURNING id", (error, now, job.id, job.lease))
+        else:
+            retry_at = now + self.retry_backoff * 2 ** (job.attempts - 1)
+            sql, params = ("UPDATE jobs SET status = 'queued', lease = NULL, error = ?, available_at = ? "
+                           "WHERE id = ? AND lease = ? RETURNING id", (error, retry_at, job.id, job.lease))
+        return bool(self._execute(sql, params))
+
+
+def load_target(target: str):
+    """A compiled graph from "path/to/script.py:attribute" or "package.module:attribute".
+
+    A callable attribute without `invoke` is a factory and is called once.
+    """
+    location, _, attribute = target.rpartition(":")
+    if not location:
+        raise ValueError(f"target {target!r} should look like 'conditional-parallel/replyingbot.py:workflow'")
+    module = load_script(location) if location.endswith(".py") else importlib.import_module(location)
+    graph = getattr(module, attribute)
+    if callable(graph) and not hasattr(graph, "invoke"):
+        graph = graph()
+    return graph
+
+
+def run_job(workflow, job: Job) -> tuple[Any, bool]:
+    """Invoke the graph for a job: (final state, resumed from a checkpoint).
+
+    Checkpoints written for the job carry its id in their metadata. On a
+    redelivery the thread's latest checkpoint tells how far the previous
+    attempt got: a finished run is returned as is, an unfinished one
+    continues from its last superstep.
+    """
+    config = {"configurable": {"thread_id": job.thread_id}, "metadata": {"job_id": job.id}}
+    if job.attempts > 1 and workflow.checkpointer is not None:
+        state = workflow.get_state(config)
+        if (state.metadata or {}).get("job_id") == job.id:
+            if not state.next:
+                return state.values, True
+            return workflow.invoke(None, config), True
+    return workflow.invoke(job.input, config), False
+
+
+class _Heartbeat:
+    """Keeps a job's lease alive from a background thread while it runs."""
+
+    def __init__(self, jobs: JobQueue, job: Job):
+        self.jobs = jobs
+        self.job = job
+        self.done = threading.Event()
+        self.thread = threading.Thread(target=self._beat, daemon=True, name="job-heartbeat")
+
+    def _beat(self):
+        while not self.done.wait(self.jobs.visibility_timeout / 3):
+            if not self.jobs.heartbeat(self.job):
+                return
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.done.set()
+        self.thread.join()
+
+
+def work(target: str, path: str, queue: str = "default", checkpoints: Optional[str] = None,
+         stop: Optional[threading.Event] = None, ready=None, poll: float = 0.05, max_poll: float = 0.2,
+         **options) -> None:
+    """Worker loop: load the graph once, then claim, run and settle jobs until `stop` is set.
+
+    `checkpoints` swaps the graph's checkpointer for a SqliteSaver on that
+    file, shared by every worker, which is what lets a redelivered job resume.
+    """
+    workflow = load_target(target)
+    if checkpoints:
+        workflow = workflow.copy(update={"checkpointer": SqliteSaver(checkpoints)})
+    jobs = JobQueue(path, **options)
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    stop = stop or threading.Event()
+    if ready is not None:
+        ready.put(os.getpid())
+    idle = poll
+    while not stop.is_set():
+        job = jobs.claim(queue, worker)
+        if job is None:
+            stop.wait(idle)
+            idle = min(idle * 2, max_poll)
+            continue
+        idle = poll
+        with _Heartbeat(jobs, job):
+            try:
+                result, resumed = run_job(workflow, job)
+            except Exception:
+                jobs.fail(job, traceback.format_exc())
+                continue
+        jobs.complete(job, result, resumed)
+    jobs.close()
+
+
+class WorkerPool:
+    """N worker processes serving one queue with one compiled graph.
+
+        with WorkerPool("conditional-parallel/replyingbot.py:workflow", "jobs.sqlite", workers=8,
+                        queue="reviews", checkpoints="checkpoints.sqlite"):
+            ...
+
+    From the repo root: `python -m common.job_queue serve <target> --workers 8`.
+    Each process loads `target` once (see `load_target`). Processes are
+    spawned, not forked, so no SQLite handle or model client is shared, and a
+    worker that dies is restarted; its job comes back once the lease expires.
+    """
+
+    def __init__(self, target: str, path: str, workers: int = os.cpu_count() or 1, *, queue: str = "default",
+                 checkpoints: Optional[str] = None, **options):
+        self.target = target
+        self.path = path
+        self.workers = workers
+        self.queue = queue
+        self.checkpoints = checkpoints
+        self.options = options
+        self.restarts = 0
+        self._context = multiprocessing.get_context("spawn")
+        self._stop = self._context.Event()
+        self._ready = self._context.Queue()
+        self._processes: list = []
+        self._monitor: Optional[threading.Thread] = None
+        # create the tables before the workers race to
+        JobQueue(path, **options).close()
+
+    def _spawn(self):
+        process = self._context.Process(
+            target=work, name="job-worker", daemon=True,
+            args=(self.target, self.path, self.queue, self.checkpoints, self._stop, self._ready),
+            kwargs=self.options,
+        )
+        process.start()
+        return process
+
+    def start(self, timeout: Optional[float] = 120) -> "WorkerPool":
+        """Start the workers and wait until every one has loaded its graph."""
+        self._processes = [self._spawn() for _ in range(self.workers)]
+        for _ in range(self.workers):
+            self._ready.get(timeout=timeout)
+        self._monitor = threading.Thread(target=self._supervise, daemon=True, name="job-pool-monitor")
+        self._monitor.start()
+        return self
+
+    def _supervise(self):
+        while not self._stop.wait(0.5):
+            for i, process in enumerate(self._processes):
+                if not process.is_alive() and not self._stop.is_set():
+                    self.restarts += 1
+                    self._processes[i] = self._spawn()
+
+    @property
+    def pids(self) -> list[int]:
+        return [process.pid for process in self._processes]
+
+    def stop(self, timeout: float = 30) -> None:
+        """Let every worker finish its current job, then exit."""
+        self._stop.set()
+        if self._monitor is not None:
+            self._monitor.join()
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+
+    def __enter__(self) -> "WorkerPool":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a compiled graph from a local SQLite job queue.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve", help="run N worker processes until interrupted")
+    serve.add_argument("target", help="graph to serve, e.g. conditional-parallel/replyingbot.py:workflow")
+    serve.add_argument("--db", default="jobs.sqlite")
+    serve.add_argument("--queue", default="default")
+    serve.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    serve.add_argument("--checkpoints", help="SqliteSaver file shared by the workers, enables resume after a crash")
+    submit = commands.add_parser("submit", help="enqueue JSON inputs, one per line on stdin")
+    submit.add_argument("--db", default="jobs.sqlite")
+    submit.add_argument("--queue", default="default")
+    stats = commands.add_parser("stats", help="job counts by status")
+    stats.add_argument("--db", default="jobs.sqlite")
+    stats.add_argument("--queue")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        pool = WorkerPool(args.target, args.db, args.workers, queue=args.queue, checkpoints=args.checkpoints).start()
+        print(f"{args.workers} workers serving {args.target} from {args.db} ({args.queue})")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pool.stop()
+    elif args.command == "submit":
+        with JobQueue(args.db) as jobs:
+            for job_id in jobs.submit_many((json.loads(line) for line in sys.stdin if line.strip()), queue=args.queue):
+                print(job_id)
+    else:
+        with JobQueue(args.db) as jobs:
+            print(json.dumps(jobs.stats(args.queue), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+import copy
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from langchain_core._api.beta_decorator import suppress_langchain_beta_warning
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.load import dumps, loads
+
+from common.loader import REPO_ROOT
+
+
+DEFAULT_CACHE_PATH = os.path.join(REPO_ROOT, ".llm_cache.sqlite")
+
+# message fields that change between otherwise identical prompts (run ids,
+# token counts, finish reasons...) and must not be part of the cache key
+_VOLATILE_MESSAGE_FIELDS = ("id", "response_metadata", "usage_metadata")
+
+
+def _normalize_prompt(prompt: str) -> str:
+    # chat models hand us `dumps(messages)`, plain LLMs the raw prompt string
+    try:
+        messages = json.loads(prompt)
+    except ValueError:
+        return prompt
+    if not isinstance(messages, list):
+        return prompt
+    for message in messages:
+        kwargs = message.get("kwargs") if isinstance(message, dict) else None
+        if isinstance(kwargs, dict):
+            for field in _VOLATILE_MESSAGE_FIELDS:
+                kwargs.pop(field, None)
+    return json.dumps(messages, sort_keys=True)
+
+
+def cache_key(prompt: str, llm_string: str) -> str:
+    """Content address of one model call.
+
+    `llm_string` is built by langchain from the model name, its parameters and
+    any bound tools, so structured-output calls (which bind the schema as a
+    tool) get a different key than plain calls with the same prompt.
+    """
+    payload = llm_string + "\x00" + _normalize_prompt(prompt)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class LLMCache(BaseCache):
+    """Two tier response cache: in-memory LRU in front of a SQLite file.
+
+    Plugs into langchain's own cache hook, so every `invoke`/`ainvoke`/`batch`
+    of a model that uses it (including `with_structured_output`) is cached.
+    `max_entries` and `ttl` (seconds, None = forever) apply to both tiers.
+    """
+
+    def __init__(self, path: Optional[str] = DEFAULT_CACHE_PATH, max_entries: int = 1024, ttl: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory: OrderedDict[str, tuple[float, RETURN_VAL_TYPE]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, created REAL, value TEXT)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS llm_cache_created ON llm_cache (created)")
+
+    def _expired(self, created: float) -> bool:
+        return self.ttl is not None and time.time() - created > self.ttl
+
+    def _remember(self, key: str, created: float, value: RETURN_VAL_TYPE):
+        self._memory[key] = (created, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        key = cache_key(prompt, llm_string)
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and not self._expired(entry[0]):
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                # callers may mutate the returned messages, hand out copies
+                return copy.deepcopy(entry[1])
+            self._memory.pop(key, None)
+
+            if self._db is not None:
+                row = self._db.execute("SELECT created, value FROM llm_cache WHERE key = ?", (key,)).fetchone()
+                if row and not self._expired(row[0]):
+                    with suppress_langchain_beta_warning():
+                        value = loads(row[1])
+                    self._remember(key, row[0], value)
+                    self.disk_hits += 1
+                    return copy.deepcopy(value)
+            self.misses += 1
+            return None
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        key = cache_key(prompt, llm_string)
+        created = time.time()
+        with self._lock:
+            self._remember(key, created, copy.deepcopy(return_val))
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, created, value) VALUES (?, ?, ?)",
+                    (key, created, dumps(return_val)),
+                )
+                self._evict_disk()
+
+    def _evict_disk(self):
+        if self.ttl is not None:
+            self._db.execute("DELETE FROM llm_cache WHERE created < ?", (time.time() - self.ttl,))
+        # disk keeps more than memory, it is the tier that survives restarts
+        limit = self.max_entries * 16
+        self._db.execute(
+            "DELETE FROM llm_cache WHERE key IN ("
+            " SELECT key FROM llm_cache ORDER BY created DESC LIMIT -1 OFFSET ?)",
+            (limit,),
+        )
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM llm_cache")
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((lookups - self.misses) / lookups, 3) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+
+_shared_cache: Optional[LLMCache] = None
+
+
+def shared_cache() -> LLMCache:
+    """The process wide cache, configured from LLM_CACHE_PATH / LLM_CACHE_SIZE / LLM_CACHE_TTL."""
+    global _shared_cache
+    if _shared_cache is None:
+        ttl = os.getenv("LLM_CACHE_TTL")
+        _shared_cache = LLMCache(
+            path=os.getenv("LLM_CACHE_PATH", DEFAULT_CACHE_PATH) or None,
+            max_entries=int(os.getenv("LLM_CACHE_SIZE", "1024")),
+            ttl=float(ttl) if ttl else None,
+        )
+    return _shared_cache
+
+
+def cached(model, cache: Optional[LLMCache] = None):
+    """Attach a response cache to a ChatGoogleGenerativeAI / GoogleGenerativeAI instance.
+
+    Uses the shared cache unless one is given. Set LLM_CACHE=0 to leave the
+    model untouched.
+    """
+    if os.getenv("LLM_CACHE", "1") == "0":
+        return model
+    model.cache = cache or shared_cache()
+    return model
@@ -0,0 +1,28 @@
+import importlib.util
+import os
+import sys
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_script(relative_path: str, module_name: str | None = None):
+    """Import one of the workflow scripts by path.
+
+    The scripts live in folders like `basics-parallel` that are not valid package
+    names, so they cannot be imported normally. A dummy GOOGLE_API_KEY is set when
+    missing so the module level model construction works offline (benchmarks swap
+    the model for a fake one right after loading).
+    """
+    os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+    path = os.path.join(REPO_ROOT, relative_path)
+    script_dir = os.path.dirname(path)
+    # scripts like `frontent.py` import their siblings (`from backend import ...`)
+    if script_dir not in sys.path:
+        sys.path.insert(0, script_dir)
+    name = module_name or os.path.splitext(os.path.basename(path))[0].replace("-", "_")
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,309 @@
+"""Per-node profiling for compiled LangGraph graphs.
+
+    workflow = profiled(workflow)        # a no-op unless GRAPH_PROFILE=1
+    workflow.invoke(state)
+    report(workflow)                     # summary table + Chrome trace file
+
+`GraphProfiler` is a callback handler, so it sees every node and model call of
+the runs it is passed to and records, per node and superstep, the wall time,
+the time spent inside model calls, prompt/completion tokens (from
+`usage_metadata`) and the size of the state the node received. When the graph
+has a checkpointer it is wrapped in `TimedSaver` to time the checkpoint writes
+too. The events export as Chrome trace-event JSON (open in chrome://tracing or
+https://ui.perfetto.dev).
+
+When profiling is disabled `profiled` returns the graph itself, so there is no
+wrapper or callback on the hot path at all.
+"""
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Iterator, Optional, Sequence
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+GRAPH_PROFILE = os.getenv("GRAPH_PROFILE", "0") == "1"
+# where `report` writes the Chrome trace
+GRAPH_PROFILE_TRACE = os.getenv("GRAPH_PROFILE_TRACE", "graph_trace.json")
+
+_serde = JsonPlusSerializer()
+
+
+def state_size(state: Any) -> int:
+    """Serialized size in bytes, as a checkpointer would store it."""
+    try:
+        return len(_serde.dumps_typed(state)[1])
+    except Exception:
+        return len(repr(state).encode())
+
+
+def _tokens(response) -> tuple[int, int]:
+    prompt = completion = 0
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+            prompt += usage.get("input_tokens", 0)
+            completion += usage.get("output_tokens", 0)
+    if not (prompt or completion):
+        usage = (response.llm_output or {}).get("token_usage", {})
+        prompt, completion = usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+    return prompt, completion
+
+
+class GraphProfiler(BaseCallbackHandler):
+    """Collects node, model and checkpoint events for a summary and a trace."""
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.lock = threading.Lock()
+        self.events: list[dict] = []
+        self._open: dict = {}
+        self._threads: dict[int, int] = {}
+
+    def _now_us(self) -> float:
+        return (time.perf_counter() - self.origin) * 1e6
+
+    def _tid(self) -> int:
+        ident = threading.get_ident()
+        with self.lock:
+            return self._threads.setdefault(ident, len(self._threads) + 1)
+
+    def _record(self, name: str, cat: str, start_us: float, tid: int, **args):
+        event = {"name": name, "cat": cat, "ph": "X", "ts": start_us, "dur": self._now_us() - start_us,
+                 "pid": 1, "tid": tid, "args": args}
+        with self.lock:
+            self.events.append(event)
+
+    # -- nodes --------------------------------------------------------------
+
+    def on_chain_start(self, serialized, inputs, *, run_id, metadata=None, **kwargs):
+        metadata = metadata or {}
+        node = metadata.get("langgraph_node")
+        # the node runnable itself carries the node name, the runnables inside it do not
+        if node and kwargs.get("name") == node:
+            self._open[run_id] = (node, metadata.get("langgraph_step"), self._now_us(), self._tid(), state_size(inputs))
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        opened = self._open.pop(run_id, None)
+        if opened:
+            node, step, start, tid, size = opened
+            self._record(node, "node", start, tid, step=step, state_bytes=size)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        opened = self._open.pop(run_id, None)
+        if opened:
+            node, step, start, tid, size = opened
+            self._record(node, "node", start, tid, step=step, state_bytes=size, error=repr(error))
+
+    # -- model calls --------------------------------------------------------
+
+    def _model_start(self, run_id, metadata, kwargs):
+        metadata = metadata or {}
+        name = kwargs.get("name") or "llm"
+        self._open[run_id] = (name, metadata.get("langgraph_node"), metadata.get("langgraph_step"),
+                              self._now_us(), self._tid())
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        self._model_start(run_id, metadata, kwargs)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, metadata=None, **kwargs):
+        self._model_start(run_id, metadata, kwargs)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        opened = self._open.pop(run_id, None)
+        if opened:
+            name, node, step, start, tid = opened
+            prompt, completion = _tokens(response)
+            self._record(name, "llm", start, tid, node=node, step=step,
+                         prompt_tokens=prompt, completion_tokens=completion)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        opened = self._open.pop(run_id, None)
+        if opened:
+            name, node, step, start, tid = opened
+            self._record(name, "llm", start, tid, node=node, step=step, error=repr(error))
+
+    # -- reports ------------------------------------------------------------
+
+    def summary(self, runs: int = 1) -> dict[str, dict]:
+        """Per node totals divided by `runs`, slowest node first."""
+        rows: dict[str, dict] = defaultdict(lambda: defaultdict(float))
+        for event in self.events:
+            args = event["args"]
+            if event["cat"] == "node":
+                row = rows[event["name"]]
+                row["calls"] += 1
+                row["wall_ms"] += event["dur"] / 1000
+                row["state_bytes"] += args["state_bytes"]
+            elif event["cat"] == "llm":
+                row = rows[args["node"] or "(outside nodes)"]
+                row["llm_calls"] += 1
+                row["llm_ms"] += event["dur"] / 1000
+                row["prompt_tokens"] += args.get("prompt_tokens", 0)
+                row["completion_tokens"] += args.get("completion_tokens", 0)
+            elif event["cat"] == "checkpoint":
+                row = rows["(checkpoint)"]
+                row["calls"] += 1
+                row["wall_ms"] += event["dur"] / 1000
+                row["state_bytes"] += args.get("bytes", 0)
+        result = {}
+        for name, row in sorted(rows.items(), key=lambda item: -item[1]["wall_ms"]):
+            calls = row["calls"] or 1
+            result[name] = {
+                "calls_per_run": row["calls"] / runs,
+                "ms_per_run": row["wall_ms"] / runs,
+                "llm_ms_per_run": row["llm_ms"] / runs,
+                "llm_calls_per_run": row["llm_calls"] / runs,
+                "prompt_tokens_per_run": row["prompt_tokens"] / runs,
+                "completion_tokens_per_run": row["completion_tokens"] / runs,
+                "avg_state_bytes": row["state_bytes"] / calls,
+            }
+        return result
+
+    def by_step(self) -> list[dict]:
+        """One row per node execution, in order: step, node, wall and model time."""
+        llm_ms: dict = defaultdict(float)
+        for event in self.events:
+            if event["cat"] == "llm":
+                llm_ms[(event["tid"], event["args"]["step"], event["args"]["node"])] += event["dur"] / 1000
+        return [
+            {"step": event["args"]["step"], "node": event["name"], "wall_ms": event["dur"] / 1000,
+             "llm_ms": llm_ms[(event["tid"], event["args"]["step"], event["name"])],
+             "state_bytes": event["args"]["state_bytes"]}
+            for event in sorted(self.events, key=lambda e: e["ts"]) if event["cat"] == "node"
+        ]
+
+    def format_summary(self, runs: int = 1) -> str:
+        lines = [f"{'node':<22} {'calls':>6} {'ms':>9} {'llm ms':>9} {'llm %':>6} {'in tok':>8} {'out tok':>8} {'state B':>9}"]
+        for name, row in self.summary(runs).items():
+            share = row["llm_ms_per_run"] / row["ms_per_run"] if row["ms_per_run"] else 0.0
+            lines.append(
+                f"{name:<22} {row['calls_per_run']:>6.1f} {row['ms_per_run']:>9.1f} {row['llm_ms_per_run']:>9.1f} "
+                f"{share:>6.0%} {row['prompt_tokens_per_run']:>8.0f} {row['completion_tokens_per_run']:>8.0f} "
+                f"{row['avg_state_bytes']:>9.0f}"
+            )
+        return "\n".join(lines)
+
+    def chrome_trace(self) -> dict:
+        names = [{"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": f"run thread {tid}"}}
+                 for tid in sorted(set(self._threads.values()))]
+        return {"traceEvents": names + sorted(self.events, key=lambda e: e["ts"]), "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.chrome_trace(), f)
+
+
+class TimedSaver(BaseCheckpointSaver):
+    """Checkpointer proxy that reports every write to a `GraphProfiler`."""
+
+    def __init__(self, saver: BaseCheckpointSaver, profiler: GraphProfiler):
+        super().__init__(serde=saver.serde)
+        self.saver = saver
+        self.profiler = profiler
+
+    @property
+    def config_specs(self):
+        return self.saver.config_specs
+
+    def _timed(self, name: str, fn, *args, **args_for_trace):
+        start, tid = self.profiler._now_us(), self.profiler._tid()
+        result = fn(*args)
+        self.profiler._record(name, "checkpoint", start, tid, **args_for_trace)
+        return result
+
+    async def _atimed(self, name: str, fn, *args, **args_for_trace):
+        start, tid = self.profiler._now_us(), self.profiler._tid()
+        result = await fn(*args)
+        self.profiler._record(name, "checkpoint", start, tid, **args_for_trace)
+        return result
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        return self._timed("checkpoint put", self.saver.put, config, checkpoint, metadata, new_versions,
+                           step=metadata.get("step"), bytes=state_size(checkpoint))
+
+    def put_writes(self, config, writes: Sequence, task_id: str, task_path: str = ""):
+        return self._timed("checkpoint writes", self.saver.put_writes, config, writes, task_id, task_path,
+                           writes=len(writes))
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        return await self._atimed("checkpoint put", self.saver.aput, config, checkpoint, metadata, new_versions,
+                                  step=metadata.get("step"), bytes=state_size(checkpoint))
+
+    async def aput_writes(self, config, writes: Sequence, task_id: str, task_path: str = ""):
+        return await self._atimed("checkpoint writes", self.saver.aput_writes, config, writes, task_id, task_path,
+                                  writes=len(writes))
+
+    def get_tuple(self, config):
+        return self.saver.get_tuple(config)
+
+    def list(self, config, *, filter=None, before=None, limit=None) -> Iterator:
+        return self.saver.list(config, filter=filter, before=before, limit=limit)
+
+    def delete_thread(self, thread_id: str):
+        return self.saver.delete_thread(thread_id)
+
+    async def aget_tuple(self, config):
+        return await self.saver.aget_tuple(config)
+
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        async for item in self.saver.alist(config, filter=filter, before=before, limit=limit):
+            yield item
+
+    async def adelete_thread(self, thread_id: str):
+        return await self.saver.adelete_thread(thread_id)
+
+    def get_next_version(self, current, channel):
+        return self.saver.get_next_version(current, channel)
+
+
+class ProfiledGraph:
+    """A compiled graph whose runs all report to one `GraphProfiler`."""
+
+    def __init__(self, graph, profiler: Optional[GraphProfiler] = None):
+        self.profiler = profiler or GraphProfiler()
+        self.runs = 0
+        checkpointer = getattr(graph, "checkpointer", None)
+        if isinstance(checkpointer, BaseCheckpointSaver):
+            graph = graph.copy(update={"checkpointer": TimedSaver(checkpointer, self.profiler)})
+        self.graph = graph
+
+    def _config(self, config: Optional[dict]) -> dict:
+        self.runs += 1
+        config = dict(config or {})
+        config["callbacks"] = [*(config.get("callbacks") or []), self.profiler]
+        return config
+
+    def invoke(self, input, config=None, **kwargs):
+        return self.graph.invoke(input, self._config(config), **kwargs)
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        return await self.graph.ainvoke(input, self._config(config), **kwargs)
+
+    def stream(self, input, config=None, **kwargs):
+        yield from self.graph.stream(input, self._config(config), **kwargs)
+
+    async def astream(self, input, config=None, **kwargs):
+        async for chunk in self.graph.astream(input, self._config(config), **kwargs):
+            yield chunk
+
+    def __getattr__(self, name):
+        return getattr(self.graph, name)
+
+
+def profiled(graph, enabled: bool = GRAPH_PROFILE):
+    """`graph` wrapped in a `ProfiledGraph` when profiling is enabled, else unchanged."""
+    return ProfiledGraph(graph) if enabled else graph
+
+
+def report(graph, trace_path: str = GRAPH_PROFILE_TRACE):
+    """Print the per node summary and write the Chrome trace, if `graph` was profiled."""
+    if not isinstance(graph, ProfiledGraph):
+        return
+    print(graph.profiler.format_summary(max(graph.runs, 1)))
+    graph.profiler.write_chrome_trace(trace_path)
+    print(f"trace written to {trace_path}")
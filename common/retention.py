@@ -0,0 +1,354 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from collections.abc import AsyncIterator, Iterator, Sequence
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+)
+from langgraph.checkpoint.base.id import UUID
+from langgraph.checkpoint.memory import InMemorySaver
+
+logger = logging.getLogger(__name__)
+
+# 100ns intervals between the UUID epoch (1582-10-15) and the unix epoch
+_UUID_EPOCH = 0x01B21DD213814000
+
+
+def checkpoint_time(checkpoint_id: str) -> float:
+    """Unix time a checkpoint was written, read from its (uuid6) id."""
+    return (UUID(checkpoint_id).time - _UUID_EPOCH) / 1e7
+
+
+@dataclass(slots=True)
+class _Entry:
+    checkpoint_id: str
+    parent_id: Optional[str]
+    source: str
+    step: int
+    # the full channel -> version map, to know which blobs are still referenced
+    versions: ChannelVersions
+
+
+def _ends_run(entries: list[_Entry], i: int) -> bool:
+    """Whether entries[i] is the last checkpoint of a graph run.
+
+    The next checkpoint starts a new run when it is a fresh input, when it
+    forks from an older checkpoint (time travel), or when steps are missing
+    in between (an earlier compaction already kept entries[i] as a final one).
+    """
+    current, following = entries[i], entries[i + 1]
+    return (
+        following.source == "input"
+        or following.parent_id != current.checkpoint_id
+        or following.step != current.step + 1
+    )
+
+
+@dataclass(frozen=True)
+class Retention:
+    """Which checkpoints of a thread survive compaction.
+
+    `keep_last` keeps the newest N, `final_only` keeps the last checkpoint of
+    every run, `max_age` drops checkpoints older than that many seconds. A
+    checkpoint goes as soon as one of the configured rules drops it, and the
+    latest checkpoint of a thread is always kept (crash resume starts there).
+    """
+
+    keep_last: Optional[int] = None
+    final_only: bool = False
+    max_age: Optional[float] = None
+
+    @classmethod
+    def from_env(cls) -> Optional["Retention"]:
+        """CHECKPOINT_KEEP_LAST / CHECKPOINT_KEEP_FINAL=1 / CHECKPOINT_MAX_AGE, None if none is set."""
+        keep_last = os.getenv("CHECKPOINT_KEEP_LAST")
+        max_age = os.getenv("CHECKPOINT_MAX_AGE")
+        retention = cls(
+            keep_last=int(keep_last) if keep_last else None,
+            final_only=os.getenv("CHECKPOINT_KEEP_FINAL", "0") == "1",
+            max_age=float(max_age) if max_age else None,
+        )
+        return retention if retention != cls() else None
+
+    def expired(self, entries: list[_Entry], now: float) -> list[_Entry]:
+        cutoff = len(entries) - self.keep_last if self.keep_last is not None else 0
+        drop = []
+        for i, entry in enumerate(entries[:-1]):
+            if (
+                i < cutoff
+                or (self.final_only and not _ends_run(entries, i))
+                or (self.max_age is not None and now - checkpoint_time(entry.checkpoint_id) > self.max_age)
+            ):
+                drop.append(entry)
+        return drop
+
+
+# -- the storage specific part: listing checkpoint headers and deleting them --
+
+def _scan(saver: BaseCheckpointSaver) -> Iterator[tuple]:
+    if isinstance(saver, InMemorySaver):
+        for thread_id, namespaces in saver.storage.items():
+            for checkpoint_ns, checkpoints in namespaces.items():
+                for checkpoint_id, (checkpoint, metadata, parent_id) in checkpoints.items():
+                    yield (thread_id, checkpoint_ns, checkpoint_id, parent_id,
+                           saver.serde.loads_typed(metadata), saver.serde.loads_typed(checkpoint)["channel_versions"])
+    else:
+        yield from saver.checkpoint_index()
+
+
+def _prune(saver: BaseCheckpointSaver, thread_id: str, checkpoint_ns: str, checkpoint_ids: Sequence[str],
+           blobs: Sequence[tuple[str, str]], parents: dict[str, Optional[str]]) -> None:
+    if not isinstance(saver, InMemorySaver):
+        saver.prune(thread_id, checkpoint_ns, checkpoint_ids, blobs, parents)
+        return
+    checkpoints = saver.storage[thread_id][checkpoint_ns]
+    for checkpoint_id in checkpoint_ids:
+        checkpoints.pop(checkpoint_id, None)
+        saver.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+    for channel, version in blobs:
+        saver.blobs.pop((thread_id, checkpoint_ns, channel, version), None)
+    for checkpoint_id, parent_id in parents.items():
+        checkpoint, metadata, _ = checkpoints[checkpoint_id]
+        checkpoints[checkpoint_id] = (checkpoint, metadata, parent_id)
+
+
+class RetentionSaver(BaseCheckpointSaver):
+    """Checkpointer proxy with a retention policy and a checkpoint_id index.
+
+    Every put is recorded in an in-memory index (checkpoint_id -> thread,
+    namespace, parent, step, channel versions), so `locate(checkpoint_id)`
+    and lookups of compacted ids never touch the storage, and compaction
+    never has to list a thread's history. A background thread compacts the
+    threads written since its last pass every `interval` seconds: checkpoints
+    the policy drops are deleted with their pending writes and the channel
+    blobs no other checkpoint references, and surviving checkpoints are
+    re-parented to their nearest surviving ancestor so `get_state_history`
+    stays a chain. Time travel to a compacted checkpoint finds nothing, like
+    an unknown id.
+
+    Wraps `InMemorySaver` and `SqliteSaver` (anything with `checkpoint_index`
+    and `prune`).
+    """
+
+    def __init__(self, saver: BaseCheckpointSaver, retention: Retention, interval: float = 1.0):
+        if not isinstance(saver, InMemorySaver) and not hasattr(saver, "prune"):
+            raise TypeError(f"cannot compact checkpoints of {type(saver).__name__}")
+        super().__init__(serde=saver.serde)
+        self.saver = saver
+        self.retention = retention
+        self.interval = interval
+        self.compacted = 0
+        self._lock = threading.RLock()
+        self._threads: dict[tuple[str, str], list[_Entry]] = {}
+        self._by_id: dict[str, tuple[str, str, _Entry]] = {}
+        self._dirty: set[tuple[str, str]] = set()
+        self._closed = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+        rows = sorted(_scan(saver), key=lambda row: row[:3])
+        for thread_id, checkpoint_ns, checkpoint_id, parent_id, metadata, versions in rows:
+            self._index(thread_id, checkpoint_ns, checkpoint_id, parent_id, metadata, versions)
+
+    def __getattr__(self, name: str) -> Any:
+        # list_threads, size_bytes, storage... of the wrapped saver
+        if name == "saver":
+            raise AttributeError(name)
+        return getattr(self.saver, name)
+
+    @property
+    def config_specs(self):
+        return self.saver.config_specs
+
+    # -- index -------------------------------------------------------------
+
+    def _index(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str, parent_id: Optional[str],
+               metadata: CheckpointMetadata, versions: ChannelVersions) -> None:
+        entry = _Entry(checkpoint_id, parent_id, metadata.get("source", ""), metadata.get("step", 0), dict(versions))
+        key = (thread_id, checkpoint_ns)
+        with self._lock:
+            self._threads.setdefault(key, []).append(entry)
+            self._by_id[checkpoint_id] = (thread_id, checkpoint_ns, entry)
+            self._dirty.add(key)
+
+    def locate(self, checkpoint_id: str) -> Optional[RunnableConfig]:
+        """Config of a checkpoint given only its id, None if it is unknown or compacted."""
+        found = self._by_id.get(checkpoint_id)
+        if found is None:
+            return None
+        thread_id, checkpoint_ns, _ = found
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint_id}}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"threads": len(self._threads), "checkpoints": len(self._by_id), "compacted": self.compacted}
+
+    # -- compaction --------------------------------------------------------
+
+    def compact(self, thread_id: Optional[str] = None) -> int:
+        """Apply the retention policy now, returns how many checkpoints were deleted.
+
+        Without a thread_id this covers the threads written since the last
+        pass (all of them when `max_age` is set, age drops without writes).
+        """
+        with self._lock:
+            if thread_id is not None:
+                keys = [key for key in self._threads if key[0] == thread_id]
+            elif self.retention.max_age is not None:
+                keys = list(self._threads)
+            else:
+                keys = list(self._dirty)
+            self._dirty.difference_update(keys)
+            return sum(self._compact(key) for key in keys)
+
+    def _compact(self, key: tuple[str, str]) -> int:
+        entries = self._threads.get(key, [])
+        drop = self.retention.expired(entries, time.time())
+        if not drop:
+            return 0
+        dropped = {entry.checkpoint_id for entry in drop}
+        parent_of = {entry.checkpoint_id: entry.parent_id for entry in entries}
+        survivors = [entry for entry in entries if entry.checkpoint_id not in dropped]
+        parents = {}
+        for entry in survivors:
+            parent_id = entry.parent_id
+            while parent_id in dropped:
+                parent_id = parent_of[parent_id]
+            if parent_id != entry.parent_id:
+                parents[entry.checkpoint_id] = entry.parent_id = parent_id
+        referenced = {item for entry in survivors for item in entry.versions.items()}
+        blobs = {item for entry in drop for item in entry.versions.items()} - referenced
+        _prune(self.saver, *key, [entry.checkpoint_id for entry in drop], sorted(blobs), parents)
+        self._threads[key] = survivors
+        for checkpoint_id in dropped:
+            del self._by_id[checkpoint_id]
+        self.compacted += len(drop)
+        return len(drop)
+
+    def _start_worker(self) -> None:
+        if self._worker is None and self.interval:
+            self._worker = threading.Thread(target=self._run, name="checkpoint-compactor", daemon=True)
+            self._worker.start()
+
+    def _run(self) -> None:
+        while not self._closed.wait(self.interval):
+            try:
+                self.compact()
+            except Exception:
+                logger.exception("checkpoint compaction failed")
+
+    def close(self) -> None:
+        self._closed.set()
+        if self._worker is not None:
+            self._worker.join()
+        if hasattr(self.saver, "close"):
+            self.saver.close()
+
+    # -- checkpointer interface ------------------------------------------------
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        with self._lock:
+            saved = self.saver.put(config, checkpoint, metadata, new_versions)
+            self._index(config["configurable"]["thread_id"], config["configurable"].get("checkpoint_ns", ""),
+                        checkpoint["id"], config["configurable"].get("checkpoint_id"), metadata,
+                        checkpoint["channel_versions"])
+        self._start_worker()
+        return saved
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[tuple[str, Any]], task_id: str,
+                   task_path: str = "") -> None:
+        with self._lock:
+            self.saver.put_writes(config, writes, task_id, task_path)
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        checkpoint_id = get_checkpoint_id(config)
+        if checkpoint_id and checkpoint_id not in self._by_id:
+            return None
+        with self._lock:
+            return self.saver.get_tuple(config)
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        # materialized under the lock, compaction must not change the history mid iteration
+        with self._lock:
+            items = list(self.saver.list(config, filter=filter, before=before, limit=limit))
+        yield from items
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self.saver.delete_thread(thread_id)
+            for key in [key for key in self._threads if key[0] == thread_id]:
+                for entry in self._threads.pop(key):
+                    self._by_id.pop(entry.checkpoint_id, None)
+                self._dirty.discard(key)
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        return self.saver.get_next_version(current, channel)
+
+    # -- async (both wrapped savers are synchronous underneath) ---------------
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return self.put(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[tuple[str, Any]], task_id: str,
+                          task_path: str = "") -> None:
+        return self.put_writes(config, writes, task_id, task_path)
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return self.get_tuple(config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        for item in self.list(config, filter=filter, before=before, limit=limit):
+            yield item
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        return self.delete_thread(thread_id)
+
+
+def retained(saver: BaseCheckpointSaver, retention: Optional[Retention] = None,
+             interval: float = float(os.getenv("CHECKPOINT_COMPACT_INTERVAL", "1.0"))) -> BaseCheckpointSaver:
+    """Wrap a checkpointer in a `RetentionSaver`.
+
+    The policy comes from the CHECKPOINT_KEEP_LAST / CHECKPOINT_KEEP_FINAL /
+    CHECKPOINT_MAX_AGE environment variables unless one is given; with none
+    set the saver is returned untouched and keeps every checkpoint.
+    """
+    retention = retention or Retention.from_env()
+    if retention is None:
+        return saver
+    return RetentionSaver(saver, retention, interval)
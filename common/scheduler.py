@@ -0,0 +1,399 @@
+import asyncio
+import contextlib
+import contextvars
+import heapq
+import itertools
+import json
+import os
+import statistics
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+from tenacity import (
+    AsyncRetrying,
+    RetryCallState,
+    Retrying,
+    retry_if_exception,
+    stop_after_attempt,
+    wait_random_exponential,
+)
+
+
+# lower rank is served first
+PRIORITIES = {"interactive": 0, "batch": 1}
+
+_priority: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("llm_priority", default=None)
+
+
+@contextlib.contextmanager
+def priority(name: str):
+    """Run the model calls made inside the block at `name` priority."""
+    if name not in PRIORITIES:
+        raise ValueError(f"unknown priority {name!r}, expected one of {list(PRIORITIES)}")
+    token = _priority.set(name)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Rate limits, overload and timeouts: worth another try after a pause."""
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    status = getattr(error, "status_code", None) or getattr(error, "code", None)
+    if isinstance(status, int) and (status == 429 or 500 <= status < 600):
+        return True
+    text = f"{type(error).__name__} {error}"
+    return any(marker in text for marker in (
+        "429", "ResourceExhausted", "RESOURCE_EXHAUSTED", "TooManyRequests", "ServiceUnavailable",
+        "UNAVAILABLE", "DeadlineExceeded", "InternalServerError",
+    ))
+
+
+@dataclass
+class Limits:
+    rps: float = 0.0          # token bucket refill rate, 0 = no rate limit
+    burst: float = 0.0        # bucket size, defaults to max(1, rps)
+    max_in_flight: int = 16   # concurrent calls to this model, whatever the callers' own concurrency
+
+    def __post_init__(self):
+        if not self.burst:
+            self.burst = max(1.0, self.rps)
+
+
+@dataclass(order=True)
+class _Ticket:
+    rank: int
+    seq: int
+    enqueued: float = field(compare=False)
+    grant: Callable[[], None] = field(compare=False)
+    cancelled: bool = field(default=False, compare=False)
+
+
+class ModelQueue:
+    """Waiting calls, token bucket and counters for one model."""
+
+    def __init__(self, name: str, limits: Limits):
+        self.name = name
+        self.limits = limits
+        self.tokens = limits.burst
+        self.refilled = time.monotonic()
+        self.waiting: list[_Ticket] = []
+        self.in_flight = 0
+        self.timer: Optional[threading.Timer] = None
+        # metrics
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+        self.max_queue_depth = 0
+        self.waits: deque[float] = deque(maxlen=10_000)
+
+    def refill(self, now: float):
+        if self.limits.rps:
+            self.tokens = min(self.limits.burst, self.tokens + (now - self.refilled) * self.limits.rps)
+        self.refilled = now
+
+    def queue_depth(self) -> int:
+        return sum(not ticket.cancelled for ticket in self.waiting)
+
+    def metrics(self) -> dict:
+        waits = sorted(self.waits)
+        cuts = statistics.quantiles(waits, n=100, method="inclusive") if len(waits) > 1 else waits * 99
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "failures": self.failures,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth(),
+            "max_queue_depth": self.max_queue_depth,
+            "wait_p50_ms": 1000 * cuts[49] if cuts else 0.0,
+            "wait_p95_ms": 1000 * cuts[94] if cuts else 0.0,
+            "wait_max_ms": 1000 * waits[-1] if waits else 0.0,
+        }
+
+
+class LLMScheduler:
+    """Admission control for every call that reaches a model provider.
+
+    Each model (by name) gets a token bucket (`rps`/`burst`), a cap on calls
+    in flight and one priority queue: when a slot and a token are free the
+    waiting call with the best priority class (then the oldest) goes next.
+    Failed calls that look transient (429, 5xx, timeouts) are retried with
+    jittered exponential backoff through tenacity, re-queueing each attempt so
+    a backing-off call does not hold a slot. Works for threads and asyncio.
+    """
+
+    def __init__(self, default: Limits = None, limits: dict[str, Limits] = None, max_attempts: int = 5,
+                 backoff: float = 0.5, max_backoff: float = 30.0):
+        self.default = default or Limits()
+        self.limits = dict(limits or {})
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._lock = threading.Lock()
+        self._queues: dict[str, ModelQueue] = {}
+        self._seq = itertools.count()
+
+    def queue(self, name: str) -> ModelQueue:
+        with self._lock:
+            if name not in self._queues:
+                self._queues[name] = ModelQueue(name, self.limits.get(name, self.default))
+            return self._queues[name]
+
+    # -- admission --------------------------------------------------------
+
+    def _dispatch(self, queue: ModelQueue):
+        """Grant as many waiting calls as slots and tokens allow. Caller holds the lock."""
+        now = time.monotonic()
+        queue.refill(now)
+        while queue.waiting and queue.in_flight < queue.limits.max_in_flight:
+            if queue.waiting[0].cancelled:
+                heapq.heappop(queue.waiting)
+                continue
+            if queue.limits.rps and queue.tokens < 1:
+                if queue.timer is None:
+                    queue.timer = threading.Timer((1 - queue.tokens) / queue.limits.rps, self._on_timer, (queue,))
+                    queue.timer.daemon = True
+                    queue.timer.start()
+                return
+            ticket = heapq.heappop(queue.waiting)
+            if queue.limits.rps:
+                queue.tokens -= 1
+            queue.in_flight += 1
+            queue.calls += 1
+            queue.waits.append(now - ticket.enqueued)
+            ticket.grant()
+
+    def _on_timer(self, queue: ModelQueue):
+        with self._lock:
+            queue.timer = None
+            self._dispatch(queue)
+
+    def _enqueue(self, queue: ModelQueue, priority_name: str, grant: Callable[[], None]) -> _Ticket:
+        ticket = _Ticket(PRIORITIES[priority_name], next(self._seq), time.monotonic(), grant)
+        with self._lock:
+            heapq.heappush(queue.waiting, ticket)
+            queue.max_queue_depth = max(queue.max_queue_depth, queue.queue_depth())
+            self._dispatch(queue)
+        return ticket
+
+    def release(self, queue: ModelQueue):
+        with self._lock:
+            queue.in_flight -= 1
+            self._dispatch(queue)
+
+    def acquire(self, queue: ModelQueue, priority_name: str):
+        granted = threading.Event()
+        self._enqueue(queue, priority_name, granted.set)
+        granted.wait()
+
+    async def aacquire(self, queue: ModelQueue, priority_name: str):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def grant():
+            loop.call_soon_threadsafe(resolve)
+
+        def resolve():
+            if future.cancelled():
+                self.release(queue)  # granted after the caller gave up
+            else:
+                future.set_result(None)
+
+        ticket = self._enqueue(queue, priority_name, grant)
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                ticket.cancelled = True
+            raise
+
+    # -- calls ------------------------------------------------------------
+
+    def _retry_kwargs(self, queue: ModelQueue) -> dict:
+        def count(state: RetryCallState):
+            queue.retries += 1
+
+        return dict(
+            retry=retry_if_exception(is_retryable),
+            wait=wait_random_exponential(multiplier=self.backoff, max=self.max_backoff),
+            stop=stop_after_attempt(self.max_attempts),
+            before_sleep=count,
+            reraise=True,
+        )
+
+    def call(self, name: str, priority_name: str, fn: Callable, *args, **kwargs) -> Any:
+        queue = self.queue(name)
+        try:
+            for attempt in Retrying(**self._retry_kwargs(queue)):
+                with attempt:
+                    self.acquire(queue, priority_name)
+                    try:
+                        return fn(*args, **kwargs)
+                    finally:
+                        self.release(queue)
+        except BaseException:
+            queue.failures += 1
+            raise
+
+    async def acall(self, name: str, priority_name: str, fn: Callable, *args, **kwargs) -> Any:
+        queue = self.queue(name)
+        try:
+            async for attempt in AsyncRetrying(**self._retry_kwargs(queue)):
+                with attempt:
+                    await self.aacquire(queue, priority_name)
+                    try:
+                        return await fn(*args, **kwargs)
+                    finally:
+                        self.release(queue)
+        except BaseException:
+            queue.failures += 1
+            raise
+
+    def stream(self, name: str, priority_name: str, fn: Callable, *args, **kwargs):
+        """Like `call` for a chunk iterator: the slot is held until it is exhausted,
+        and only a failure before the first chunk is retried."""
+        queue = self.queue(name)
+        end = object()
+
+        def start():
+            self.acquire(queue, priority_name)
+            try:
+                chunks = fn(*args, **kwargs)
+                return chunks, next(chunks, end)
+            except BaseException:
+                self.release(queue)
+                raise
+
+        try:
+            chunks, first = Retrying(**self._retry_kwargs(queue))(start)
+        except BaseException:
+            queue.failures += 1
+            raise
+        try:
+            if first is not end:
+                yield first
+                yield from chunks
+        finally:
+            self.release(queue)
+
+    async def astream(self, name: str, priority_name: str, fn: Callable, *args, **kwargs):
+        queue = self.queue(name)
+        end = object()
+
+        async def start():
+            await self.aacquire(queue, priority_name)
+            try:
+                chunks = fn(*args, **kwargs)
+                return chunks, await anext(chunks, end)
+            except BaseException:
+                self.release(queue)
+                raise
+
+        try:
+            chunks, first = await AsyncRetrying(**self._retry_kwargs(queue))(start)
+        except BaseException:
+            queue.failures += 1
+            raise
+        try:
+            if first is not end:
+                yield first
+                async for chunk in chunks:
+                    yield chunk
+        finally:
+            self.release(queue)
+
+    # -- reporting --------------------------------------------------------
+
+    def metrics(self) -> dict[str, dict]:
+        with self._lock:
+            return {name: queue.metrics() for name, queue in self._queues.items()}
+
+    def format_metrics(self) -> str:
+        lines = [f"{'model':<28} {'calls':>6} {'retry':>6} {'fail':>5} {'queue':>6} {'max q':>6} "
+                 f"{'wait p50':>9} {'wait p95':>9}"]
+        for name, m in self.metrics().items():
+            lines.append(f"{name:<28} {m['calls']:>6} {m['retries']:>6} {m['failures']:>5} {m['queue_depth']:>6} "
+                         f"{m['max_queue_depth']:>6} {m['wait_p50_ms']:>7.1f}ms {m['wait_p95_ms']:>7.1f}ms")
+        return "\n".join(lines)
+
+
+def model_name(model) -> str:
+    name = getattr(model, "model", None) or getattr(model, "model_name", None) or type(model).__name__
+    return str(name).removeprefix("models/")
+
+
+_shared_scheduler: Optional[LLMScheduler] = None
+
+
+def shared_scheduler() -> LLMScheduler:
+    """The process wide scheduler, configured from the environment.
+
+    LLM_RPS / LLM_BURST / LLM_MAX_IN_FLIGHT set the default per model limits,
+    LLM_LIMITS overrides them per model name as JSON, e.g.
+    '{"gemini-2.5-flash": {"rps": 0.15, "burst": 2, "max_in_flight": 4}}'.
+    LLM_MAX_ATTEMPTS / LLM_RETRY_BACKOFF / LLM_RETRY_MAX_BACKOFF tune retries.
+    """
+    global _shared_scheduler
+    if _shared_scheduler is None:
+        default = Limits(
+            rps=float(os.getenv("LLM_RPS", "0")),
+            burst=float(os.getenv("LLM_BURST", "0")),
+            max_in_flight=int(os.getenv("LLM_MAX_IN_FLIGHT", "16")),
+        )
+        overrides = json.loads(os.getenv("LLM_LIMITS", "{}"))
+        _shared_scheduler = LLMScheduler(
+            default=default,
+            limits={name: Limits(**{**default.__dict__, "burst": 0.0, **values}) for name, values in overrides.items()},
+            max_attempts=int(os.getenv("LLM_MAX_ATTEMPTS", "5")),
+            backoff=float(os.getenv("LLM_RETRY_BACKOFF", "0.5")),
+            max_backoff=float(os.getenv("LLM_RETRY_MAX_BACKOFF", "30")),
+        )
+    return _shared_scheduler
+
+
+def scheduled(model, priority: str = "batch", scheduler: Optional[LLMScheduler] = None):
+    """Route a ChatGoogleGenerativeAI / GoogleGenerativeAI instance's provider calls through the scheduler.
+
+    Like `cached`, this returns the same model object: the generate/stream
+    hooks langchain calls after its cache lookup are wrapped on the instance,
+    so `invoke`, `batch`, streaming and `with_structured_output` all go
+    through the scheduler while cache hits skip it. `priority` is the default
+    class for this model; `with priority(...)` overrides it for a block. Set
+    LLM_SCHEDULER=0 to leave the model untouched.
+    """
+    if os.getenv("LLM_SCHEDULER", "1") == "0" or getattr(model, "_scheduled", False):
+        return model
+    if priority not in PRIORITIES:
+        raise ValueError(f"unknown priority {priority!r}, expected one of {list(PRIORITIES)}")
+    scheduler = scheduler or shared_scheduler()
+    name = model_name(model)
+    default_priority = priority
+    generate, agenerate, stream, astream = model._generate, model._agenerate, model._stream, model._astream
+
+    def current() -> str:
+        return _priority.get() or default_priority
+
+    # the explicit run_manager parameter matters: langchain only passes it to
+    # `_generate` implementations whose signature names it
+    def _generate(prompts, stop=None, run_manager=None, **kwargs):
+        return scheduler.call(name, current(), generate, prompts, stop=stop, run_manager=run_manager, **kwargs)
+
+    async def _agenerate(prompts, stop=None, run_manager=None, **kwargs):
+        return await scheduler.acall(name, current(), agenerate, prompts, stop=stop, run_manager=run_manager, **kwargs)
+
+    def _stream(prompts, stop=None, run_manager=None, **kwargs):
+        return scheduler.stream(name, current(), stream, prompts, stop=stop, run_manager=run_manager, **kwargs)
+
+    def _astream(prompts, stop=None, run_manager=None, **kwargs):
+        return scheduler.astream(name, current(), astream, prompts, stop=stop, run_manager=run_manager, **kwargs)
+
+    # pydantic models reject unknown attributes, set them on the instance directly
+    for attribute, value in (("_generate", _generate), ("_agenerate", _agenerate), ("_stream", _stream),
+                             ("_astream", _astream), ("_scheduled", True)):
+        object.__setattr__(model, attribute, value)
+    return model
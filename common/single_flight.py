@@ -0,0 +1,140 @@
+import asyncio
+import copy
+import os
+import threading
+from typing import Any, Callable, Optional
+
+from langchain_core.load import dumps
+
+from common.llm_cache import cache_key
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.followers = 0
+
+
+class SingleFlight:
+    """Coalesces identical model requests that are in flight at the same time.
+
+    The first caller for a key (the leader) makes the provider call, everyone
+    who asks for the same key before it finishes waits and gets a copy of the
+    leader's result (or its exception). Unlike the response cache nothing is
+    kept once the call completes; the two stack: the cache answers repeats,
+    single-flight collapses concurrent misses.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: dict[str, _Flight] = {}
+        self._tasks: dict[tuple[int, str], asyncio.Future] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def do(self, key: str, fn: Callable, *args, **kwargs) -> Any:
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.calls += 1
+            else:
+                flight.followers += 1
+                self.coalesced += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            # langchain fills in message ids etc. on the result it gets back
+            return copy.deepcopy(flight.result)
+        result = None
+        try:
+            result = fn(*args, **kwargs)
+            return result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+                followers = flight.followers
+            if followers and flight.error is None:
+                # snapshot before the leader's caller starts mutating its copy
+                flight.result = copy.deepcopy(result)
+            flight.done.set()
+
+    async def ado(self, key: str, fn: Callable, *args, **kwargs) -> Any:
+        loop = asyncio.get_running_loop()
+        task_key = (id(loop), key)
+        with self._lock:
+            task = self._tasks.get(task_key)
+            leader = task is None
+            if leader:
+                task = self._tasks[task_key] = asyncio.ensure_future(fn(*args, **kwargs))
+                task.add_done_callback(lambda _: self._tasks.pop(task_key, None))
+                self.calls += 1
+            else:
+                self.coalesced += 1
+        # shielded: one waiter giving up must not cancel the call the others wait on
+        result = await asyncio.shield(task)
+        # every waiter gets its own copy, none of them may see another's mutations
+        return copy.deepcopy(result)
+
+    def stats(self) -> dict:
+        requests = self.calls + self.coalesced
+        return {
+            "provider_calls": self.calls,
+            "coalesced": self.coalesced,
+            "saved_rate": round(self.coalesced / requests, 3) if requests else 0.0,
+        }
+
+
+def request_key(model, prompts, stop, kwargs: dict) -> str:
+    """Same content address the response cache uses (model, parameters, bound tools, prompt)."""
+    if hasattr(model, "_get_llm_string"):
+        llm_string = model._get_llm_string(stop=stop, **kwargs)
+    else:
+        # plain completion models: langchain keys their cache on the sorted params
+        llm_string = str(sorted({**model._identifying_params, "_type": model._llm_type, "stop": stop, **kwargs}.items()))
+    return cache_key(dumps(prompts), llm_string)
+
+
+_shared_single_flight: Optional[SingleFlight] = None
+
+
+def shared_single_flight() -> SingleFlight:
+    global _shared_single_flight
+    if _shared_single_flight is None:
+        _shared_single_flight = SingleFlight()
+    return _shared_single_flight
+
+
+def coalesced(model, group: Optional[SingleFlight] = None):
+    """Share in-flight provider calls between identical concurrent requests.
+
+    Like `cached` and `scheduled` this returns the same model with its
+    generate hooks (the ones langchain calls after a cache miss) wrapped, so
+    `invoke`, `ainvoke`, `batch` and `with_structured_output` are covered.
+    Apply it last so coalesced requests never take a scheduler slot. Streams
+    are not coalesced. Set LLM_SINGLE_FLIGHT=0 to leave the model untouched.
+    """
+    if os.getenv("LLM_SINGLE_FLIGHT", "1") == "0" or getattr(model, "_coalesced", False):
+        return model
+    group = group or shared_single_flight()
+    generate, agenerate = model._generate, model._agenerate
+
+    def _generate(prompts, stop=None, run_manager=None, **kwargs):
+        key = request_key(model, prompts, stop, kwargs)
+        return group.do(key, generate, prompts, stop=stop, run_manager=run_manager, **kwargs)
+
+    async def _agenerate(prompts, stop=None, run_manager=None, **kwargs):
+        key = request_key(model, prompts, stop, kwargs)
+        return await group.ado(key, agenerate, prompts, stop=stop, run_manager=run_manager, **kwargs)
+
+    # pydantic models reject unknown attributes, set them on the instance directly
+    for attribute, value in (("_generate", _generate), ("_agenerate", _agenerate), ("_coalesced", True)):
+        object.__setattr__(model, attribute, value)
+    return model
@@ -0,0 +1,571 @@
+from __future__ import annotations
+
+import os
+import random
+import sqlite3
+import threading
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Iterator, Sequence
+from typing import Any, Optional
+
+import zstandard
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    SerializerProtocol,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+
+class ZstdSerializer(SerializerProtocol):
+    """msgpack (via langgraph's JsonPlusSerializer / ormsgpack) + zstd for larger values.
+
+    Values below `min_size` bytes are stored as-is, compressing them costs more
+    than it saves. Compressed payloads get a `+zstd` suffix on their type tag.
+    """
+
+    def __init__(self, inner: Optional[SerializerProtocol] = None, level: int = 3, min_size: int = 512):
+        self.inner = inner or JsonPlusSerializer()
+        self.min_size = min_size
+        self._compressor = zstandard.ZstdCompressor(level=level)
+        self._decompressor = zstandard.ZstdDecompressor()
+        self._lock = threading.Lock()
+
+    def dumps(self, obj: Any) -> bytes:
+        return self.inner.dumps(obj)
+
+    def loads(self, data: bytes) -> Any:
+        return self.inner.loads(data)
+
+    def dumps_typed(self, obj: Any) -> tuple[str, bytes]:
+        type_, data = self.inner.dumps_typed(obj)
+        if len(data) < self.min_size:
+            return type_, data
+        # zstd (de)compressor objects are not safe to share between threads
+        with self._lock:
+            return f"{type_}+zstd", self._compressor.compress(data)
+
+    def loads_typed(self, data: tuple[str, bytes]) -> Any:
+        type_, payload = data
+        if type_.endswith("+zstd"):
+            with self._lock:
+                payload = self._decompressor.decompress(payload)
+            type_ = type_[: -len("+zstd")]
+        return self.inner.loads_typed((type_, payload))
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT,
+    checkpoint BLOB,
+    metadata_type TEXT,
+    metadata BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS blobs (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    channel TEXT NOT NULL,
+    version TEXT NOT NULL,
+    type TEXT NOT NULL,
+    value BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT,
+    value BLOB,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS checkpoints_checkpoint_id ON checkpoints (checkpoint_id);
+"""
+
+
+def _is_busy(error: sqlite3.OperationalError) -> bool:
+    """SQLITE_BUSY / SQLITE_LOCKED: another connection holds the database, worth retrying."""
+    code = getattr(error, "sqlite_errorcode", None)
+    if code is not None:
+        return code & 0xFF in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+    message = str(error)
+    return "locked" in message or "busy" in message
+
+
+class SqliteSaver(BaseCheckpointSaver[str]):
+    """Durable checkpointer on a local SQLite file in WAL mode.
+
+    Drop-in replacement for `InMemorySaver`:
+
+        chatbot = build_chatbot(checkpointer=SqliteSaver("chatbot.sqlite"))
+
+    Checkpoints, channel blobs and pending writes live in three tables whose
+    primary keys start with (thread_id, checkpoint_ns, checkpoint_id), so the
+    latest checkpoint of a thread or a specific checkpoint is one index seek.
+    Channel values are stored once per version, like `InMemorySaver` does.
+
+    Writes are queued and flushed in a single transaction once `batch_size`
+    operations are pending, before every read, and on `flush()`/`close()`.
+    The default `batch_size=1` commits on every put; larger values trade the
+    last few checkpoints on a hard crash for fewer fsyncs.
+
+    With `snapshot_every=N` list channels that only grow (`operator.add`,
+    `add_messages`) are stored as the items appended since the previous
+    version, with a full snapshot every N versions, so a long thread no
+    longer rewrites its whole history on every step. Reads rebuild the list
+    from the last snapshot, at most N-1 deltas away.
+    """
+
+    def __init__(self, path: str = ":memory:", *, serde: Optional[SerializerProtocol] = None, batch_size: int = 1,
+                 snapshot_every: int = 0):
+        super().__init__(serde=serde or ZstdSerializer())
+        self.path = path
+        self.batch_size = batch_size
+        self.snapshot_every = snapshot_every
+        # (thread_id, checkpoint_ns, channel) -> (version, value, deltas since the snapshot) of the
+        # last list written, the base the next version is diffed against
+        self._delta_bases: OrderedDict[tuple[str, str, str], tuple[str, list, int]] = OrderedDict()
+        self._pending: list[tuple[str, list[tuple]]] = []
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+
+    def __enter__(self) -> "SqliteSaver":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            self.flush()
+            self.conn.close()
+
+    # -- write batching --------------------------------------------------
+
+    def _queue(self, sql: str, rows: list[tuple]) -> None:
+        with self._lock:
+            self._pending.append((sql, rows))
+            if len(self._pending) >= self.batch_size:
+                self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._pending:
+                return
+            try:
+                with self.conn:
+                    self.conn.execute("BEGIN")
+                    for sql, rows in self._pending:
+                        self.conn.executemany(sql, rows)
+            except sqlite3.OperationalError as e:
+                # another process holding the database is transient: the batch stays queued
+                # and the next flush retries it instead of losing it to the rollback
+                if not _is_busy(e):
+                    self._pending = []
+                raise
+            except Exception:
+                # anything else (a constraint, a bad row) would fail the same way on every
+                # retry and wedge each later write behind it, so the batch is dropped
+                self._pending = []
+                raise
+            self._pending = []
+
+    def _query(self, sql: str, params: tuple) -> list[tuple]:
+        with self._lock:
+            self.flush()
+            return self.conn.execute(sql, params).fetchall()
+
+    # -- reads -------------------------------------------------------------
+
+    def _load_blob(self, thread_id: str, checkpoint_ns: str, channel: str, version: str) -> tuple[bool, Any]:
+        """(found, value) of one channel version, following delta rows back to their snapshot."""
+        tails = []
+        while True:
+            rows = self._query(
+                "SELECT type, value FROM blobs WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?",
+                (thread_id, checkpoint_ns, channel, version),
+            )
+            if not rows or rows[0][0] == "empty":
+                if tails:
+                    raise LookupError(f"base version {version} of delta encoded channel {channel!r} is missing")
+                return False, None
+            type_, value = rows[0]
+            if not type_.startswith("delta:"):
+                break
+            _, version, inner_type = type_.split(":", 2)
+            tails.append(self.serde.loads_typed((inner_type, value)))
+        value = self.serde.loads_typed((type_, value))
+        for tail in reversed(tails):
+            value.extend(tail)
+        return True, value
+
+    def _load_blobs(self, thread_id: str, checkpoint_ns: str, versions: ChannelVersions) -> dict[str, Any]:
+        channel_values = {}
+        for channel, version in versions.items():
+            found, value = self._load_blob(thread_id, checkpoint_ns, channel, str(version))
+            if found:
+                channel_values[channel] = value
+        return channel_values
+
+    def _load_writes(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> list[tuple[str, str, Any]]:
+        rows = self._query(
+            "SELECT task_id, channel, type, value FROM writes"
+            " WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        )
+        return [(task_id, channel, self.serde.loads_typed((type_, value))) for task_id, channel, type_, value in rows]
+
+    def _to_tuple(self, thread_id: str, checkpoint_ns: str, row: tuple, metadata=None) -> CheckpointTuple:
+        checkpoint_id, parent_checkpoint_id, type_, checkpoint_b, metadata_type, metadata_b = row
+        checkpoint: Checkpoint = self.serde.loads_typed((type_, checkpoint_b))
+        if metadata is None:
+            metadata = self.serde.loads_typed((metadata_type, metadata_b))
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint={
+                **checkpoint,
+                "channel_values": self._load_blobs(thread_id, checkpoint_ns, checkpoint["channel_versions"]),
+            },
+            metadata=metadata,
+            pending_writes=self._load_writes(thread_id, checkpoint_ns, checkpoint_id),
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_checkpoint_id,
+                    }
+                }
+                if parent_checkpoint_id
+                else None
+            ),
+        )
+
+    _COLUMNS = "checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata"
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        if checkpoint_id := get_checkpoint_id(config):
+            rows = self._query(
+                f"SELECT {self._COLUMNS} FROM checkpoints"
+                " WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                (thread_id, checkpoint_ns, checkpoint_id),
+            )
+        else:
+            rows = self._query(
+                f"SELECT {self._COLUMNS} FROM checkpoints"
+                " WHERE thread_id = ? AND checkpoint_ns = ? ORDER BY checkpoint_id DESC LIMIT 1",
+                (thread_id, checkpoint_ns),
+            )
+        if not rows:
+            return None
+        return self._to_tuple(thread_id, checkpoint_ns, rows[0])
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        where, params = [], []
+        if config:
+            where.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            if (checkpoint_ns := config["configurable"].get("checkpoint_ns")) is not None:
+                where.append("checkpoint_ns = ?")
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                where.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            where.append("checkpoint_id < ?")
+            params.append(before_id)
+        sql = f"SELECT thread_id, checkpoint_ns, {self._COLUMNS} FROM checkpoints"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY thread_id, checkpoint_ns, checkpoint_id DESC"
+        # metadata filters are applied after decoding, so only push LIMIT into
+        # SQL when there is nothing to filter
+        if limit is not None and not filter:
+            sql += f" LIMIT {int(limit)}"
+
+        for thread_id, checkpoint_ns, *row in self._query(sql, tuple(params)):
+            metadata = self.serde.loads_typed((row[4], row[5]))
+            if filter and not all(metadata.get(k) == v for k, v in filter.items()):
+                continue
+            if limit is not None:
+                if limit <= 0:
+                    break
+                limit -= 1
+            yield self._to_tuple(thread_id, checkpoint_ns, tuple(row), metadata)
+
+    # -- writes ------------------------------------------------------------
+
+    _MAX_DELTA_BASES = 1024
+
+    def _dumps_blob(self, thread_id: str, checkpoint_ns: str, channel: str, version: str, value: Any) -> tuple[str, bytes]:
+        if not self.snapshot_every or not isinstance(value, list):
+            return self.serde.dumps_typed(value)
+        key = (thread_id, checkpoint_ns, channel)
+        depth, base_version, base_length = 0, None, 0
+        with self._lock:
+            if (last := self._delta_bases.get(key)) is not None:
+                last_version, base, last_depth = last
+                # reducers keep the old items (usually the same objects), anything else gets a snapshot
+                if (
+                    last_depth + 1 < self.snapshot_every
+                    and len(value) >= len(base)
+                    and all(old is new or old == new for old, new in zip(base, value))
+                ):
+                    depth, base_version, base_length = last_depth + 1, last_version, len(base)
+            self._delta_bases[key] = (version, list(value), depth)
+            self._delta_bases.move_to_end(key)
+            if len(self._delta_bases) > self._MAX_DELTA_BASES:
+                self._delta_bases.popitem(last=False)
+        if not depth:
+            return self.serde.dumps_typed(value)
+        type_, tail = self.serde.dumps_typed(value[base_length:])
+        return f"delta:{base_version}:{type_}", tail
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        c = checkpoint.copy()
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        values: dict[str, Any] = c.pop("channel_values")  # type: ignore[misc]
+        blob_rows = []
+        for channel, version in new_versions.items():
+            if channel in values:
+                type_, value = self._dumps_blob(thread_id, checkpoint_ns, channel, str(version), values[channel])
+            else:
+                type_, value = "empty", b""
+            blob_rows.append((thread_id, checkpoint_ns, channel, str(version), type_, value))
+        type_, checkpoint_b = self.serde.dumps_typed(c)
+        metadata_type, metadata_b = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+        with self._lock:
+            if blob_rows:
+                self._pending.append(("INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?, ?, ?)", blob_rows))
+            self._queue(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(
+                    thread_id,
+                    checkpoint_ns,
+                    checkpoint["id"],
+                    config["configurable"].get("checkpoint_id"),
+                    type_,
+                    checkpoint_b,
+                    metadata_type,
+                    metadata_b,
+                )],
+            )
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        replace, keep = [], []
+        for idx, (channel, value) in enumerate(writes):
+            type_, value_b = self.serde.dumps_typed(value)
+            row = (
+                thread_id, checkpoint_ns, checkpoint_id, task_id,
+                WRITES_IDX_MAP.get(channel, idx), channel, type_, value_b, task_path,
+            )
+            # special writes (errors, interrupts...) overwrite, regular ones are kept once
+            (replace if channel in WRITES_IDX_MAP else keep).append(row)
+        with self._lock:
+            if replace:
+                self._pending.append(("INSERT OR REPLACE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", replace))
+            self._queue("INSERT OR IGNORE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", keep)
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self.flush()
+            with self.conn:
+                self.conn.execute("BEGIN")
+                for table in ("checkpoints", "blobs", "writes"):
+                    self.conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+            for key in [key for key in self._delta_bases if key[0] == thread_id]:
+                del self._delta_bases[key]
+
+    def checkpoint_index(self) -> Iterator[tuple[str, str, str, Optional[str], CheckpointMetadata, ChannelVersions]]:
+        """(thread_id, checkpoint_ns, checkpoint_id, parent_id, metadata, channel_versions) of every checkpoint.
+
+        Decodes only the checkpoint rows, never the channel blobs or writes.
+        """
+        rows = self._query(
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint,"
+            " metadata_type, metadata FROM checkpoints ORDER BY thread_id, checkpoint_ns, checkpoint_id", ()
+        )
+        for thread_id, checkpoint_ns, checkpoint_id, parent_id, type_, checkpoint_b, metadata_type, metadata_b in rows:
+            checkpoint = self.serde.loads_typed((type_, checkpoint_b))
+            metadata = self.serde.loads_typed((metadata_type, metadata_b))
+            yield thread_id, checkpoint_ns, checkpoint_id, parent_id, metadata, checkpoint["channel_versions"]
+
+    def prune(
+        self,
+        thread_id: str,
+        checkpoint_ns: str,
+        checkpoint_ids: Sequence[str],
+        blobs: Sequence[tuple[str, str]] = (),
+        parents: Optional[dict[str, Optional[str]]] = None,
+    ) -> None:
+        """Delete checkpoints (with their pending writes) and the given (channel, version) blobs.
+
+        `parents` re-points surviving checkpoints whose parent was deleted.
+        """
+        with self._lock:
+            self.flush()
+            rebased = self._rebase(thread_id, checkpoint_ns, blobs)
+            with self.conn:
+                self.conn.execute("BEGIN")
+                self.conn.executemany(
+                    "UPDATE blobs SET type = ?, value = ?"
+                    " WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?",
+                    rebased,
+                )
+                for table in ("checkpoints", "writes"):
+                    self.conn.executemany(
+                        f"DELETE FROM {table} WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                        [(thread_id, checkpoint_ns, checkpoint_id) for checkpoint_id in checkpoint_ids],
+                    )
+                self.conn.executemany(
+                    "DELETE FROM blobs WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?",
+                    [(thread_id, checkpoint_ns, channel, str(version)) for channel, version in blobs],
+                )
+                self.conn.executemany(
+                    "UPDATE checkpoints SET parent_checkpoint_id = ?"
+                    " WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    [(parent, thread_id, checkpoint_ns, checkpoint_id) for checkpoint_id, parent in (parents or {}).items()],
+                )
+
+    def _rebase(self, thread_id: str, checkpoint_ns: str, blobs: Sequence[tuple[str, str]]) -> list[tuple]:
+        """Snapshot rows for the surviving deltas whose base is among `blobs`, which are about to go."""
+        deleted = {(channel, str(version)) for channel, version in blobs}
+        for key, (version, _, _) in list(self._delta_bases.items()):
+            if key[:2] == (thread_id, checkpoint_ns) and (key[2], version) in deleted:
+                del self._delta_bases[key]
+        if not deleted:
+            return []
+        rows = self.conn.execute(
+            "SELECT channel, version, type FROM blobs WHERE thread_id = ? AND checkpoint_ns = ? AND type LIKE 'delta:%'",
+            (thread_id, checkpoint_ns),
+        ).fetchall()
+        rebased = []
+        for channel, version, type_ in rows:
+            base_version = type_.split(":", 2)[1]
+            if (channel, version) not in deleted and (channel, base_version) in deleted:
+                _, value = self._load_blob(thread_id, checkpoint_ns, channel, version)
+                rebased.append((*self.serde.dumps_typed(value), thread_id, checkpoint_ns, channel, version))
+        return rebased
+
+    def vacuum(self) -> None:
+        """Give the pages freed by `prune`/`delete_thread` back to the filesystem."""
+        with self._lock:
+            self.flush()
+            self.conn.execute("VACUUM")
+
+    def list_threads(self) -> list[str]:
+        """Thread ids, most recently updated first (checkpoint ids are time ordered)."""
+        rows = self._query(
+            "SELECT thread_id FROM checkpoints GROUP BY thread_id ORDER BY MAX(checkpoint_id) DESC", ()
+        )
+        return [thread_id for thread_id, in rows]
+
+    def size_bytes(self) -> int:
+        """Bytes on disk once the WAL has been folded back into the main file."""
+        with self._lock:
+            self.flush()
+            self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            page_count = self.conn.execute("PRAGMA page_count").fetchone()[0]
+            return page_count * self.conn.execute("PRAGMA page_size").fetchone()[0]
+
+    # -- async (sqlite calls are short, run them inline like InMemorySaver) --
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return self.get_tuple(config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        for item in self.list(config, filter=filter, before=before, limit=limit):
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return self.put(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        return self.put_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        return self.delete_thread(thread_id)
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
@@ -0,0 +1,89 @@
+"""Fused, speculative and two-stage review classification: model calls per review and latency.
+
+Runs the replyingbot graph offline against a fake model with injected latency,
+once per traffic mix:
+
+    python conditional-parallel/benchmark.py --reviews 200 --negative-share 0.1 0.5 0.9
+
+"saved" and "extra" compare each mode with two-stage on the same reviews,
+ms/call is the mean latency saved per extra model call spent.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.fake_llm import FakeChatModel, default_structured, lognormal
+from common.loader import load_script
+
+
+def fake_structured(schema, prompt):
+    # negative reviews in the benchmark data all mention "crash"
+    result = default_structured(schema, prompt)
+    if "sentiment" in schema.model_fields:
+        result.sentiment = "negative" if "crash" in prompt else "positive"
+    return result
+
+
+def make_reviews(count: int, negative_share: float) -> list[str]:
+    rng = random.Random(42)
+    return [
+        f"review {i}: the app crashes on login" if rng.random() < negative_share
+        else f"review {i}: love the new dark mode"
+        for i in range(count)
+    ]
+
+
+def measure(bot, workflow, reviews: list[str]) -> dict:
+    bot.model.calls = 0
+    latencies = []
+    for review in reviews:
+        start = time.perf_counter()
+        workflow.invoke({"review": review})
+        latencies.append(time.perf_counter() - start)
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "calls_per_review": bot.model.calls / len(reviews),
+        "mean_s": statistics.fmean(latencies),
+        "p50_s": cuts[49],
+        "p95_s": cuts[94],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fused, speculative and two-stage review classification.")
+    parser.add_argument("--reviews", type=int, default=100)
+    parser.add_argument("--negative-share", type=float, nargs="+", default=[0.1, 0.5, 0.9])
+    parser.add_argument("--latency", type=float, default=0.05, help="median fake model latency in seconds")
+    args = parser.parse_args()
+
+    bot = load_script("conditional-parallel/replyingbot.py")
+    bot.model = FakeChatModel(latency=lognormal(args.latency, 0.3), structured=fake_structured)
+    bot.sentimentModal = bot.model.with_structured_output(bot.sentimentState)
+    bot.diagnosisModal = bot.model.with_structured_output(bot.DiagnosisSchema)
+    bot.triageModal = bot.model.with_structured_output(bot.ReviewTriageSchema)
+
+    modes = (("two-stage", bot.two_stage_workflow), ("fused", bot.fused_workflow),
+             ("speculative", bot.speculative_workflow))
+    print(f"{args.reviews} reviews, median model latency {args.latency}s\n")
+    print(f"{'negative':>8} {'mode':<12} {'calls/review':>12} {'mean s':>8} {'p50 s':>8} {'p95 s':>8} "
+          f"{'saved s':>8} {'extra':>6} {'ms/call':>8}")
+    for share in args.negative_share:
+        reviews = make_reviews(args.reviews, share)
+        baseline = None
+        for mode, workflow in modes:
+            result = measure(bot, workflow, reviews)
+            baseline = baseline or result
+            saved = baseline["mean_s"] - result["mean_s"]
+            extra = result["calls_per_review"] - baseline["calls_per_review"]
+            per_call = f"{saved / extra * 1000:>8.1f}" if extra > 0 else f"{'-':>8}"
+            print(f"{share:>8.0%} {mode:<12} {result['calls_per_review']:>12.2f} {result['mean_s']:>8.3f} "
+                  f"{result['p50_s']:>8.3f} {result['p95_s']:>8.3f} {saved:>8.3f} {extra:>+6.2f} {per_call}")
+
+
+if __name__ == "__main__":
+    main()
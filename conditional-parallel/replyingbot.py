@@ -1,13 +1,32 @@
 from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_core.runnables.config import ContextThreadPoolExecutor
 from langgraph.graph import StateGraph, START, END
 from typing import TypedDict , Literal
 import dotenv
 from pydantic import BaseModel , Field
+import os
+import sys
+import threading
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.llm_cache import cached
+from common.scheduler import scheduled
+from common.single_flight import coalesced
+from common.hedging import hedged
+from common.profiling import profiled, report
 dotenv.load_dotenv()
 
-model = ChatGoogleGenerativeAI(
+# bulk runs send many byte-identical prompts at once, coalesced() makes them share one call;
+# hedged() sends a duplicate of any call slower than the observed p95
+model = coalesced(hedged(scheduled(cached(ChatGoogleGenerativeAI(
     model="gemini-2.5-flash"
-)
+)))))
+
+# fused mode: one structured call returns sentiment and diagnosis together
+FUSED = os.getenv("REVIEW_BOT_FUSED", "0") == "1"
+
+# speculative mode: run_diagnosis and positive_response start alongside find_sentiment,
+# the branch the sentiment does not pick is cancelled (or its result dropped)
+SPECULATE = os.getenv("REVIEW_BOT_SPECULATE", "0") == "1"
 
 # for model initialization this is just for creating a structured model
 class sentimentState(BaseModel):
@@ -23,6 +42,17 @@ class DiagnosisSchema(BaseModel):
     urgency: Literal["low", "medium", "high"] = Field(description='How urgent or critical the issue appears to be')  
 
 
+# for fused mode, sentiment and diagnosis in one schema so one call does both
+class ReviewTriageSchema(BaseModel):
+    sentiment: Literal["positive", "negative"] = Field(description="The sentiment of the review")
+
+    issue_type: Literal["UX", "Performance", "Bug", "Support", "Other"] = Field(description='The category of issue mentioned in the review, "Other" for positive reviews')
+
+    tone: Literal["angry", "frustrated", "disappointed", "calm"] = Field(description='The emotional tone expressed by the user')
+
+    urgency: Literal["low", "medium", "high"] = Field(description='How urgent or critical the issue appears to be, "low" for positive reviews')
+
+
 # we will use this state to track the review process
 
 class ReviewState(TypedDict):
@@ -39,6 +69,9 @@ sentimentModal = model.with_structured_output(sentimentState)
 # creating a structured model for diagnosis
 diagnosisModal = model.with_structured_output(DiagnosisSchema)
 
+# creating a structured model for the fused sentiment + diagnosis call
+triageModal = model.with_structured_output(ReviewTriageSchema)
+
 
 def find_sentiment(state: ReviewState) -> ReviewState:
 
@@ -57,6 +90,20 @@ def run_diagnosis(state: ReviewState) -> ReviewState:
     return {'diagnosis': response.model_dump()}
 
 
+def classify_review(state: ReviewState) -> ReviewState:
+
+    prompt = f"""Classify this app review:\n\n{state['review']}\n
+Return the sentiment. If it is negative also diagnose it: issue_type, tone, and urgency.
+"""
+    response = triageModal.invoke(prompt)
+
+    if response.sentiment == 'positive':
+        return {'sentiment': response.sentiment}
+
+    diagnosis = response.model_dump(include={'issue_type', 'tone', 'urgency'})
+    return {'sentiment': response.sentiment, 'diagnosis': diagnosis}
+
+
 
 def positive_response(state: ReviewState)-> ReviewState:
 
@@ -81,41 +128,100 @@ Write an empathetic, helpful resolution message.
 
     return {'response': response}
 
-def conditional_response(state: ReviewState) -> Literal["positive_response", "run_diagnosis"]:
+# threads for the speculative branches, copying the caller's context keeps
+# callbacks, tracing and the scheduler priority attached to them
+speculation_pool = ContextThreadPoolExecutor(max_workers=int(os.getenv("REVIEW_BOT_SPECULATION_THREADS", "64")),
+                                             thread_name_prefix="speculate")
+speculation_lock = threading.Lock()
+# reviews: speculative runs, cancelled: losing branches stopped before their model call,
+# discarded: losing branches whose model call was already spent
+speculation = {"reviews": 0, "cancelled": 0, "discarded": 0}
+
+
+def speculate(state: ReviewState) -> ReviewState:
+
+    diagnosis = speculation_pool.submit(run_diagnosis, state)
+    positive = speculation_pool.submit(positive_response, state)
+    sentiment = find_sentiment(state)['sentiment']
+
+    winner, loser = (positive, diagnosis) if sentiment == 'positive' else (diagnosis, positive)
+    cancelled = loser.cancel()
+    update = {'sentiment': sentiment, **winner.result()}
+
+    with speculation_lock:
+        speculation["reviews"] += 1
+        speculation["cancelled" if cancelled else "discarded"] += 1
+    return update
+
+
+def speculation_stats() -> dict:
+    with speculation_lock:
+        return dict(speculation)
+
+
+def speculative_route(state: ReviewState) -> Literal["negetive_response", "__end__"]:
+    # a positive review already has its response from the speculative branch
+    return 'negetive_response' if state['sentiment'] == 'negative' else END
+
+
+def conditional_response(state: ReviewState) -> Literal["positive_response", "run_diagnosis", "negetive_response"]:
     if state['sentiment'] == 'positive':
         return 'positive_response'
+    elif state.get('diagnosis'):
+        # fused mode already diagnosed the review in the classification call
+        return 'negetive_response'
     else:
         return 'run_diagnosis'
 
 # defining the graph 
 
-graph = StateGraph(ReviewState)
-
-# adding nodes
-
-graph.add_node('find_sentiment', find_sentiment)
-graph.add_node('run_diagnosis', run_diagnosis)
-graph.add_node('negetive_response', negative_response)
-graph.add_node('positive_response', positive_response)
+def build_graph(fused: bool = False, speculative: bool = False):
+    graph = StateGraph(ReviewState)
 
+    # adding nodes
 
+    if fused:
+        graph.add_node('classify_review', classify_review)
+    elif speculative:
+        graph.add_node('speculate', speculate)
+    else:
+        graph.add_node('find_sentiment', find_sentiment)
+        graph.add_node('run_diagnosis', run_diagnosis)
+    graph.add_node('negetive_response', negative_response)
+    if not speculative:
+        graph.add_node('positive_response', positive_response)
+
+    # adding edges 
+
+    if fused:
+        graph.add_edge(START, 'classify_review')
+        graph.add_conditional_edges('classify_review', conditional_response, ['positive_response', 'negetive_response'])
+    elif speculative:
+        graph.add_edge(START, 'speculate')
+        graph.add_conditional_edges('speculate', speculative_route, ['negetive_response', END])
+    else:
+        graph.add_edge(START, 'find_sentiment')
+        graph.add_conditional_edges('find_sentiment', conditional_response, ['positive_response', 'run_diagnosis'])
+        graph.add_edge('run_diagnosis', 'negetive_response')
+    if not speculative:
+        graph.add_edge('positive_response', END)
+    graph.add_edge('negetive_response', END)
 
-# adding edges 
-
-graph.add_edge(START, 'find_sentiment')
-graph.add_conditional_edges('find_sentiment', conditional_response)
-graph.add_edge('positive_response', END)
-graph.add_edge('run_diagnosis', 'negetive_response')
-graph.add_edge('negetive_response', END)
+    # compile graph 
+    return graph.compile()
 
 
-# compile graph 
-workflow = graph.compile()
+two_stage_workflow = build_graph(fused=False)
+fused_workflow = build_graph(fused=True)
+speculative_workflow = build_graph(speculative=True)
+workflow = fused_workflow if FUSED else speculative_workflow if SPECULATE else two_stage_workflow
 
 # execute the graph with initial state 
+if __name__ == "__main__":
+    workflow = profiled(workflow)
+    initial_state = {"review": "I’ve been trying to log in for over an hour now, and the app keeps freezing on the authentication screen. I even tried reinstalling it, but no luck. This kind of bug is unacceptable, especially when it affects basic functionality."}
 
-initial_state = {"review": "I’ve been trying to log in for over an hour now, and the app keeps freezing on the authentication screen. I even tried reinstalling it, but no luck. This kind of bug is unacceptable, especially when it affects basic functionality."}
-
-final_state = workflow.invoke(initial_state)
+    final_state = workflow.invoke(initial_state)
 
-print(final_state)  # Should print the final state with sentiment
\ No newline at end of file
+    print(final_state)  # Should print the final state with sentiment
+    report(workflow)
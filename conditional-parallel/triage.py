@@ -0,0 +1,179 @@
+"""Bulk review triage: runs the replyingbot graph over a JSONL or CSV file.
+
+    LLM_MAX_IN_FLIGHT=32 python conditional-parallel/triage.py reviews.jsonl triaged.jsonl --concurrency 32
+
+Every input row needs a `review` field (an `id` field is optional, the row
+number is used otherwise). Results are appended to the output JSONL as soon as
+each review finishes, so re-running the same command after a crash only
+processes the reviews that are not in the output yet. Model calls go through
+the shared scheduler, which caps them at LLM_MAX_IN_FLIGHT (default 16) per
+model, so a `--concurrency` above that only queues more reviews unless the
+cap is raised with it.
+"""
+import argparse
+import csv
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.loader import load_script
+from common.scheduler import scheduled, shared_scheduler
+from common.single_flight import coalesced, shared_single_flight
+from common.hedging import hedged, shared_latencies
+
+
+def read_reviews(path: str):
+    """Yield (review_id, review) pairs from a .jsonl or .csv file."""
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.endswith(".csv"):
+            rows = csv.DictReader(f)
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+        for number, row in enumerate(rows):
+            yield str(row.get("id") or number), row["review"]
+
+
+def completed_ids(path: str) -> set[str]:
+    """Ids already triaged successfully in a previous (possibly crashed) run."""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # torn last line from a crash, that review is simply redone
+                continue
+            if "error" not in record:
+                done.add(record["id"])
+    return done
+
+
+def drop_torn_tail(path: str):
+    """Cut an unterminated last line (a write interrupted by a crash) off `path`.
+
+    Appending after it would glue the first new record onto the fragment and
+    lose that record too.
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, "rb+") as f:
+        end = f.seek(0, os.SEEK_END)
+        position = end
+        while position > 0:
+            step = min(65536, position)
+            f.seek(position - step)
+            newline = f.read(step).rfind(b"\n")
+            if newline != -1:
+                position = position - step + newline + 1
+                break
+            position -= step
+        if position != end:
+            f.truncate(position)
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1]
+
+
+def triage(workflow, input_path: str, output_path: str, concurrency: int = 16) -> dict:
+    """Run every pending review through `workflow`, streaming results to `output_path`."""
+    done = completed_ids(output_path)
+    pending = ((rid, review) for rid, review in read_reviews(input_path) if rid not in done)
+
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def run_one(rid: str, review: str) -> dict:
+        start = time.perf_counter()
+        try:
+            state = workflow.invoke({"review": review})
+            record = {"id": rid, "sentiment": state["sentiment"],
+                      "diagnosis": state.get("diagnosis"), "response": state["response"]}
+        except Exception as e:
+            record = {"id": rid, "error": repr(e)}
+        record["latency_s"] = round(time.perf_counter() - start, 4)
+        return record
+
+    drop_torn_tail(output_path)
+    start = time.perf_counter()
+    with open(output_path, "a", encoding="utf-8") as out, ThreadPoolExecutor(concurrency) as pool:
+
+        def write(record: dict):
+            nonlocal errors
+            with lock:
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+                if "error" in record:
+                    errors += 1
+                else:
+                    latencies.append(record["latency_s"])
+
+        # keep at most 2x concurrency reviews queued so huge files are never
+        # loaded into memory at once
+        in_flight = set()
+        for rid, review in pending:
+            if len(in_flight) >= 2 * concurrency:
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    write(future.result())
+            in_flight.add(pool.submit(run_one, rid, review))
+        for future in wait(in_flight).done:
+            write(future.result())
+    elapsed = time.perf_counter() - start
+
+    return {
+        "skipped": len(done),
+        "processed": len(latencies),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "reviews_per_s": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_s": round(percentile(latencies, 50), 4),
+        "p95_s": round(percentile(latencies, 95), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Triage app-store reviews in bulk.")
+    parser.add_argument("input", help="reviews .jsonl or .csv (needs a `review` column)")
+    parser.add_argument("output", help="results .jsonl, appended to and used for resume")
+    parser.add_argument("--concurrency", type=int, default=16, help="reviews in flight at once (model calls are also capped by LLM_MAX_IN_FLIGHT, default 16)")
+    parser.add_argument("--fused", action="store_true",
+                        help="classify sentiment and diagnosis in a single model call")
+    parser.add_argument("--speculative", action="store_true",
+                        help="start both response branches while the sentiment is still being classified")
+    parser.add_argument("--fake-latency", type=float, default=None,
+                        help="dry run against an offline fake model with this latency (seconds)")
+    args = parser.parse_args()
+
+    bot = load_script("conditional-parallel/replyingbot.py")
+    if args.fake_latency is not None:
+        from common.fake_llm import FakeChatModel
+        bot.model = coalesced(hedged(scheduled(FakeChatModel(latency=args.fake_latency))))
+        bot.sentimentModal = bot.model.with_structured_output(bot.sentimentState)
+        bot.diagnosisModal = bot.model.with_structured_output(bot.DiagnosisSchema)
+        bot.triageModal = bot.model.with_structured_output(bot.ReviewTriageSchema)
+
+    workflow = bot.fused_workflow if args.fused else bot.speculative_workflow if args.speculative else bot.workflow
+    report = triage(workflow, args.input, args.output, args.concurrency)
+    report["scheduler"] = shared_scheduler().metrics()
+    report["single_flight"] = shared_single_flight().stats()
+    report["speculation"] = bot.speculation_stats()
+    report["latency"] = shared_latencies().metrics()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -5,10 +5,23 @@ from pydantic import BaseModel , Field
 
 from typing import TypedDict, Literal, Annotated
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.context import CONTEXT_LAST_K, CONTEXT_MODE, build_prompt, update_summary
+from common.profiling import profiled, report
+from common.scheduler import scheduled
+from stop_classifier import classify, stats as stop_stats
 dotenv.load_dotenv()
 
+# when the local stop check is unsure, draft the reply while the LLM check runs
+# and throw the draft away if the user actually wanted to stop
+SPECULATIVE_REPLY = os.getenv("SPECULATIVE_REPLY", "0") == "1"
+
 # Initialize the model
-model = ChatGoogleGenerativeAI(model="gemini-2.5-flash")
+# a user is waiting on every call, served ahead of batch work
+model = scheduled(ChatGoogleGenerativeAI(model="gemini-2.5-flash"), priority="interactive")
 
 # Define the state for the chat
 class ChatState(TypedDict):
@@ -16,6 +29,11 @@ class ChatState(TypedDict):
     messages: list[HumanMessage | SystemMessage | AIMessage]
     response: str
     sentiment: Literal["continue", "stop"] = "continue"
+    # running summary of the turns that no longer go to the model verbatim
+    summary: str
+    summarized: int
+    # set when analyze_sentiment already produced this turn's reply
+    replied: bool
 
 class SentimentAnalysisResult(BaseModel):
     sentiment: Literal["continue", "stop"] = Field(..., description="Sentiment of the user input, if he/she wants to continue or stop the chat")
@@ -27,22 +45,46 @@ def chatbot(state: ChatState) -> ChatState:
     # Add the user message to the state
     user_message = HumanMessage(content=state['user_input'])
     state['messages'].append(user_message)
+    # Only send a bounded window of the history (see common/context.py)
+    if CONTEXT_MODE == "summary":
+        state['summary'], state['summarized'] = update_summary(
+            model, state['messages'], state.get('summary', ''), state.get('summarized', 0), CONTEXT_LAST_K)
+    prompt = build_prompt(state['messages'], CONTEXT_MODE, summary=state.get('summary', ''), summarized=state.get('summarized', 0))
     # Generate a response using the model (using message history)
-    response = model.invoke(state['messages']).content
+    response = model.invoke(prompt).content
     state['messages'].append(AIMessage(content=response))
     state['response'] = response
     return state
 
+def llm_sentiment(user_input: str) -> Literal["continue", "stop"]:
+    sentiment_result = sentimentModel.invoke(f"check the sentiment of the user input if the user wants to continue or stop the chat, if the user wants to stop the chat, return 'stop', otherwise return 'continue'. User input: {user_input}")
+    return sentiment_result.sentiment
+
 def analyze_sentiment(state: ChatState) -> ChatState:
-    # Analyze the sentiment of the user input
-    sentiment_result = sentimentModel.invoke(f"check the sentiment of the user input if the user wants to continue or stop the chat, if the user wants to stop the chat, return 'stop', otherwise return 'continue'. User input: {state['user_input']}")
+    state['replied'] = False
+    # Clear cases ("bye", "how do I ...") are decided locally without a model call
+    sentiment = classify(state['user_input'])
+    if sentiment is None and SPECULATIVE_REPLY:
+        pool = ThreadPoolExecutor(2)
+        check = pool.submit(llm_sentiment, state['user_input'])
+        # the draft works on a copy so a discarded reply leaves no trace in the history
+        draft = pool.submit(chatbot, {**state, 'messages': list(state['messages'])})
+        sentiment = check.result()
+        if sentiment == 'continue':
+            state = draft.result()
+            state['replied'] = True
+        else:
+            stop_stats['discarded_drafts'] += 1
+        pool.shutdown(wait=False, cancel_futures=True)
+    elif sentiment is None:
+        sentiment = llm_sentiment(state['user_input'])
     # Update the state with the actual string value
-    state['sentiment'] = sentiment_result.sentiment
+    state['sentiment'] = sentiment
     return state
 
 def conditional_response(state: ChatState) :
     if state['sentiment'] == 'continue':
-        return 'chatbot'
+        return END if state.get('replied') else 'chatbot'
     else:
         return 'end'
 
@@ -68,12 +110,17 @@ workflow = chat_graph.compile()
 
 # Example usage: multi-turn chat
 if __name__ == "__main__":
+    # GRAPH_PROFILE=1 shows where the time goes (see common/profiling.py)
+    workflow = profiled(workflow)
     # Initialize state with system message and empty messages list
     state: ChatState = {
         'user_input': '',
         'messages': [SystemMessage(content="You are a helpful AI assistant. Answer the user's questions clearly and concisely.")],
         'response': '',
-        'sentiment': 'continue'
+        'sentiment': 'continue',
+        'summary': '',
+        'summarized': 0,
+        'replied': False
     }
 
     while state['sentiment'] != 'stop':
@@ -83,3 +130,5 @@ if __name__ == "__main__":
         if state['sentiment'] != 'stop':
             print("AI:", state['response'])
     # The workflow will end via the 'end' node, which prints the goodbye message
+    print("stop check:", dict(stop_stats))
+    report(workflow)
@@ -0,0 +1,67 @@
+"""Prompt tokens per chat turn for each context mode (see common/context.py).
+
+Drives the `chatbot` node of chat.py for a long conversation against an offline
+fake model and reports the (approximate) prompt tokens sent on selected turns:
+
+    python iterative-workflow/context_benchmark.py --turns 100
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.messages import SystemMessage
+from langchain_core.messages.utils import count_tokens_approximately
+
+from common.fake_llm import FakeChatModel
+from common.loader import load_script
+
+
+def run(chat, mode: str, turns: int) -> tuple[list[int], int]:
+    chat.CONTEXT_MODE = mode
+    chat.model = FakeChatModel(reply=lambda prompt: "a fairly detailed answer " * 40)
+    sent = []
+    build_prompt = chat.build_prompt
+
+    def recording_build_prompt(*args, **kwargs):
+        prompt = build_prompt(*args, **kwargs)
+        sent.append(count_tokens_approximately(prompt))
+        return prompt
+
+    chat.build_prompt = recording_build_prompt
+    state = {
+        'user_input': '',
+        'messages': [SystemMessage(content="You are a helpful AI assistant. Answer the user's questions clearly and concisely.")],
+        'response': '',
+        'sentiment': 'continue',
+        'summary': '',
+        'summarized': 0,
+    }
+    try:
+        for turn in range(turns):
+            state['user_input'] = f"question {turn}: tell me more about topic {turn} and how it relates to the last one"
+            state = chat.chatbot(state)
+    finally:
+        chat.build_prompt = build_prompt
+    # every model call beyond one per turn is a summary update
+    return sent, chat.model.calls - turns
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prompt tokens per turn by context mode.")
+    parser.add_argument("--turns", type=int, default=100)
+    parser.add_argument("--report", type=int, nargs="+", default=[1, 5, 10, 25, 50, 100])
+    args = parser.parse_args()
+
+    chat = load_script("iterative-workflow/chat.py")
+    report = [turn for turn in args.report if turn <= args.turns]
+
+    print(f"{'mode':<8}" + "".join(f"{'turn ' + str(t):>10}" for t in report) + f"{'total':>10}{'summaries':>11}")
+    for mode in ("all", "last_k", "summary", "budget"):
+        sent, summary_calls = run(chat, mode, args.turns)
+        print(f"{mode:<8}" + "".join(f"{sent[t - 1]:>10}" for t in report) + f"{sum(sent):>10}{summary_calls:>11}")
+
+
+if __name__ == "__main__":
+    main()
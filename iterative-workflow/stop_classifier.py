@@ -0,0 +1,80 @@
+"""Local fast path for chat.py's continue/stop decision.
+
+Most user turns are obviously one or the other ("bye", "thanks, that's all",
+"how do I ..."), so they are decided here in microseconds and only the
+ambiguous ones go to the structured LLM check. `stats` counts which path each
+decision took.
+"""
+import math
+import re
+from collections import Counter
+from typing import Literal, Optional
+
+Sentiment = Literal["continue", "stop"]
+
+# how sure the heuristic score has to be that a message is not a goodbye before the LLM is
+# skipped; the score never ends a chat on its own, only a bare `_STOP_ONLY` message does
+CONFIDENCE = 0.85
+
+stats: Counter = Counter()
+
+_STOP_ONLY = re.compile(
+    r"^\s*(?:ok(?:ay)?[, ]*|thanks?[, ]*|thank you[, ]*)*"
+    r"(?:bye|bye bye|goodbye|good bye|quit|exit|stop|end|done|cya|see (?:you|ya)(?: later)?|"
+    r"that'?s (?:all|it)|nothing else|no more questions?|i'?m done|we'?re done|end (?:the )?chat|"
+    r"later|good ?night)"
+    r"[\s.!]*$",
+    re.IGNORECASE,
+)
+_QUESTION_START = re.compile(
+    r"^\s*(?:what|how|why|who|whom|whose|when|where|which|can|could|would|should|is|are|do|does|did|"
+    r"tell|explain|write|give|show|help|list|describe|summari[sz]e|compare|translate|please)\b",
+    re.IGNORECASE,
+)
+_STOP_WORDS = re.compile(
+    r"\b(?:bye|goodbye|quit|exit|stop|end|done|finished|enough|later|leave|that'?s all)\b", re.IGNORECASE
+)
+_THANKS = re.compile(r"\b(?:thanks|thank you|thx|cheers|appreciate)\b", re.IGNORECASE)
+_NEGATION = re.compile(
+    r"\b(?:(?:don'?t|do not|not|never|no need to)\s+(?:\w+\s+)?(?:stop|end|quit|leave|done)|"
+    # deferrals: "not now, maybe later" is not a goodbye
+    r"not now|not yet|not just yet|maybe later|later maybe|perhaps later|(?:ask|talk|chat|continue) later)\b",
+    re.IGNORECASE,
+)
+
+
+def stop_probability(text: str) -> float:
+    """Tiny hand-weighted logistic model over a few surface features, a hint only.
+
+    Stop words are common in ordinary requests ("exit codes in bash", "the
+    project is done"), so a high score sends the message to the LLM rather
+    than ending the chat.
+    """
+    words = len(text.split())
+    score = -1.0
+    score += 3.0 * bool(_STOP_WORDS.search(text))
+    score += 1.5 * bool(_THANKS.search(text))
+    score -= 4.0 * bool(_NEGATION.search(text))
+    score -= 3.0 * ("?" in text)
+    # long messages are almost always a new request
+    score -= 0.35 * max(0, words - 4)
+    return 1 / (1 + math.exp(-score))
+
+
+def classify(text: str) -> Optional[Sentiment]:
+    """'stop' / 'continue' when the local rules are confident, None when the LLM should decide."""
+    if _STOP_ONLY.match(text):
+        stats["fast_stop"] += 1
+        return "stop"
+    if _STOP_WORDS.search(text) and not _NEGATION.search(text):
+        # "can we stop now", "end of file error", "I finished the report": only the LLM can tell
+        stats["llm"] += 1
+        return None
+    if "?" in text or _QUESTION_START.match(text):
+        stats["fast_continue"] += 1
+        return "continue"
+    if stop_probability(text) <= 1 - CONFIDENCE:
+        stats["fast_continue"] += 1
+        return "continue"
+    stats["llm"] += 1
+    return None
@@ -0,0 +1,85 @@
+"""Single tweet loop vs best-of-N candidates: rounds to approval and wall-clock.
+
+Runs x_tweet.py offline against a fake model with injected latency where each
+tweet the evaluator sees is approved with probability `--approve`:
+
+    python iterative-workflow/tweet_benchmark.py --trials 50 --candidates 1 3 5
+"""
+import argparse
+import os
+import random
+import re
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.fake_llm import FakeChatModel, default_structured, lognormal
+from common.loader import load_script
+
+
+def fake_structured(rng: random.Random, approve: float):
+
+    def verdict():
+        return "approved" if rng.random() < approve else "needs_improvement"
+
+    def structured(schema, prompt):
+        if "evaluations" in schema.model_fields:
+            item = schema.model_fields["evaluations"].annotation.__args__[0]
+            count = len(re.findall(r"^Candidate \d+:", prompt, re.MULTILINE))
+            return schema(evaluations=[
+                item(candidate=i, evaluation=verdict(), score=rng.randint(1, 10), feedback="fake feedback")
+                for i in range(1, count + 1)
+            ])
+        result = default_structured(schema, prompt)
+        result.evaluation = verdict()
+        return result
+
+    return structured
+
+
+def measure(tweet, candidates: int, trials: int, approve: float, latency: float, max_iteration: int) -> dict:
+    rng = random.Random(42)
+    model = FakeChatModel(latency=lognormal(latency), structured=fake_structured(rng, approve))
+    tweet.generator_llm = tweet.evaluator_llm = tweet.optimizer_llm = model
+    tweet.structured_evaluator_llm = model.with_structured_output(tweet.TweetEvaluation)
+    tweet.structured_batch_evaluator_llm = model.with_structured_output(tweet.BatchTweetEvaluation)
+    workflow = tweet.build_graph(candidates)
+
+    rounds, wall, approved = [], [], 0
+    for trial in range(trials):
+        start = time.perf_counter()
+        result = workflow.invoke({"topic": f"topic {trial}", "iteration": 1, "max_iteration": max_iteration})
+        wall.append(time.perf_counter() - start)
+        rounds.append(result["iteration"])
+        approved += result["evaluation"] == "approved"
+    return {
+        "rounds": statistics.fmean(rounds),
+        "approved": approved / trials,
+        "wall_s": statistics.fmean(wall),
+        "calls": model.calls / trials,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Single tweet loop vs best-of-N candidates.")
+    parser.add_argument("--trials", type=int, default=50)
+    parser.add_argument("--candidates", type=int, nargs="+", default=[1, 3, 5])
+    parser.add_argument("--approve", type=float, default=0.25, help="chance the evaluator approves a tweet")
+    parser.add_argument("--latency", type=float, default=0.05, help="median fake model latency in seconds")
+    parser.add_argument("--max-iteration", type=int, default=5)
+    args = parser.parse_args()
+
+    tweet = load_script("iterative-workflow/x_tweet.py")
+
+    print(f"{args.trials} trials, approval chance {args.approve}, max_iteration {args.max_iteration}\n")
+    print(f"{'candidates':<11} {'rounds':>7} {'approved':>9} {'wall s':>8} {'calls':>7}")
+    for candidates in args.candidates:
+        r = measure(tweet, candidates, args.trials, args.approve, args.latency, args.max_iteration)
+        print(f"{candidates:<11} {r['rounds']:>7.2f} {r['approved']:>8.0%} {r['wall_s']:>8.3f} {r['calls']:>7.1f}")
+    print("\nrounds = sequential generate/optimize -> evaluate rounds until approval or max_iteration")
+
+
+if __name__ == "__main__":
+    main()
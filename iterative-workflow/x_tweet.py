@@ -5,23 +5,34 @@ from pydantic import BaseModel , Field
 
 from typing import TypedDict, Literal, Annotated
 from langchain_core.messages import SystemMessage, HumanMessage
+import functools
 import operator
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.profiling import profiled, report
+from common.scheduler import scheduled
 dotenv.load_dotenv()
 
+# best-of-N mode: generate/optimize this many candidates per round concurrently
+# and score them in one evaluator call, 1 keeps the original single tweet loop
+TWEET_CANDIDATES = int(os.getenv("TWEET_CANDIDATES", "1"))
 
-generator_llm = ChatGoogleGenerativeAI(
+
+# the three clients share one scheduler queue per model name (see common/scheduler.py)
+generator_llm = scheduled(ChatGoogleGenerativeAI(
     model="gemini-2.0-flash"
-)
+))
 
 
-evaluator_llm  = ChatGoogleGenerativeAI(
+evaluator_llm  = scheduled(ChatGoogleGenerativeAI(
     model="gemini-2.0-flash"
-)
+))
 
 
-optimizer_llm = ChatGoogleGenerativeAI(
+optimizer_llm = scheduled(ChatGoogleGenerativeAI(
     model="gemini-2.5-flash-lite-preview-06-17"
-)
+))
 
 
 class TweetEvaluation(BaseModel):
@@ -32,6 +43,20 @@ class TweetEvaluation(BaseModel):
 structured_evaluator_llm = evaluator_llm.with_structured_output(TweetEvaluation)
 
 
+class CandidateEvaluation(BaseModel):
+    candidate: int = Field(..., description="Number of the candidate tweet being evaluated.")
+    evaluation: Literal["approved", "needs_improvement"] = Field(..., description="Final evaluation result.")
+    score: int = Field(..., description="Overall quality from 1 (bad) to 10 (excellent).")
+    feedback: str = Field(..., description="feedback for the tweet.")
+
+
+class BatchTweetEvaluation(BaseModel):
+    evaluations: list[CandidateEvaluation] = Field(..., description="One evaluation per candidate tweet.")
+
+
+structured_batch_evaluator_llm = evaluator_llm.with_structured_output(BatchTweetEvaluation)
+
+
 class TweetState(TypedDict):
 
     topic: str
@@ -44,15 +69,16 @@ class TweetState(TypedDict):
     tweet_history: Annotated[list[str], operator.add]
     feedback_history: Annotated[list[str], operator.add]
 
+    # best-of-N mode only: the current round's candidates
+    candidates: list[str]
 
-    
-def generate_tweet(state: TweetState):
 
-    # prompt
-    messages = [
+    
+def generate_messages(topic: str):
+    return [
         SystemMessage(content="You are a funny and clever Twitter/X influencer."),
         HumanMessage(content=f"""
-Write a short, original, and hilarious tweet on the topic: "{state['topic']}".
+Write a short, original, and hilarious tweet on the topic: "{topic}".
 
 Rules:
 - Do NOT use question-answer format.
@@ -63,6 +89,12 @@ Rules:
 """)
     ]
 
+
+def generate_tweet(state: TweetState):
+
+    # prompt
+    messages = generate_messages(state['topic'])
+
     # send generator_llm
     response = generator_llm.invoke(messages).content
 
@@ -71,17 +103,7 @@ Rules:
 
 
 
-def evaluate_tweet(state: TweetState):
-
-    # prompt
-    messages = [
-    SystemMessage(content="You are a ruthless, no-laugh-given Twitter critic. You evaluate tweets based on humor, originality, virality, and tweet format."),
-    HumanMessage(content=f"""
-Evaluate the following tweet:
-
-Tweet: "{state['tweet']}"
-
-Use the criteria below to evaluate the tweet:
+EVALUATION_CRITERIA = """Use the criteria below to evaluate the tweet:
 
 1. Originality – Is this fresh, or have you seen it a hundred times before?  
 2. Humor – Did it genuinely make you smile, laugh, or chuckle?  
@@ -95,7 +117,22 @@ Auto-reject if:
 - It reads like a traditional setup-punchline joke
 - Dont end with generic, throwaway, or deflating lines that weaken the humor (e.g., “Masterpieces of the auntie-uncle universe” or vague summaries)
 
-### Respond ONLY in structured format:
+"""
+
+EVALUATOR_PROMPT = "You are a ruthless, no-laugh-given Twitter critic. You evaluate tweets based on humor, originality, virality, and tweet format."
+
+
+def evaluate_tweet(state: TweetState):
+
+    # prompt
+    messages = [
+    SystemMessage(content=EVALUATOR_PROMPT),
+    HumanMessage(content=f"""
+Evaluate the following tweet:
+
+Tweet: "{state['tweet']}"
+
+{EVALUATION_CRITERIA}### Respond ONLY in structured format:
 - evaluation: "approved" or "needs_improvement"  
 - feedback: One paragraph explaining the strengths and weaknesses 
 """)
@@ -108,22 +145,26 @@ Auto-reject if:
 
 
 
-def optimize_tweet(state: TweetState):
-
-    messages = [
+def optimize_messages(topic: str, tweet: str, feedback: str):
+    return [
         SystemMessage(content="You punch up tweets for virality and humor based on given feedback."),
         HumanMessage(content=f"""
 Improve the tweet based on this feedback:
-"{state['feedback']}"
+"{feedback}"
 
-Topic: "{state['topic']}"
+Topic: "{topic}"
 Original Tweet:
-{state['tweet']}
+{tweet}
 
 Re-write it as a short, viral-worthy tweet. Avoid Q&A style and stay under 280 characters.
 """)
     ]
 
+
+def optimize_tweet(state: TweetState):
+
+    messages = optimize_messages(state['topic'], state['tweet'], state['feedback'])
+
     response = optimizer_llm.invoke(messages).content
     iteration = state['iteration'] + 1
 
@@ -136,37 +177,114 @@ def route_evaluation(state: TweetState):
         return 'approved'
     else:
         return 'needs_improvement'
-    
 
 
+def variation(i: int) -> str:
+    # nudge the concurrent candidates apart so they are not N copies of one tweet
+    return f"\nThis is take #{i + 1}, go for a different angle than the obvious one." if i else ""
+
+
+def generate_candidates(state: TweetState, n: int):
 
+    batch = [generate_messages(state['topic']) for _ in range(n)]
+    for i, messages in enumerate(batch):
+        messages[-1] = HumanMessage(content=messages[-1].content + variation(i))
 
+    # the N generations run concurrently, one round trip of wall-clock
+    candidates = [response.content for response in generator_llm.batch(batch)]
 
+    return {'candidates': candidates}
 
-graph = StateGraph(TweetState)
 
-graph.add_node('generate', generate_tweet)
-graph.add_node('evaluate', evaluate_tweet)
-graph.add_node('optimize', optimize_tweet)
+def evaluate_candidates(state: TweetState):
+
+    listing = "\n".join(f'Candidate {i}: "{tweet}"' for i, tweet in enumerate(state['candidates'], 1))
+
+    # all candidates scored in a single evaluator call
+    messages = [
+    SystemMessage(content=EVALUATOR_PROMPT),
+    HumanMessage(content=f"""
+Evaluate each of the following candidate tweets independently:
 
-graph.add_edge(START, 'generate')
-graph.add_edge('generate', 'evaluate')
+{listing}
+
+{EVALUATION_CRITERIA}### Respond ONLY in structured format, one entry per candidate:
+- candidate: the candidate number
+- evaluation: "approved" or "needs_improvement"
+- score: 1 to 10
+- feedback: One paragraph explaining the strengths and weaknesses
+""")
+    ]
+
+    response = structured_batch_evaluator_llm.invoke(messages)
+
+    # one evaluation per candidate: out of range numbers are dropped, the first entry for a number wins
+    evaluations = {}
+    for e in response.evaluations:
+        if 1 <= e.candidate <= len(state['candidates']):
+            evaluations.setdefault(e.candidate, e)
+    if not evaluations:
+        # nothing usable came back, refine the first candidate instead of failing the run
+        best = CandidateEvaluation(candidate=1, evaluation='needs_improvement', score=0,
+                                   feedback="No evaluation was returned. Make the tweet sharper, funnier and more original.")
+    else:
+        # any approved candidate wins, otherwise the best scored one is refined
+        best = max(evaluations.values(), key=lambda e: (e.evaluation == 'approved', e.score))
+    tweet = state['candidates'][best.candidate - 1]
+
+    return {'tweet': tweet, 'evaluation': best.evaluation, 'feedback': best.feedback,
+            'tweet_history': [tweet], 'feedback_history': [best.feedback]}
+
+
+def optimize_candidates(state: TweetState, n: int):
+
+    batch = [optimize_messages(state['topic'], state['tweet'], state['feedback']) for _ in range(n)]
+    for i, messages in enumerate(batch):
+        messages[-1] = HumanMessage(content=messages[-1].content + variation(i))
+
+    candidates = [response.content for response in optimizer_llm.batch(batch)]
+    iteration = state['iteration'] + 1
+
+    return {'candidates': candidates, 'iteration': iteration}
+
+
+def build_graph(candidates: int):
+
+    graph = StateGraph(TweetState)
+
+    if candidates > 1:
+        graph.add_node('generate', functools.partial(generate_candidates, n=candidates))
+        graph.add_node('evaluate', evaluate_candidates)
+        graph.add_node('optimize', functools.partial(optimize_candidates, n=candidates))
+    else:
+        graph.add_node('generate', generate_tweet)
+        graph.add_node('evaluate', evaluate_tweet)
+        graph.add_node('optimize', optimize_tweet)
 
-graph.add_conditional_edges('evaluate', route_evaluation, {'approved': END, 'needs_improvement': 'optimize'})
-graph.add_edge('optimize', 'evaluate')
+    graph.add_edge(START, 'generate')
+    graph.add_edge('generate', 'evaluate')
 
-workflow = graph.compile()
+    graph.add_conditional_edges('evaluate', route_evaluation, {'approved': END, 'needs_improvement': 'optimize'})
+    graph.add_edge('optimize', 'evaluate')
 
+    return graph.compile()
 
 
+single_workflow = build_graph(1)
+best_of_n_workflow = build_graph(TWEET_CANDIDATES)
 
+workflow = best_of_n_workflow if TWEET_CANDIDATES > 1 else single_workflow
 
 
-initial_state = {
-    "topic": "political life of a cat",
-    "iteration": 1,
-    "max_iteration": 5
-}
-result = workflow.invoke(initial_state)
+if __name__ == "__main__":
+    # GRAPH_PROFILE=1 shows where the time goes (see common/profiling.py)
+    workflow = profiled(workflow)
+    initial_state = {
+        "topic": "political life of a cat",
+        "iteration": 1,
+        "max_iteration": 5
+    }
+    result = workflow.invoke(initial_state)
 
-print(result)
\ No newline at end of file
+    print(result)
+    report(workflow)
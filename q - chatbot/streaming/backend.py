@@ -0,0 +1,232 @@
+"""Streaming chat server for the click chatbot (frontend.py is its client).
+
+A small asyncio HTTP/1.1 server with no framework dependency:
+
+    POST /chat   {"conversation_id": "...", "message": "..."}
+                 -> text/event-stream, one `data: {"token": ...}` event per chunk
+                    from `llm.astream`, then `event: done` with the full reply
+    GET  /health -> 200 ok
+
+    python "q - chatbot/streaming/backend.py"          # CHATBOT_HOST / CHATBOT_PORT
+
+All conversations share one model client (and so one pooled HTTP connection
+set to the provider). Each conversation streams through a bounded queue, so a
+slow reader pauses its own model stream instead of buffering the whole reply
+in memory, and turns of the same conversation run one at a time; a
+conversation with too many turns already waiting gets a 429. History is the
+same append-only log the CLI reads (conversation_log.py); the finished turn is
+appended once the reply is complete.
+"""
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+
+from dotenv import load_dotenv
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from common.scheduler import scheduled
+from conversation_log import ConversationLog
+
+load_dotenv()
+
+logger = logging.getLogger("chatbot.server")
+
+CHATBOT_HOST = os.getenv('CHATBOT_HOST', '127.0.0.1')
+CHATBOT_PORT = int(os.getenv('CHATBOT_PORT', '8765'))
+# how many past entries (user and ai messages) are sent with each new message
+CHATBOT_CONTEXT_ENTRIES = int(os.getenv('CHATBOT_CONTEXT_ENTRIES', '40'))
+# chunks buffered between the model and a slow client before the model stream is paused
+CHATBOT_STREAM_BUFFER = int(os.getenv('CHATBOT_STREAM_BUFFER', '64'))
+# turns of one conversation allowed to wait behind the one streaming, beyond that -> 429
+CHATBOT_MAX_WAITING = int(os.getenv('CHATBOT_MAX_WAITING', '2'))
+
+MAX_BODY = 1 << 20
+_DONE = object()
+
+
+def make_llm():
+    """The one Gemini client shared by every conversation."""
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    return scheduled(ChatGoogleGenerativeAI(
+        model="gemini-2.5-flash-latest",
+        google_api_key=os.getenv('GOOGLE_API_KEY'),
+        temperature=0.2,
+    ), priority="interactive")
+
+
+def format_history_for_llm(history):
+    from langchain_core.messages import HumanMessage, AIMessage
+    messages = []
+    for entry in history:
+        if entry['role'] == 'user':
+            messages.append(HumanMessage(content=entry['message']))
+        else:
+            messages.append(AIMessage(content=entry['message']))
+    return messages
+
+
+def sse(data: dict, event: str = None) -> bytes:
+    head = f"event: {event}\n" if event else ""
+    return f"{head}data: {json.dumps(data)}\n\n".encode()
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, reason: str):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+
+
+@dataclass
+class Conversation:
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    # turns streaming or waiting for the lock
+    pending: int = 0
+
+
+class ChatServer:
+
+    def __init__(self, llm=None, chat_log: ConversationLog = None):
+        self.llm = llm if llm is not None else make_llm()
+        self.chat_log = chat_log or ConversationLog()
+        self.conversations: dict[str, Conversation] = {}
+        self.active_streams = 0
+
+    # -- http -----------------------------------------------------------------
+
+    async def read_request(self, reader: asyncio.StreamReader) -> tuple[str, str, bytes]:
+        head = await reader.readuntil(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+        method, path, _ = lines[0].split(" ", 2)
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length", "0"))
+        if length > MAX_BODY:
+            raise HttpError(413, "Payload Too Large")
+        body = await reader.readexactly(length) if length else b""
+        return method, path, body
+
+    async def respond(self, writer: asyncio.StreamWriter, status: int, reason: str, body: bytes = b"",
+                      content_type: str = "text/plain"):
+        writer.write(
+            f"HTTP/1.1 {status} {reason}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            method, path, body = await self.read_request(reader)
+            if method == "GET" and path == "/health":
+                await self.respond(writer, 200, "OK", b"ok")
+            elif method == "POST" and path == "/chat":
+                try:
+                    request = json.loads(body)
+                    conversation_id, message = str(request["conversation_id"]), str(request["message"])
+                except (ValueError, KeyError, TypeError):
+                    raise HttpError(400, "Bad Request")
+                await self.chat(writer, conversation_id, message)
+            else:
+                raise HttpError(404, "Not Found")
+        except HttpError as e:
+            await self.respond(writer, e.status, e.reason, e.reason.encode())
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass  # client went away
+        except Exception:
+            logger.exception("request failed")
+        finally:
+            writer.close()
+
+    # -- chat -----------------------------------------------------------------
+
+    async def chat(self, writer: asyncio.StreamWriter, conversation_id: str, message: str):
+        conversation = self.conversations.setdefault(conversation_id, Conversation())
+        if conversation.pending > CHATBOT_MAX_WAITING:
+            raise HttpError(429, "Too Many Requests")
+        conversation.pending += 1
+        try:
+            async with conversation.lock:
+                await self.stream_turn(writer, conversation_id, message)
+        finally:
+            conversation.pending -= 1
+            if not conversation.pending:
+                self.conversations.pop(conversation_id, None)
+
+    async def produce(self, messages, queue: asyncio.Queue):
+        """Model stream -> bounded queue; `put` blocks while the client is behind."""
+        try:
+            async for chunk in self.llm.astream(messages):
+                if chunk.content:
+                    await queue.put(chunk.content)
+            await queue.put(_DONE)
+        except Exception as e:
+            await queue.put(e)
+
+    async def stream_turn(self, writer: asyncio.StreamWriter, conversation_id: str, message: str):
+        start = time.perf_counter()
+        history = await asyncio.to_thread(self.chat_log.tail, conversation_id, CHATBOT_CONTEXT_ENTRIES)
+        history.append({'role': 'user', 'message': message})
+
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+                     b"Cache-Control: no-cache\r\nConnection: close\r\n\r\n")
+        await writer.drain()
+
+        queue: asyncio.Queue = asyncio.Queue(CHATBOT_STREAM_BUFFER)
+        producer = asyncio.create_task(self.produce(format_history_for_llm(history), queue))
+        self.active_streams += 1
+        parts, ttft = [], None
+        try:
+            while True:
+                item = await queue.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, Exception):
+                    logger.error("model stream failed for %s: %r", conversation_id, item)
+                    writer.write(sse({"error": str(item)}, event="error"))
+                    await writer.drain()
+                    return
+                if ttft is None:
+                    ttft = time.perf_counter() - start
+                parts.append(item)
+                writer.write(sse({"token": item}))
+                # drain waits while the socket buffer is full, which in turn fills the queue
+                await writer.drain()
+            reply = "".join(parts)
+            await asyncio.to_thread(self.chat_log.append, conversation_id, [('user', message), ('ai', reply)])
+            writer.write(sse({"message": reply}, event="done"))
+            await writer.drain()
+            total = time.perf_counter() - start
+            logger.info("turn conversation=%s ttft=%.3fs total=%.3fs",
+                        conversation_id, ttft if ttft is not None else total, total)
+        finally:
+            # a client that disconnects mid-stream cancels the model call too
+            producer.cancel()
+            self.active_streams -= 1
+
+
+async def start_server(llm=None, host: str = CHATBOT_HOST, port: int = CHATBOT_PORT,
+                       chat_log: ConversationLog = None) -> asyncio.Server:
+    server = ChatServer(llm, chat_log)
+    return await asyncio.start_server(server.handle, host, port, backlog=1024)
+
+
+async def serve(llm=None, host: str = CHATBOT_HOST, port: int = CHATBOT_PORT):
+    server = await start_server(llm, host, port)
+    logger.info("listening on http://%s:%d", host, port)
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,138 @@
+"""Durable on-disk conversation history for the click chatbot (frontend.py).
+
+Each conversation is one append-only binary log. A record is
+
+    [length u32][role u8][utf-8 message][length u32]
+
+so the file can be walked from either end: `tail(thread_id, n)` mmaps the log
+and steps back from the end over the trailing lengths, touching only the last
+`n` records however long the conversation is. New turns are only ever
+appended (and fsynced), nothing is rewritten.
+
+`threads.idx` is an append-only log of the same record layout naming the
+thread IDs that were created ("add") or cleared ("del"), so list-threads never
+has to scan the directory or open any conversation.
+"""
+import hashlib
+import mmap
+import os
+import struct
+from typing import Iterable, Optional
+
+CHATBOT_HOME = os.getenv("CHATBOT_HOME", os.path.join(os.path.dirname(os.path.abspath(__file__)), "conversations"))
+
+_LEN = struct.Struct("<I")
+ROLES = {"user": 0, "ai": 1}
+_ROLE_NAMES = {code: role for role, code in ROLES.items()}
+_INDEX_OPS = {"add": 0, "del": 1}
+
+
+def encode(role_code: int, text: str) -> bytes:
+    payload = bytes([role_code]) + text.encode("utf-8")
+    return _LEN.pack(len(payload)) + payload + _LEN.pack(len(payload))
+
+
+def _records_forward(buf) -> tuple[list[tuple[int, int]], int]:
+    """(start, end) of each payload from the front, and where the valid data ends."""
+    records, pos = [], 0
+    while pos + 2 * _LEN.size <= len(buf):
+        (size,) = _LEN.unpack_from(buf, pos)
+        end = pos + _LEN.size + size
+        if size == 0 or end + _LEN.size > len(buf) or _LEN.unpack_from(buf, end)[0] != size:
+            break
+        records.append((pos + _LEN.size, end))
+        pos = end + _LEN.size
+    return records, pos
+
+
+def _records_backward(buf, limit: int) -> Optional[list[tuple[int, int]]]:
+    """(start, end) of the last `limit` payloads, or None if the tail is torn."""
+    records, end = [], len(buf)
+    while end > 0 and len(records) < limit:
+        if end < 2 * _LEN.size:
+            return None
+        (size,) = _LEN.unpack_from(buf, end - _LEN.size)
+        start = end - _LEN.size - size
+        if size == 0 or start < _LEN.size or _LEN.unpack_from(buf, start - _LEN.size)[0] != size:
+            return None
+        records.append((start, end - _LEN.size))
+        end = start - _LEN.size
+    records.reverse()
+    return records
+
+
+class ConversationLog:
+
+    def __init__(self, home: str = CHATBOT_HOME):
+        self.home = home
+        os.makedirs(home, exist_ok=True)
+        self.index_path = os.path.join(home, "threads.idx")
+
+    def path(self, thread_id: str) -> str:
+        # thread IDs are free text, so the file is named by their hash
+        return os.path.join(self.home, hashlib.sha1(thread_id.encode("utf-8")).hexdigest() + ".log")
+
+    def _append(self, path: str, data: bytes):
+        with open(path, "ab") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _read(self, path: str, limit: Optional[int] = None) -> list[tuple[int, str]]:
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return []
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            records = _records_backward(buf, limit) if limit is not None else None
+            if records is None:
+                # full read, or a write was cut short: scan from the front and skip the torn tail
+                records, _ = _records_forward(buf)
+                if limit is not None:
+                    records = records[-limit:] if limit else []
+            return [(buf[start], buf[start + 1:end].decode("utf-8")) for start, end in records]
+
+    def _repair(self, path: str):
+        """Cut a torn trailing record (crash mid-append) before appending after it."""
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return
+        with open(path, "r+b") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                if _records_backward(buf, 1) is not None:
+                    return
+                _, valid_end = _records_forward(buf)
+            f.truncate(valid_end)
+
+    def _append_index(self, op: str, thread_id: str):
+        # a torn index record would hide every thread added after it from `threads()`
+        self._repair(self.index_path)
+        self._append(self.index_path, encode(_INDEX_OPS[op], thread_id))
+
+    def append(self, thread_id: str, entries: Iterable[tuple[str, str]]):
+        """Append (role, message) entries to a conversation in one write."""
+        path = self.path(thread_id)
+        new = not os.path.exists(path)
+        self._repair(path)
+        self._append(path, b"".join(encode(ROLES[role], message) for role, message in entries))
+        if new:
+            self._append_index("add", thread_id)
+
+    def tail(self, thread_id: str, n: int) -> list[dict]:
+        """The last `n` entries, read from the end of the log."""
+        return [{"role": _ROLE_NAMES[code], "message": text} for code, text in self._read(self.path(thread_id), n)]
+
+    def history(self, thread_id: str) -> list[dict]:
+        return [{"role": _ROLE_NAMES[code], "message": text} for code, text in self._read(self.path(thread_id))]
+
+    def threads(self) -> list[str]:
+        threads: dict[str, None] = {}
+        for op, thread_id in self._read(self.index_path):
+            if op == _INDEX_OPS["add"]:
+                threads[thread_id] = None
+            else:
+                threads.pop(thread_id, None)
+        return list(threads)
+
+    def clear(self, thread_id: str):
+        path = self.path(thread_id)
+        if os.path.exists(path):
+            os.remove(path)
+            self._append_index("del", thread_id)
@@ -1,63 +1,90 @@
+import time
+_START = time.perf_counter()
+
 import os
 from dotenv import load_dotenv
 import click
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.messages import HumanMessage, AIMessage
+from conversation_log import ConversationLog
+# the model lives in backend.py: send streams from it over HTTP, history,
+# list-threads and clear only read the local logs, so no langchain import here
 
 # Load environment variables from .env
 load_dotenv()
 
 CHATBOT_NAME = os.getenv('CHATBOT_NAME', 'my-chatbot')
-GOOGLE_API_KEY = os.getenv('GOOGLE_API_KEY')
+# where backend.py is listening
+CHATBOT_URL = os.getenv('CHATBOT_URL', 'http://127.0.0.1:8765')
 
-# In-memory chat history: {conversation_id: [ {'role': 'user'|'ai', 'message': str}, ... ] }
-chat_histories = {}
+# Chat history lives on disk, one append-only log per conversation (see conversation_log.py)
+chat_log = ConversationLog()
 
-# Gemini 2.5 Flash Lite via LangChain
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash-latest",
-    google_api_key=GOOGLE_API_KEY,
-    temperature=0.2,
-)
+# startup phases in seconds, reported by --profile-startup
+_timings = {}
 
-def store_chat_history(conversation_id, role, message):
-    if conversation_id not in chat_histories:
-        chat_histories[conversation_id] = []
-    chat_histories[conversation_id].append({'role': role, 'message': message})
+def retrieve_chat_history(conversation_id, limit=None):
+    if limit is None:
+        return chat_log.history(conversation_id)
+    return chat_log.tail(conversation_id, limit)
 
-def retrieve_chat_history(conversation_id):
-    return chat_histories.get(conversation_id, [])
+def stream_chat(conversation_id, user_message):
+    """Yield the reply chunks as the backend streams them (Server-Sent Events)."""
+    import http.client
+    import json
+    from urllib.parse import urlsplit
 
-def format_history_for_llm(history):
-    messages = []
-    for entry in history:
-        if entry['role'] == 'user':
-            messages.append(HumanMessage(content=entry['message']))
-        else:
-            messages.append(AIMessage(content=entry['message']))
-    return messages
+    url = urlsplit(CHATBOT_URL)
+    connection = http.client.HTTPConnection(url.hostname, url.port or 80)
+    try:
+        connection.request('POST', '/chat', json.dumps({'conversation_id': conversation_id, 'message': user_message}),
+                           {'Content-Type': 'application/json'})
+        response = connection.getresponse()
+        if response.status != 200:
+            raise click.ClickException(f"backend returned {response.status} {response.reason}")
+        event = 'message'
+        for raw in response:
+            line = raw.decode('utf-8').rstrip('\r\n')
+            if line.startswith('event:'):
+                event = line[len('event:'):].strip()
+            elif line.startswith('data:'):
+                data = json.loads(line[len('data:'):])
+                if event == 'error':
+                    raise click.ClickException(f"model error: {data['error']}")
+                if event == 'done':
+                    return
+                yield data['token']
+            elif not line:
+                event = 'message'
+    except ConnectionError as e:
+        raise click.ClickException(f"cannot reach the chat backend at {CHATBOT_URL} ({e}), start backend.py first")
+    finally:
+        connection.close()
 
-def chat(conversation_id, user_message):
-    store_chat_history(conversation_id, 'user', user_message)
-    history = retrieve_chat_history(conversation_id)
-    messages = format_history_for_llm(history)
-    response = llm(messages)
-    ai_message = response.content if hasattr(response, 'content') else str(response)
-    store_chat_history(conversation_id, 'ai', ai_message)
-    return ai_message
+def report_startup():
+    click.echo("startup profile:", err=True)
+    for phase, seconds in _timings.items():
+        click.echo(f"  {phase:<30} {seconds * 1000:8.1f} ms", err=True)
+    click.echo(f"  {'total':<30} {(time.perf_counter() - _START) * 1000:8.1f} ms", err=True)
 
 @click.group()
-def cli():
-    """Customizable Gemini 2.5 Flash Lite Chatbot CLI (in-memory, no DB)"""
-    pass
+@click.option('--profile-startup', is_flag=True, help='Report startup time on stderr.')
+@click.pass_context
+def cli(ctx, profile_startup):
+    """Customizable Gemini 2.5 Flash Lite Chatbot CLI (history kept in local append-only logs)"""
+    _timings.setdefault('module import', time.perf_counter() - _START)
+    if profile_startup:
+        ctx.call_on_close(report_startup)
 
 @cli.command()
 @click.option('--conversation-id', prompt=True, help='Conversation/thread ID')
 @click.option('--message', prompt=True, help='Your message')
 def send(conversation_id, message):
     """Send a message to the chatbot (with threading and history)."""
-    response = chat(conversation_id, message)
-    click.echo(f"AI: {response}")
+    chunks = stream_chat(conversation_id, message)
+    # connection errors surface here, before anything is printed
+    click.echo("AI: " + next(chunks, ""), nl=False)
+    for token in chunks:
+        click.echo(token, nl=False)
+    click.echo()
 
 @cli.command()
 @click.option('--conversation-id', prompt=True, help='Conversation/thread ID')
@@ -70,14 +97,14 @@ def history(conversation_id):
 @cli.command()
 def list_threads():
     """List all conversation/thread IDs."""
-    for t in chat_histories.keys():
+    for t in chat_log.threads():
         click.echo(t)
 
 @cli.command()
 @click.option('--conversation-id', prompt=True, help='Conversation/thread ID')
 def clear(conversation_id):
     """Clear chat history for a conversation/thread."""
-    chat_histories.pop(conversation_id, None)
+    chat_log.clear(conversation_id)
     click.echo(f"Cleared history for {conversation_id}")
 
 if __name__ == '__main__':
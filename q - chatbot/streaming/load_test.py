@@ -0,0 +1,127 @@
+"""Load test for backend.py: concurrent SSE streams per core and time to first token.
+
+Starts the backend in a subprocess with a fake streaming model (fixed latency
+to the first token, then `--token-rate` tokens/sec) and opens N concurrent
+/chat streams at each level, each on its own conversation:
+
+    python "q - chatbot/streaming/load_test.py" --levels 10 100 500 --tokens 60
+
+"streams/core" is the concurrency level divided by the server's CPU
+utilisation during that level, i.e. roughly how many such streams one core
+could keep going before it saturates.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(os.path.dirname(HERE))
+
+SERVER = """
+import asyncio, sys
+sys.path.insert(0, {root!r})
+from common.fake_llm import FakeChatModel, lognormal
+import backend
+llm = FakeChatModel(latency=lognormal({latency}, 0.3), token_rate={rate}, reply=lambda prompt: "word " * {tokens})
+asyncio.run(backend.serve(llm, "127.0.0.1", {port}))
+"""
+
+
+def cpu_seconds(pid: int):
+    """utime + stime of a process, from /proc (Linux only)."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+async def stream(port: int, conversation_id: str) -> tuple[float, float, int]:
+    start = time.perf_counter()
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = json.dumps({"conversation_id": conversation_id, "message": "hello there"}).encode()
+    writer.write(b"POST /chat HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                 b"Content-Length: " + str(len(body)).encode() + b"\r\n\r\n" + body)
+    await writer.drain()
+    ttft, tokens = None, 0
+    status = await reader.readline()
+    if b" 200 " not in status:
+        raise RuntimeError(status.decode().strip())
+    async for line in reader:
+        if line.startswith(b"data:") and b'"token"' in line:
+            tokens += 1
+            if ttft is None:
+                ttft = time.perf_counter() - start
+    writer.close()
+    return ttft or 0.0, time.perf_counter() - start, tokens
+
+
+async def level(port: int, concurrency: int, round_id: int):
+    start = time.perf_counter()
+    results = await asyncio.gather(*(stream(port, f"load-{round_id}-{i}") for i in range(concurrency)))
+    return results, time.perf_counter() - start
+
+
+async def wait_ready(port: int, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b"GET /health HTTP/1.1\r\nHost: localhost\r\n\r\n")
+            await writer.drain()
+            if b"200" in await reader.readline():
+                writer.close()
+                return
+        except OSError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("backend did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent SSE streams against backend.py with a fake model.")
+    parser.add_argument("--levels", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--latency", type=float, default=0.3, help="median fake time to first token in seconds")
+    parser.add_argument("--token-rate", type=float, default=50, help="fake tokens/sec per stream")
+    parser.add_argument("--tokens", type=int, default=60, help="tokens per reply")
+    parser.add_argument("--port", type=int, default=8799)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        code = SERVER.format(root=REPO_ROOT, latency=args.latency, rate=args.token_rate, tokens=args.tokens, port=args.port)
+        server = subprocess.Popen([sys.executable, "-c", code], cwd=HERE, env={**os.environ, "CHATBOT_HOME": tmp})
+        try:
+            asyncio.run(wait_ready(args.port))
+            print(f"fake model: ttft ~{args.latency}s, {args.tokens} tokens at {args.token_rate}/s\n")
+            print(f"{'streams':>8} {'wall s':>7} {'ttft p50':>9} {'ttft p95':>9} {'total p50':>10} "
+                  f"{'server cpu s':>13} {'streams/core':>13}")
+            for round_id, concurrency in enumerate(args.levels):
+                cpu_before = cpu_seconds(server.pid)
+                results, wall = asyncio.run(level(args.port, concurrency, round_id))
+                cpu_after = cpu_seconds(server.pid)
+                assert all(tokens == args.tokens for _, _, tokens in results), "incomplete streams"
+                ttfts = sorted(ttft for ttft, _, _ in results)
+                totals = sorted(total for _, total, _ in results)
+                p95 = ttfts[min(len(ttfts) - 1, int(0.95 * len(ttfts)))]
+                if cpu_before is None or cpu_after is None:
+                    cpu, per_core = "n/a", "n/a"
+                else:
+                    used = cpu_after - cpu_before
+                    cpu = f"{used:.2f}"
+                    per_core = f"{concurrency / (used / wall):.0f}" if used else "inf"
+                print(f"{concurrency:>8} {wall:>7.2f} {statistics.median(ttfts) * 1000:>7.0f}ms {p95 * 1000:>7.0f}ms "
+                      f"{statistics.median(totals) * 1000:>8.0f}ms {cpu:>13} {per_core:>13}")
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Cold start time of each frontend.py subcommand, lazy vs eager client setup.
+
+Every sample is a fresh interpreter. "eager" forces the langchain import and
+Gemini client construction first, which is what every command used to pay.
+The model now lives in backend.py, so `send` only measures the client side
+startup (frontend plus its HTTP/SSE imports, no request):
+
+    python "q - chatbot/streaming/startup_benchmark.py" --repeat 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+COMMANDS = {
+    "history": ["history", "--conversation-id", "bench"],
+    "list-threads": ["list-threads"],
+    "clear": ["clear", "--conversation-id", "bench"],
+    "send": None,
+}
+
+
+def script(command, eager: bool) -> str:
+    lines = ["import sys", "import frontend"]
+    if eager:
+        lines += ["import backend", "backend.make_llm()"]
+    if command is None:
+        lines.append("import http.client, json, urllib.parse")
+    else:
+        lines.append(f"sys.argv = ['frontend.py', *{command!r}]")
+        lines.append("frontend.cli()")
+    return "; ".join(lines)
+
+
+def cold_start(command, eager: bool, repeat: int, env: dict) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", script(command, eager)], cwd=HERE, env=env,
+                       stdout=subprocess.DEVNULL, check=True)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold start time per frontend.py subcommand.")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # GOOGLE_API_KEY only has to exist for the client to build, CHATBOT_HOME keeps
+        # the runs away from the real conversation logs
+        env = {**os.environ, "GOOGLE_API_KEY": os.environ.get("GOOGLE_API_KEY", "startup-benchmark"), "CHATBOT_HOME": tmp}
+        print(f"median of {args.repeat} cold starts\n")
+        print(f"{'command':<14} {'eager ms':>9} {'lazy ms':>9}")
+        for name, command in COMMANDS.items():
+            eager = cold_start(command, True, args.repeat, env)
+            lazy = cold_start(command, False, args.repeat, env)
+            print(f"{name:<14} {eager * 1000:>9.0f} {lazy * 1000:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
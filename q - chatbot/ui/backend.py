@@ -1,31 +1,109 @@
 from langgraph.graph import StateGraph, START, END
 from typing import TypedDict, Annotated
-from langchain_core.messages import BaseMessage
+from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langgraph.checkpoint.memory import InMemorySaver
 from langgraph.graph.message import add_messages
 from dotenv import load_dotenv
+import logging
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from common.context import CONTEXT_LAST_K, CONTEXT_MODE, build_prompt, update_summary
+from common.retention import retained
+from common.scheduler import scheduled
+from common.sqlite_saver import SqliteSaver
 
 load_dotenv()
 
-llm = ChatGoogleGenerativeAI(
+logger = logging.getLogger("chatbot")
+
+# where the chat threads are persisted, set CHATBOT_DB=memory to keep them in RAM only
+CHATBOT_DB = os.getenv("CHATBOT_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "chatbot.sqlite"))
+
+# the message list is checkpointed as deltas with a full snapshot every N versions, 0 stores it whole every time
+CHATBOT_SNAPSHOT_EVERY = int(os.getenv("CHATBOT_SNAPSHOT_EVERY", "32"))
+
+llm = scheduled(ChatGoogleGenerativeAI(
     model="gemini-2.5-flash-lite",
-)
+), priority="interactive")
 
 class ChatState(TypedDict):
     messages: Annotated[list[BaseMessage], add_messages]
+    # running summary of the turns that no longer go to the model verbatim
+    summary: str
+    summarized: int
+
+def context_node(state: ChatState):
+    # its own node so the summary call is not streamed to the UI as reply tokens
+    if CONTEXT_MODE != "summary":
+        return {}
+    summary, summarized = update_summary(
+        llm, state['messages'], state.get('summary', ''), state.get('summarized', 0), CONTEXT_LAST_K)
+    return {"summary": summary, "summarized": summarized}
 
 def chat_node(state: ChatState):
-    messages = state['messages']
+    # only a bounded window of the history goes to the model (see common/context.py)
+    messages = build_prompt(state['messages'], CONTEXT_MODE,
+                            summary=state.get('summary', ''), summarized=state.get('summarized', 0))
+    # invoke is enough: under stream_mode="messages" langgraph switches the model
+    # to streaming and forwards every token chunk to the caller
     response = llm.invoke(messages)
     return {"messages": [response]}
 
-# Checkpointer
-checkpointer = InMemorySaver()
+def build_chatbot(checkpointer=None):
+    graph = StateGraph(ChatState)
+    graph.add_node("context", context_node)
+    graph.add_node("chat_node", chat_node)
+    graph.add_edge(START, "context")
+    graph.add_edge("context", "chat_node")
+    graph.add_edge("chat_node", END)
+
+    return graph.compile(checkpointer=checkpointer if checkpointer is not None else InMemorySaver())
+
+# Checkpointer, old checkpoints are compacted when CHECKPOINT_KEEP_LAST / _KEEP_FINAL / _MAX_AGE is set
+store = InMemorySaver() if CHATBOT_DB == "memory" else SqliteSaver(CHATBOT_DB, snapshot_every=CHATBOT_SNAPSHOT_EVERY)
+checkpointer = retained(store)
+
+chatbot = build_chatbot(checkpointer)
+
+
+def stream_reply(user_input: str, config: dict):
+    """Yield the assistant reply token by token and log time-to-first-token and total latency."""
+    start = time.perf_counter()
+    ttft = None
+    for chunk, metadata in chatbot.stream({'messages': [HumanMessage(content=user_input)]}, config=config, stream_mode="messages"):
+        if metadata.get('langgraph_node') != 'chat_node' or not chunk.content:
+            continue
+        if ttft is None:
+            ttft = time.perf_counter() - start
+        yield chunk.content
+    total = time.perf_counter() - start
+    logger.info("turn thread=%s ttft=%.3fs total=%.3fs",
+                config['configurable']['thread_id'], ttft if ttft is not None else total, total)
+
+
+def retrieve_all_threads() -> list[str]:
+    """Thread ids stored in the checkpointer, most recent first."""
+    if isinstance(store, SqliteSaver):
+        return store.list_threads()
+    return list(reversed(store.storage.keys()))
+
 
-graph = StateGraph(ChatState)
-graph.add_node("chat_node", chat_node)
-graph.add_edge(START, "chat_node")
-graph.add_edge("chat_node", END)
+def load_history(thread_id: str, limit: int) -> tuple[list[dict], int]:
+    """The last `limit` chat messages of a thread as {'role', 'content'} dicts, plus how many there are.
 
-chatbot = graph.compile(checkpointer=checkpointer)
\ No newline at end of file
+    Only human and AI messages are rendered, so both the window and the count
+    skip the rest (system, tool), otherwise "load older" never runs out.
+    """
+    state = chatbot.get_state({'configurable': {'thread_id': thread_id}})
+    messages = [
+        message for message in state.values.get('messages', [])
+        if isinstance(message, (HumanMessage, AIMessage))
+    ]
+    window = [
+        {'role': 'user' if isinstance(message, HumanMessage) else 'assistant', 'content': message.content}
+        for message in messages[-limit:]
+    ]
+    return window, len(messages)
@@ -0,0 +1,89 @@
+"""Checkpoint write/read latency and storage size: SqliteSaver vs InMemorySaver.
+
+Builds chat threads of 10, 100 and 1000 messages through the real chatbot graph
+(with an offline fake model) and measures the checkpointer underneath:
+
+    python "q - chatbot/ui/benchmark.py"
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import InMemorySaver
+
+from common.fake_llm import FakeChatModel
+from common.loader import load_script
+from common.sqlite_saver import SqliteSaver
+
+
+def in_memory_size(saver: InMemorySaver) -> int:
+    size = sum(len(value) for _, value in saver.blobs.values())
+    for namespaces in saver.storage.values():
+        for checkpoints in namespaces.values():
+            for checkpoint, metadata, _ in checkpoints.values():
+                size += len(checkpoint[1]) + len(metadata[1])
+    for writes in saver.writes.values():
+        size += sum(len(value[1]) for _, _, value, _ in writes.values())
+    return size
+
+
+def timed(method, durations: list[float]):
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            durations.append(time.perf_counter() - start)
+    return wrapper
+
+
+def measure(backend, saver, messages: int, reads: int) -> dict:
+    puts = []
+    saver.put = timed(saver.put, puts)
+    chatbot = backend.build_chatbot(saver)
+    config = {'configurable': {'thread_id': f'bench-{messages}'}}
+    for turn in range(messages // 2):
+        chatbot.invoke({'messages': [HumanMessage(content=f'message {turn} ' + 'lorem ipsum ' * 20)]}, config=config)
+    # the last turns write the largest checkpoints, that is the cost that matters
+    write_ms = statistics.fmean(puts[-6:]) * 1000
+
+    start = time.perf_counter()
+    for _ in range(reads):
+        state = saver.get_tuple(config)
+    read_ms = (time.perf_counter() - start) / reads * 1000
+    assert len(state.checkpoint['channel_values']['messages']) == messages
+
+    size = saver.size_bytes() if isinstance(saver, SqliteSaver) else in_memory_size(saver)
+    return {'write_ms': write_ms, 'read_ms': read_ms, 'size_kb': size / 1024}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SqliteSaver vs InMemorySaver.")
+    parser.add_argument("--messages", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--reads", type=int, default=20)
+    args = parser.parse_args()
+
+    os.environ["CHATBOT_DB"] = "memory"
+    backend = load_script("q - chatbot/ui/backend.py")
+    backend.llm = FakeChatModel()
+
+    print(f"{'messages':>8} {'saver':<14} {'put ms':>8} {'get ms':>8} {'size KiB':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for messages in args.messages:
+            savers = {
+                'InMemorySaver': InMemorySaver(),
+                'SqliteSaver': SqliteSaver(os.path.join(tmp, f'{messages}.sqlite')),
+            }
+            for name, saver in savers.items():
+                result = measure(backend, saver, messages, args.reads)
+                print(f"{messages:>8} {name:<14} {result['write_ms']:>8.3f} {result['read_ms']:>8.3f} {result['size_kb']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
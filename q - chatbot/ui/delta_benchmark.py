@@ -0,0 +1,97 @@
+"""Bytes written per step: full vs delta encoded message checkpoints in SqliteSaver.
+
+Runs a 500 turn conversation through the real chatbot graph (offline fake
+model) once per `snapshot_every` setting and records how many bytes each
+turn adds to the checkpoint tables, plus `get_state` latency at the end:
+
+    python "q - chatbot/ui/delta_benchmark.py" --turns 500 --snapshot-every 0 16 64
+
+`snapshot_every=0` is the old behaviour, the whole message list on every step.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from langchain_core.messages import HumanMessage
+
+from common.fake_llm import FakeChatModel
+from common.loader import load_script
+from common.sqlite_saver import SqliteSaver
+
+
+def stored_bytes(saver: SqliteSaver) -> int:
+    return sum(
+        saver.conn.execute(f"SELECT COALESCE(SUM(LENGTH({column})), 0) FROM {table}").fetchone()[0]
+        for table, column in (("blobs", "value"), ("checkpoints", "checkpoint"), ("writes", "value"))
+    )
+
+
+def timed(method, durations: list[float]):
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            durations.append(time.perf_counter() - start)
+    return wrapper
+
+
+def measure(backend, saver: SqliteSaver, turns: int, reads: int) -> dict:
+    chatbot = backend.build_chatbot(saver)
+    config = {'configurable': {'thread_id': 'bench'}}
+    per_turn, put_s = [], []
+    saver.put = timed(saver.put, put_s)
+    before = 0
+    for turn in range(turns):
+        chatbot.invoke({'messages': [HumanMessage(content=f'message {turn} ' + 'lorem ipsum ' * 20)]}, config=config)
+        saver.flush()
+        total = stored_bytes(saver)
+        per_turn.append(total - before)
+        before = total
+
+    durations = []
+    for _ in range(reads):
+        start = time.perf_counter()
+        state = chatbot.get_state(config)
+        durations.append(time.perf_counter() - start)
+    assert len(state.values['messages']) == 2 * turns
+    return {
+        'per_turn': per_turn,
+        'total_mb': before / 1e6,
+        'put_ms': statistics.fmean(put_s[-30:]) * 1000,
+        'get_ms': statistics.median(durations) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Full vs delta encoded message checkpoints.")
+    parser.add_argument("--turns", type=int, default=500)
+    parser.add_argument("--snapshot-every", type=int, nargs="+", default=[0, 16, 64])
+    parser.add_argument("--reads", type=int, default=20)
+    args = parser.parse_args()
+
+    os.environ["CHATBOT_DB"] = "memory"
+    backend = load_script("q - chatbot/ui/backend.py")
+    backend.llm = FakeChatModel()
+
+    marks = sorted({1, 10, 100, args.turns} & set(range(1, args.turns + 1)))
+    print(f"{args.turns} turns, bytes added to the checkpoint tables per turn (mean of the 10 turns up to the mark)\n")
+    print(f"{'snapshot':>8} " + " ".join(f"{f'turn {mark}':>10}" for mark in marks)
+          + f" {'total MB':>9} {'put ms':>7} {'get ms':>7}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for every in args.snapshot_every:
+            saver = SqliteSaver(os.path.join(tmp, f'{every}.sqlite'), snapshot_every=every)
+            r = measure(backend, saver, args.turns, args.reads)
+            cells = " ".join(f"{statistics.fmean(r['per_turn'][max(0, mark - 10):mark]):>10.0f}" for mark in marks)
+            label = every or "off"
+            print(f"{label:>8} {cells} {r['total_mb']:>9.2f} {r['put_ms']:>7.2f} {r['get_ms']:>7.2f}")
+            saver.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,73 @@
+import logging
+import uuid
 import streamlit as st
-from backend import chatbot
-from langchain_core.messages import HumanMessage
+from backend import stream_reply, retrieve_all_threads, load_history
 
-# st.session_state -> dict -> 
-CONFIG = {'configurable': {'thread_id': 'thread-1'}}
+# TTFT / total latency per turn is logged by the backend
+logging.basicConfig(level=logging.INFO)
 
-if 'message_history' not in st.session_state:
-    st.session_state['message_history'] = []
+# only this many of the most recent messages are rendered, older ones are
+# fetched from the checkpointer a page at a time on request
+PAGE_SIZE = 50
+
+# st.session_state -> dict ->
+#   thread_id -> the conversation shown in the main pane
+#   threads   -> thread ids for the sidebar, loaded from the checkpointer once
+#   visible   -> the rendered window of messages (at most `limit`)
+#   limit     -> window size, grows by PAGE_SIZE on "load older messages"
+#   total     -> number of rendered (human / AI) messages in the thread
+
+
+def open_thread(thread_id, limit=PAGE_SIZE):
+    st.session_state['thread_id'] = thread_id
+    st.session_state['limit'] = limit
+    st.session_state['visible'], st.session_state['total'] = load_history(thread_id, limit)
+
+
+def new_chat():
+    thread_id = str(uuid.uuid4())
+    st.session_state['threads'].insert(0, thread_id)
+    st.session_state['thread_id'] = thread_id
+    st.session_state['limit'] = PAGE_SIZE
+    st.session_state['visible'] = []
+    st.session_state['total'] = 0
+
+
+def remember(role, content):
+    # keep the rendered window bounded, the checkpointer has the full thread
+    st.session_state['visible'].append({'role': role, 'content': content})
+    st.session_state['total'] += 1
+    del st.session_state['visible'][:-st.session_state['limit']]
+
+
+if 'threads' not in st.session_state:
+    st.session_state['threads'] = retrieve_all_threads()
+    new_chat()
+
+CONFIG = {'configurable': {'thread_id': st.session_state['thread_id']}}
+
+# sidebar with the list of conversations
+st.sidebar.title('Chats')
+st.sidebar.button('New chat', on_click=new_chat)
+for thread_id in st.session_state['threads']:
+    st.sidebar.button(
+        thread_id[:8],
+        key=f'thread-{thread_id}',
+        on_click=open_thread,
+        args=(thread_id,),
+        type='primary' if thread_id == st.session_state['thread_id'] else 'secondary',
+    )
 
 # loading the conversation history
-for message in st.session_state['message_history']:
+hidden = st.session_state['total'] - len(st.session_state['visible'])
+if hidden > 0:
+    st.button(
+        f'Load older messages ({hidden} more)',
+        on_click=open_thread,
+        args=(st.session_state['thread_id'], st.session_state['limit'] + PAGE_SIZE),
+    )
+
+for message in st.session_state['visible']:
     with st.chat_message(message['role']):
         st.text(message['content'])
 
@@ -20,15 +78,13 @@ user_input = st.chat_input('Type here')
 
 if user_input:
 
-    # first add the message to message_history
-    st.session_state['message_history'].append({'role': 'user', 'content': user_input})
+    # first add the message to the rendered window
+    remember('user', user_input)
     with st.chat_message('user'):
         st.text(user_input)
 
-    response = chatbot.invoke({'messages': [HumanMessage(content=user_input)]}, config=CONFIG)
-    
-    ai_message = response['messages'][-1].content
-    # first add the message to message_history
-    st.session_state['message_history'].append({'role': 'assistant', 'content': ai_message})
+    # render the reply token by token as the model streams it
     with st.chat_message('assistant'):
-        st.text(ai_message)
\ No newline at end of file
+        ai_message = st.write_stream(stream_reply(user_input, CONFIG))
+
+    remember('assistant', ai_message)
@@ -0,0 +1,104 @@
+"""compare/execute cost with 100k stored tasks: save.txt JSON rewrite vs TaskStore.
+
+The legacy functions below are the old compare/execute file handling, kept
+here only to measure against:
+
+    python todo/benchmark.py --tasks 100000 --commands 100
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from task_store import TaskStore
+
+
+def make_task(i: int, desc: str = None) -> dict:
+    return {"taskid": f"T{i}", "title": f"Task {i}", "description": desc or f"Do thing number {i}",
+            "due_date": None, "priority": None, "category": "personal", "status": "havent started"}
+
+
+def make_commands(tasks: int, commands: int) -> list[dict]:
+    third = commands // 3
+    adds = [{**make_task(tasks + i), "command": "add"} for i in range(third)]
+    updates = [{**make_task(i * 7, "changed"), "command": "update"} for i in range(third)]
+    removes = [{**make_task(i * 11 + 1), "command": "remove"} for i in range(commands - 2 * third)]
+    return adds + updates + removes
+
+
+def legacy_lookup(save_path: str, taskid: str):
+    with open(save_path) as f:
+        data = json.load(f)
+    return data["summary"].get(taskid)
+
+
+def legacy_execute(save_path: str, commandList: list[dict]):
+    with open(save_path) as f:
+        previous_data = json.load(f)
+    summary_dict = previous_data.get("summary", {})
+    for cmd_dict in commandList:
+        if cmd_dict["command"] in ("add", "update"):
+            summary_dict[cmd_dict["taskid"]] = cmd_dict["description"]
+        elif cmd_dict["command"] == "remove":
+            summary_dict.pop(cmd_dict["taskid"], None)
+    todos = previous_data.get("todos", [])
+    todos = [todo for todo in todos if todo.get("taskid") not in [cmd["taskid"] for cmd in commandList if cmd["command"] == "remove"]]
+    for cmd_dict in commandList:
+        if cmd_dict["command"] in ["add", "update"]:
+            todos = [todo for todo in todos if todo.get("taskid") != cmd_dict["taskid"]]
+            todos.append({k: v for k, v in cmd_dict.items() if k != "command"})
+    with open(save_path, "w") as f:
+        json.dump({"todos": todos, "summary": summary_dict}, f, indent=2)
+
+
+def timed(fn, *args) -> float:
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="save.txt rewrite vs TaskStore.")
+    parser.add_argument("--tasks", type=int, default=100_000)
+    parser.add_argument("--commands", type=int, default=100)
+    args = parser.parse_args()
+
+    tasks = [make_task(i) for i in range(args.tasks)]
+    commands = make_commands(args.tasks, args.commands)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        save_path = os.path.join(tmp, "save.txt")
+        with open(save_path, "w") as f:
+            json.dump({"todos": tasks, "summary": {t["taskid"]: t["description"] for t in tasks}}, f, indent=2)
+
+        db_path = os.path.join(tmp, "tasks.sqlite")
+        store = TaskStore(db_path, legacy_path=None)
+        store.apply({**t, "command": "add"} for t in tasks)
+        store.close()
+
+        start = time.perf_counter()
+        store = TaskStore(db_path, legacy_path=None)
+        open_time = time.perf_counter() - start
+
+        results = {
+            "open / load index": (0.0, open_time),
+            "lookup one task": (timed(legacy_lookup, save_path, "T500"), timed(store.get, "T500")),
+            f"apply {args.commands} commands": (timed(legacy_execute, save_path, commands), timed(store.apply, commands)),
+            "apply 1 command": (timed(legacy_execute, save_path, commands[:1]), timed(store.apply, commands[:1])),
+        }
+        assert len(store) == args.tasks + args.commands // 3 - (args.commands - 2 * (args.commands // 3))
+
+    print(f"{args.tasks} stored tasks\n")
+    print(f"{'operation':<22} {'save.txt s':>11} {'TaskStore s':>12}")
+    for name, (legacy, new) in results.items():
+        print(f"{name:<22} {legacy:>11.4f} {new:>12.5f}")
+    print("\nsave.txt has no open cost but pays a full json load in every compare/execute;")
+    print("TaskStore loads its index once per process.")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,14 +3,19 @@ import dotenv
 from langgraph.graph import StateGraph, START, END
 from typing import TypedDict, Literal
 import datetime
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.llm_cache import cached
+from common.scheduler import scheduled
 dotenv.load_dotenv()
 
 savedList = {'savedList': 'Here is your task list:\n\n*   Buy groceries\n*   Call mom\n*   Finish project report on operating system\n*   Finish laundry\n*   Call manager about meeting', 'category': "Here's the categorization of your tasks:\n\n**Work:**\n*   Call manager about meeting\n\n**College:**\n*   Finish project report on operating system\n\n**Personal:**\n*   Buy groceries\n*   Call mom\n*   Finish laundry"}
 
 # model initialization
-model = ChatGoogleGenerativeAI(
+model = scheduled(cached(ChatGoogleGenerativeAI(
     model = "gemini-2.5-flash"
-    )
+    )))
 
 ## add structured output for model
 ## use conditional flow 
@@ -0,0 +1,90 @@
+"""Task store for todo/test.py.
+
+Tasks live in a small SQLite table (one row per task, WAL mode) with an
+in-memory dict index by taskid on top, so lookups are dict hits and each
+add/update/remove command is one row write instead of rewriting the whole
+save file. A batch of commands is applied in a single transaction, so a crash
+leaves either all of them or none on disk. One store can be shared by graph
+runs on any thread (batch, async, worker pools): the connection and the index
+are guarded by a lock.
+"""
+import json
+import os
+import sqlite3
+import threading
+from typing import Iterable, Optional
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tasks.sqlite")
+LEGACY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "save.txt")
+
+
+def description(task: dict) -> str:
+    return task.get("description", task.get("concise_description", ""))
+
+
+class TaskStore:
+
+    def __init__(self, path: str = DEFAULT_PATH, legacy_path: Optional[str] = LEGACY_PATH):
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS tasks (taskid TEXT PRIMARY KEY, data TEXT NOT NULL)")
+        self.tasks: dict[str, dict] = {
+            taskid: json.loads(data) for taskid, data in self.conn.execute("SELECT taskid, data FROM tasks")
+        }
+        if not self.tasks and legacy_path and os.path.exists(legacy_path):
+            self._import_legacy(legacy_path)
+
+    def _import_legacy(self, path: str):
+        # one-off migration of the old save.txt ({"todos": [...], "summary": {...}})
+        with open(path) as f:
+            try:
+                todos = json.load(f).get("todos", [])
+            except ValueError:
+                return
+        self.apply({**todo, "command": "add"} for todo in todos)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self.tasks)
+
+    def __contains__(self, taskid) -> bool:
+        with self._lock:
+            return str(taskid) in self.tasks
+
+    def get(self, taskid) -> Optional[dict]:
+        with self._lock:
+            return self.tasks.get(str(taskid))
+
+    def summary(self) -> dict[str, str]:
+        """taskid -> description, what save.txt used to keep under "summary"."""
+        with self._lock:
+            return {taskid: description(task) for taskid, task in self.tasks.items()}
+
+    def apply(self, commands: Iterable[dict]) -> None:
+        """Apply add/update/remove commands atomically, O(1) each."""
+        upserts, removals = {}, set()
+        for cmd in commands:
+            taskid = str(cmd["taskid"])
+            if cmd["command"] in ("add", "update"):
+                upserts[taskid] = {k: v for k, v in cmd.items() if k != "command"}
+                removals.discard(taskid)
+            elif cmd["command"] == "remove":
+                upserts.pop(taskid, None)
+                removals.add(taskid)
+        with self._lock:
+            with self.conn:
+                self.conn.execute("BEGIN")
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO tasks (taskid, data) VALUES (?, ?)",
+                    [(taskid, json.dumps(task, default=str)) for taskid, task in upserts.items()],
+                )
+                self.conn.executemany("DELETE FROM tasks WHERE taskid = ?", [(taskid,) for taskid in removals])
+            # only touch the index once the transaction is committed
+            self.tasks.update(upserts)
+            for taskid in removals:
+                self.tasks.pop(taskid, None)
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
@@ -3,12 +3,30 @@ import dotenv
 from langgraph.graph import StateGraph, START, END
 from typing import TypedDict, Literal
 import datetime
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.llm_cache import cached
+from common.scheduler import scheduled
+from common.fusion import deterministic, fuse
+from common.profiling import profiled, report
+from task_store import DEFAULT_PATH, TaskStore, description
 dotenv.load_dotenv()
 
 # model initialization
-model = GoogleGenerativeAI(
+model = scheduled(cached(GoogleGenerativeAI(
     model = "gemini-2.5-flash"
-    )
+    )))
+
+# tasks are kept in an indexed SQLite store instead of rewriting save.txt
+TODO_DB = os.getenv("TODO_DB", DEFAULT_PATH)
+_store = None
+
+def task_store() -> TaskStore:
+    global _store
+    if _store is None:
+        _store = TaskStore(TODO_DB)
+    return _store
 
 class todoStructure(TypedDict):
     taskid: str
@@ -74,30 +92,24 @@ def extract_tasks_node(state: todoState) -> todoState:
     state["taskList"] = taskList
     return state
 
+@deterministic
 def summarize_node(state: todoState) -> todoState:
     # Create summaryDict: taskid -> description or concise_description
     summaryDict = {task["taskid"]: task.get("description", task.get("concise_description", "")) for task in state["taskList"]}
     state["summaryDict"] = summaryDict
     return state
 
+@deterministic
 def compare_node(state: todoState) -> todoState:
-    import os, json
-    save_path = os.path.join(os.path.dirname(__file__), "save.txt")
-    previous_summary = {}
-    if os.path.exists(save_path):
-        with open(save_path, "r") as f:
-            try:
-                previous_summary = json.load(f)
-            except Exception:
-                previous_summary = {}
+    store = task_store()
     commandList = []
     # Add/update tasks
     for task in state["taskList"]:
-        desc = task.get("description", task.get("concise_description", ""))
-        prev_desc = previous_summary.get(task["taskid"])
-        if prev_desc is None:
+        desc = description(task)
+        previous = store.get(task["taskid"])
+        if previous is None:
             cmd = "add"
-        elif prev_desc != desc:
+        elif description(previous) != desc:
             cmd = "update"
         else:
             cmd = "none"
@@ -107,47 +119,19 @@ def compare_node(state: todoState) -> todoState:
             task_with_desc["description"] = desc
             commandList.append({**task_with_desc, "command": cmd})
     # Remove tasks not in new list
-    for prev_id in previous_summary:
-        if prev_id not in state["summaryDict"]:
-            commandList.append({"taskid": prev_id, "title": "", "description": previous_summary[prev_id], "due_date": None, "priority": None, "category": None, "status": None, "command": "remove"})
+    current_ids = {str(taskid) for taskid in state["summaryDict"]}
+    for prev_id, prev_task in store.tasks.items():
+        if prev_id not in current_ids:
+            commandList.append({"taskid": prev_id, "title": "", "description": description(prev_task), "due_date": None, "priority": None, "category": None, "status": None, "command": "remove"})
     # Update summaryDict for next run
-    state["summaryDict"].update({task["taskid"]: task.get("description", task.get("concise_description", "")) for task in state["taskList"]})
+    state["summaryDict"].update({task["taskid"]: description(task) for task in state["taskList"]})
     state["commandList"] = commandList
     return state
 
+@deterministic
 def execute_node(state: todoState) -> todoState:
-    import os, json
-    save_path = os.path.join(os.path.dirname(__file__), "save.txt")
-    # Load previous file if exists
-    previous_data = {"todos": [], "summary": {}}
-    if os.path.exists(save_path):
-        with open(save_path, "r") as f:
-            try:
-                previous_data = json.load(f)
-            except Exception:
-                previous_data = {"todos": [], "summary": {}}
-    # Update summary dictionary
-    summary_dict = previous_data.get("summary", {})
-    for cmd_dict in state["commandList"]:
-        cmd = cmd_dict["command"]
-        tid = cmd_dict["taskid"]
-        if cmd == "add" or cmd == "update":
-            summary_dict[tid] = cmd_dict["description"]
-        elif cmd == "remove":
-            summary_dict.pop(tid, None)
-    # Update todos list
-    todos = previous_data.get("todos", [])
-    # Remove todos marked for removal
-    todos = [todo for todo in todos if todo.get("taskid") not in [cmd["taskid"] for cmd in state["commandList"] if cmd["command"] == "remove"]]
-    # Add/update todos
-    for cmd_dict in state["commandList"]:
-        if cmd_dict["command"] in ["add", "update"]:
-            # Remove old todo with same id if exists
-            todos = [todo for todo in todos if todo.get("taskid") != cmd_dict["taskid"]]
-            todos.append({k: v for k, v in cmd_dict.items() if k != "command"})
-    # Save both todos and summary
-    with open(save_path, "w") as f:
-        json.dump({"todos": todos, "summary": summary_dict}, f, indent=2)
+    # one transaction for the whole command list, each command is a single row write
+    task_store().apply(state["commandList"])
     return state
 
 # defining graph
@@ -166,12 +150,15 @@ graph.add_edge('summarize', 'compare')
 graph.add_edge('compare', 'execute')
 graph.add_edge('execute', END)
 
-# compile graph
-workflow = graph.compile()
+# compile graph, summarize -> compare -> execute run as one step (GRAPH_FUSION=0 keeps them apart)
+workflow = fuse(graph).compile()
 
 # Execute the graph
-initial_state = {
-    'userInput': "I bought groceries, called dad, and finished my project report on biology . i need to gift my sister a cake"
-}
-final_state = workflow.invoke(initial_state)
-print(final_state)
\ No newline at end of file
+if __name__ == "__main__":
+    workflow = profiled(workflow)
+    initial_state = {
+        'userInput': "I bought groceries, called dad, and finished my project report on biology . i need to gift my sister a cake"
+    }
+    final_state = workflow.invoke(initial_state)
+    print(final_state)
+    report(workflow)